@@ -1,8 +1,45 @@
 import sqlite3
 import sys
 import os
+import re
+import gzip
+import json
+import time
+import shutil
 import argparse
 
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: only JSON specs
+    tomllib = None
+
+# Keys accepted for each column of a migration spec (--spec):
+#
+#   [tables.projects.columns.Status]
+#   values = ["ACTIVE", "INACTIVE"]   # CHECK (Status IN (...))
+#   ignore_case = false               # CHECK on UPPER(Status) instead
+#   default = "ACTIVE"                # DEFAULT clause (also the NULL substitution)
+#   null_value = "ACTIVE"             # value copied in place of NULL
+#   map = { Closed = "INACTIVE" }     # explicit value mappings
+#   nonconforming_value = "INACTIVE"  # where any other disallowed value goes
+#   allow_nonconforming = false       # or add them to the allowed values instead
+#   not_null = false                  # add NOT NULL
+#   type = "TEXT"                     # replace the column type
+#
+# The same structure works as JSON: {"tables": {"projects": {"columns": {"Status": {...}}}}}
+SPEC_COLUMN_KEYS = {
+    'values', 'ignore_case', 'default', 'null_value', 'map',
+    'nonconforming_value', 'allow_nonconforming', 'not_null', 'type'
+}
+
+# Progress of chunked copies (--chunk-size), kept in the database being migrated so that
+# each chunk and its checkpoint commit together
+CHECKPOINT_TABLE = "_updatedb_checkpoint"
+
+# Defaults for --online when --chunk-size/--chunk-pause are not given
+ONLINE_CHUNK_SIZE = 2000
+ONLINE_CHUNK_PAUSE = 0.01
+
 def get_confirmation(message):
     while True:
         response = input(f"{message} (yes/no): ").lower().strip()
@@ -12,6 +49,857 @@ def get_confirmation(message):
             return False
         print("Please answer 'yes' or 'no'.")
 
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def quote_literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+def table_exists(cursor, table):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    return cursor.fetchone() is not None
+
+def rowid_alias(columns):
+    # The INTEGER PRIMARY KEY column that is the table's rowid, if any
+    pk_columns = [col for col in columns if col[5]]
+    if len(pk_columns) == 1 and pk_columns[0][2].upper() == "INTEGER":
+        return pk_columns[0][1]
+    return None
+
+def has_rowid(cursor, table):
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    row = cursor.fetchone()
+    return not (row and row[0] and re.search(r"\)\s*WITHOUT\s+ROWID", row[0], re.IGNORECASE))
+
+def find_column(columns, name):
+    for col in columns:
+        if col[1].lower() == name.lower():
+            return col
+    return None
+
+def print_table_structure(columns):
+    print("-" * 80)
+    print(f"{'ID':<3} | {'Name':<20} | {'Type':<10} | {'NotNull':<7} | {'Default':<20} | {'PK':<2}")
+    print("-" * 80)
+    for col in columns:
+        print(f"{col[0]:<3} | {col[1]:<20} | {col[2]:<10} | {col[3]:<7} | {str(col[4]):<20} | {col[5]:<2}")
+
+class BackupRestarted(Exception):
+    pass
+
+def create_backup(db_path, pages=1024, pause=0.01, compress=False, verify=True):
+    # Copy the database through SQLite's online backup API, `pages` pages per step. Each step
+    # reads a consistent snapshot (WAL contents included) and releases the lock afterwards, so
+    # pausing between steps lets the application's writers in; memory use stays at one step.
+    # The copy is written next to the final name and only replaces an earlier backup once it
+    # is complete (and, with verify, has passed integrity_check).
+    # A write by another connection between steps restarts the copy; after max_restarts the
+    # rest is copied in one step (a read snapshot, which in WAL mode does not block writers).
+    backup_path = f"{db_path}.backup" + (".gz" if compress else "")
+    partial_path = f"{db_path}.backup.partial"
+    max_restarts = 3
+    state = {'last_report': 0.0, 'copied': 0, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        now = time.monotonic()
+        copied = total - remaining
+        if 0 < copied <= state['copied']:
+            state['restarts'] += 1
+            if state['restarts'] >= max_restarts:
+                raise BackupRestarted()
+        state['copied'] = copied
+        if remaining == 0 or now - state['last_report'] >= 1.0:
+            print(f"  Backup: {copied}/{total} pages ({copied * 100 // max(total, 1)}%)")
+            state['last_report'] = now
+        if remaining and pause:
+            time.sleep(pause)
+
+    for path in (partial_path, partial_path + ".gz"):
+        if os.path.exists(path):
+            os.remove(path)
+    try:
+        src = sqlite3.connect(db_path)
+        try:
+            dst = sqlite3.connect(partial_path)
+            try:
+                try:
+                    src.backup(dst, pages=pages, progress=progress)
+                except BackupRestarted:
+                    print(f"  Backup restarted {state['restarts']} times by concurrent writes; copying the rest in one step")
+                    state['copied'] = 0
+                    src.backup(dst, pages=-1, progress=progress)
+                if verify:
+                    result = dst.execute("PRAGMA integrity_check").fetchone()[0]
+                    if result != 'ok':
+                        raise sqlite3.DatabaseError(f"Backup failed integrity_check: {result}")
+                    print("  Backup passed integrity_check")
+            finally:
+                dst.close()
+        finally:
+            src.close()
+
+        if compress:
+            with open(partial_path, 'rb') as raw, gzip.open(partial_path + ".gz", 'wb', compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, 1024 * 1024)
+            os.remove(partial_path)
+            partial_path += ".gz"
+        os.replace(partial_path, backup_path)
+    except BaseException:
+        for path in (partial_path, partial_path + ".gz"):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return backup_path
+
+def backup_database(args):
+    return create_backup(args.destination, args.backup_pages, args.backup_pause,
+                         args.compress_backup, not args.no_verify_backup)
+
+def profile_column(cursor, table, columns, column, sample_limit=0):
+    # Every value of one column (NULL included, under None) with its row count and up to
+    # sample_limit sample rows, from a single scan: a GROUP BY, or when samples are wanted,
+    # COUNT(*) and ROW_NUMBER() windows partitioned by the column
+    table_sql = quote_identifier(table)
+    column_sql = quote_identifier(column)
+    values = {}
+    if sample_limit > 0 and sqlite3.sqlite_version_info >= (3, 25, 0):
+        names = ", ".join(quote_identifier(col[1]) for col in columns)
+        index = [col[1] for col in columns].index(column)
+        cursor.execute(
+            f"SELECT value_count, {names} FROM ("
+            f"SELECT COUNT(*) OVER (PARTITION BY {column_sql}) AS value_count, "
+            f"ROW_NUMBER() OVER (PARTITION BY {column_sql}) AS value_row, {names} FROM {table_sql}"
+            f") WHERE value_row <= ?", (sample_limit,))
+        for row in cursor:
+            entry = values.setdefault(row[1 + index], {'count': row[0], 'samples': []})
+            entry['samples'].append(row[1:])
+    else:
+        cursor.execute(f"SELECT {column_sql}, COUNT(*) FROM {table_sql} GROUP BY {column_sql}")
+        for value, count in cursor:
+            values[value] = {'count': count, 'samples': []}
+    return values
+
+def value_variants(values):
+    # Groups of distinct values that differ only in case or surrounding whitespace
+    groups = {}
+    for val in values:
+        if val is not None:
+            groups.setdefault(str(val).strip().lower(), []).append(val)
+    return [group for group in groups.values() if len(group) > 1]
+
+def print_profile(table, column, values, top=25):
+    total = sum(entry['count'] for entry in values.values())
+    null_count = values.get(None, {'count': 0})['count']
+    distinct = len(values) - (None in values)
+    print(f"\nProfile of '{table}.{column}':")
+    print("-" * 80)
+    print(f"  Rows:        {total}")
+    print(f"  Cardinality: {distinct} distinct non-NULL values")
+    print(f"  NULL:        {null_count} ({null_count * 100 / total if total else 0:.1f}%)")
+
+    variants = value_variants(values)
+    if variants:
+        print(f"\n  Case/whitespace variants ({len(variants)} groups):")
+        ranked_variants = sorted(variants, key=lambda group: -sum(values[val]['count'] for val in group))
+        for group in ranked_variants[:top]:
+            print("    " + ", ".join(f"'{val}' ({values[val]['count']})" for val in group))
+
+    ranked = sorted(((val, entry['count']) for val, entry in values.items() if val is not None),
+                    key=lambda item: -item[1])
+    print(f"\n  Values by frequency{f' (top {top} of {distinct})' if distinct > top else ''}:")
+    for val, count in ranked[:top]:
+        print(f"    {str(val)!r:<40} {count:>10} {count * 100 / total:6.1f}%")
+
+def load_spec(path):
+    # Read and validate a JSON or TOML migration spec (raises ValueError)
+    with open(path, 'rb') as f:
+        if os.path.splitext(path)[1].lower() == '.toml':
+            if tomllib is None:
+                raise ValueError("TOML specs need Python 3.11+ (tomllib); use a JSON spec instead")
+            spec = tomllib.load(f)
+        else:
+            spec = json.load(f)
+
+    tables = spec.get('tables') if isinstance(spec, dict) else None
+    if not isinstance(tables, dict) or not tables:
+        raise ValueError("Spec must contain a non-empty 'tables' section")
+    for table, table_spec in tables.items():
+        columns = table_spec.get('columns') if isinstance(table_spec, dict) else None
+        if not isinstance(columns, dict) or not columns:
+            raise ValueError(f"Spec for table '{table}' must contain a non-empty 'columns' section")
+        for column, column_spec in columns.items():
+            if not isinstance(column_spec, dict):
+                raise ValueError(f"Spec for '{table}.{column}' must be a table of settings")
+            unknown = set(column_spec) - SPEC_COLUMN_KEYS
+            if unknown:
+                raise ValueError(f"Unknown setting(s) for '{table}.{column}': {', '.join(sorted(unknown))}")
+            if 'values' in column_spec and (not isinstance(column_spec['values'], list) or not column_spec['values']):
+                raise ValueError(f"'values' for '{table}.{column}' must be a non-empty list")
+            if 'map' in column_spec and not isinstance(column_spec['map'], dict):
+                raise ValueError(f"'map' for '{table}.{column}' must be a table of old = new values")
+    return spec
+
+def plan_column(cursor, table, columns, column_name, column_spec):
+    # Work out how one column is rebuilt: its constraint and every value rewritten during the copy.
+    # Raises ValueError when the data cannot satisfy the spec without an interactive decision.
+    col = find_column(columns, column_name)
+    if col is None:
+        raise ValueError(f"'{column_name}' column does not exist in the '{table}' table")
+    name = col[1]
+    allowed = list(column_spec.get('values', []))
+    mapping = dict(column_spec.get('map', {}))
+    default = column_spec.get('default')
+    null_value = column_spec.get('null_value', default)
+
+    # Every distinct value with its row count in one scan
+    counts = {val: entry['count'] for val, entry in profile_column(cursor, table, columns, name).items()}
+    null_count = counts.pop(None, 0)
+
+    case_fixes = {}
+    nonconforming = {}
+    if allowed:
+        allowed_lower = {str(val).lower(): val for val in allowed}
+        for val in counts:
+            if val in mapping or val in allowed:
+                continue
+            correct_value = allowed_lower.get(str(val).lower())
+            if correct_value is not None:
+                case_fixes[val] = correct_value
+            else:
+                nonconforming[val] = counts[val]
+
+        if nonconforming:
+            if 'nonconforming_value' in column_spec:
+                target = column_spec['nonconforming_value']
+                if target not in allowed:
+                    allowed.append(target)
+                for val in nonconforming:
+                    mapping[val] = target
+            elif column_spec.get('allow_nonconforming'):
+                allowed.extend(nonconforming)
+            else:
+                listed = ", ".join(f"'{val}' ({count} rows)" for val, count in nonconforming.items())
+                raise ValueError(f"'{table}.{name}' has values outside the allowed list: {listed}. "
+                                 "Add them to 'map', or set 'nonconforming_value' or 'allow_nonconforming'")
+
+        mapping.update(case_fixes)
+        for old_val, new_val in mapping.items():
+            if new_val not in allowed:
+                raise ValueError(f"'{table}.{name}' maps '{old_val}' to '{new_val}', which is not an allowed value")
+        for val in (default, null_value):
+            if val is not None and val not in allowed:
+                raise ValueError(f"'{table}.{name}' default/NULL value '{val}' is not an allowed value")
+
+    if column_spec.get('not_null') and null_count and null_value is None:
+        raise ValueError(f"'{table}.{name}' has {null_count} NULL rows but no 'default' or 'null_value' for NOT NULL")
+
+    return {
+        'column': name,
+        'type': column_spec.get('type'),
+        'default': default,
+        'not_null': bool(column_spec.get('not_null')),
+        'ignore_case': bool(column_spec.get('ignore_case')),
+        'allowed': allowed,
+        'mapping': mapping,
+        'null_value': null_value,
+        'null_count': null_count,
+        'case_fixes': case_fixes,
+        'nonconforming': nonconforming,
+        'rows_mapped': sum(counts.get(val, 0) for val in mapping),
+    }
+
+def build_check_constraint(column, allowed_values, ignore_case=False):
+    if ignore_case:
+        # For a case-insensitive check compare the UPPER of the column
+        values = ", ".join(quote_literal(str(val).upper()) for val in allowed_values)
+        return f"CHECK (UPPER({quote_identifier(column)}) IN ({values}))"
+    values = ", ".join(quote_literal(val) for val in allowed_values)
+    return f"CHECK ({quote_identifier(column)} IN ({values}))"
+
+# Tokens of SQLite DDL: comments and whitespace (skipped), strings, quoted identifiers, words, symbols
+DDL_TOKEN = re.compile(r"""
+    (?P<skip>\s+|--[^\n]*|/\*.*?(?:\*/|$))
+  | (?P<token>'(?:[^']|'')*'|"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\]|[A-Za-z_0-9$.]+|.)
+""", re.DOTALL | re.VERBOSE)
+
+# Keywords that start a column constraint, and the first keyword of a table constraint
+COLUMN_CONSTRAINTS = {'CONSTRAINT', 'PRIMARY', 'NOT', 'NULL', 'UNIQUE', 'CHECK', 'DEFAULT',
+                      'COLLATE', 'REFERENCES', 'GENERATED', 'AS'}
+TABLE_CONSTRAINTS = {'CONSTRAINT', 'PRIMARY', 'UNIQUE', 'CHECK', 'FOREIGN'}
+
+def tokenize_ddl(sql):
+    # [(text, start, end)] for every token of sql
+    return [(m.group('token'), m.start(), m.end()) for m in DDL_TOKEN.finditer(sql) if m.group('token')]
+
+def strip_ddl_comments(sql):
+    # Comments become a space (a definition re-joined onto one line must not be commented out)
+    return DDL_TOKEN.sub(lambda m: ' ' if m.group('skip') and m.group('skip').lstrip()[:2] in ('--', '/*')
+                         else m.group(0), sql).strip()
+
+def unquote_identifier(text):
+    if len(text) >= 2 and text[0] in '"`' and text[-1] == text[0]:
+        return text[1:-1].replace(text[0] * 2, text[0])
+    if len(text) >= 2 and text[0] == '[' and text[-1] == ']':
+        return text[1:-1]
+    return text
+
+def split_table_definition(sql):
+    # Split a CREATE TABLE statement into (header, [column/constraint definitions], tail), where
+    # header ends just before the table name and tail is everything after the closing parenthesis
+    # (WITHOUT ROWID, STRICT). Definitions are slices of the original text.
+    tokens = tokenize_ddl(sql)
+    depth = 0
+    name_start = open_index = None
+    parts = []
+    for i, (text, start, end) in enumerate(tokens):
+        if open_index is None and text.upper() in ('TABLE', 'EXISTS'):
+            name_start = tokens[i + 1][1]
+        if text == '(':
+            depth += 1
+            if depth == 1:
+                open_index = end
+                part_start = end
+        elif text == ')':
+            depth -= 1
+            if depth == 0:
+                parts.append(strip_ddl_comments(sql[part_start:start]))
+                return sql[:name_start], parts, sql[end:]
+        elif text == ',' and depth == 1:
+            parts.append(strip_ddl_comments(sql[part_start:start]))
+            part_start = end
+    raise ValueError("Could not parse the table definition")
+
+def split_column_definition(definition):
+    # Split a column definition into (name, type, [(kind, text)]) where kind is the constraint's
+    # keyword (NOT for NOT NULL, PRIMARY, DEFAULT, CHECK, ...) and text its original slice,
+    # including any leading CONSTRAINT <name>
+    tokens = tokenize_ddl(definition)
+    name = unquote_identifier(tokens[0][0])
+    depth = 0
+    starts = []
+    named = False
+    for i, (text, start, end) in enumerate(tokens[1:], 1):
+        word = text.upper()
+        if text == '(':
+            depth += 1
+        elif text == ')':
+            depth -= 1
+        elif depth == 0 and word in COLUMN_CONSTRAINTS:
+            previous = tokens[i - 1][0].upper()
+            following = tokens[i + 1][0].upper() if i + 1 < len(tokens) else ''
+            if word in ('NULL', 'DEFAULT') and previous in ('SET', 'NOT'):
+                continue  # ON DELETE SET NULL/DEFAULT, or the NULL of NOT NULL
+            if word == 'NOT' and following != 'NULL':
+                continue  # NOT DEFERRABLE
+            if named:
+                named = False  # the constraint a CONSTRAINT <name> prefix belongs to
+                starts[-1] = (starts[-1][0], word)
+                continue
+            starts.append((start, word))
+            named = word == 'CONSTRAINT'
+    type_end = starts[0][0] if starts else len(definition)
+    col_type = definition[tokens[0][2]:type_end].strip()
+    constraints = []
+    for index, (start, kind) in enumerate(starts):
+        end = starts[index + 1][0] if index + 1 < len(starts) else len(definition)
+        constraints.append((kind, definition[start:end].strip()))
+    return name, col_type, constraints
+
+def is_allowed_values_check(text, column):
+    # True for a CHECK in the shape build_check_constraint (or an earlier run of this script)
+    # writes: column IN (literals), or UPPER(column) IN (literals). A new allowed-values list
+    # replaces such a CHECK; any other CHECK on the column was written by hand and is kept.
+    tokens = [token for token, _, _ in tokenize_ddl(text)]
+    if tokens[:1] and tokens[0].upper() == 'CONSTRAINT':
+        tokens = tokens[2:]
+    if [token.upper() for token in tokens[:2]] != ['CHECK', '('] or tokens[-1:] != [')']:
+        return False
+    body = tokens[2:-1]
+    if len(body) >= 4 and body[0].upper() == 'UPPER' and body[1] == '(' and body[3] == ')':
+        body = body[2:3] + body[4:]
+    if len(body) < 4 or unquote_identifier(body[0]).lower() != column.lower():
+        return False
+    if body[1].upper() != 'IN' or body[2] != '(' or body[-1] != ')':
+        return False
+    values = [[]]
+    for token in body[3:-1]:
+        if token == ',':
+            values.append([])
+        else:
+            values[-1].append(token)
+    return all(re.fullmatch(r"'(?:[^']|'')*'|-?[0-9.]+|NULL", "".join(val), re.IGNORECASE) for val in values)
+
+def rewrite_create_table(sql, new_table, plans):
+    # The original CREATE TABLE statement for new_table, with only the planned columns changed:
+    # every other column, constraint (UNIQUE, PRIMARY KEY ... AUTOINCREMENT, FOREIGN KEY, table
+    # CHECKs, hand-written CHECKs on a planned column), COLLATE and table option is carried over
+    # as written
+    header, parts, tail = split_table_definition(sql)
+    plans_by_name = {name.lower(): plan for name, plan in plans.items()}
+    definitions = []
+    for part in parts:
+        first = tokenize_ddl(part)[0][0]
+        plan = None if first.upper() in TABLE_CONSTRAINTS else plans_by_name.get(unquote_identifier(first).lower())
+        if plan is None:
+            definitions.append(part)
+            continue
+        name, col_type, constraints = split_column_definition(part)
+        kept = [text for kind, text in constraints
+                if not (kind == 'DEFAULT' and plan['default'] is not None)
+                and not (kind == 'CHECK' and plan['allowed'] and is_allowed_values_check(text, name))]
+        if plan['not_null'] and not any(kind == 'NOT' for kind, _ in constraints):
+            kept.append("NOT NULL")
+        if plan['default'] is not None:
+            kept.append(f"DEFAULT {quote_literal(plan['default'])}")
+        if plan['allowed']:
+            kept.append(build_check_constraint(plan['column'], plan['allowed'], plan['ignore_case']))
+        definitions.append(" ".join(piece for piece in [quote_identifier(name), plan['type'] or col_type] + kept if piece))
+    return f"{header}{quote_identifier(new_table)} (" + ", ".join(definitions) + f"){tail}"
+
+def build_create_table_sql(cursor, table, new_table, columns, plans):
+    # CREATE TABLE for the rebuilt table: the original definition from sqlite_master with the
+    # planned columns rewritten, or (when there is none) one built from PRAGMA table_info
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    row = cursor.fetchone()
+    if row and row[0]:
+        return rewrite_create_table(row[0], new_table, plans)
+    return build_create_table_from_columns(new_table, columns, plans)
+
+def build_create_table_from_columns(new_table, columns, plans):
+    pk_columns = sorted((col for col in columns if col[5]), key=lambda col: col[5])
+    column_defs = []
+    for col_id, col_name, col_type, col_notnull, col_default, col_pk in columns:
+        plan = plans.get(col_name)
+        col_def = f"{quote_identifier(col_name)} {(plan and plan['type']) or col_type}".rstrip()
+        if col_notnull or (plan and plan['not_null']):
+            col_def += " NOT NULL"
+        if plan and plan['default'] is not None:
+            col_def += f" DEFAULT {quote_literal(plan['default'])}"
+        elif col_default is not None:
+            col_def += f" DEFAULT {col_default}"
+        if col_pk and len(pk_columns) == 1:
+            col_def += " PRIMARY KEY"
+        if plan and plan['allowed']:
+            col_def += " " + build_check_constraint(col_name, plan['allowed'], plan['ignore_case'])
+        column_defs.append(col_def)
+    if len(pk_columns) > 1:
+        column_defs.append(f"PRIMARY KEY ({', '.join(quote_identifier(col[1]) for col in pk_columns)})")
+    return f"CREATE TABLE {quote_identifier(new_table)} (" + ", ".join(column_defs) + ")"
+
+def build_value_expr(column_sql, plan, params=None):
+    # CASE expression applying a column's NULL substitution and mappings. Values are bound
+    # through params, or inlined as literals when params is None (trigger bodies cannot bind)
+    if plan is None or (not plan['mapping'] and plan['null_value'] is None):
+        return column_sql
+
+    def value(val):
+        if params is None:
+            return quote_literal(val)
+        params.append(val)
+        return "?"
+
+    case_stmt = "CASE"
+    if plan['null_value'] is not None:
+        case_stmt += f" WHEN {column_sql} IS NULL THEN {value(plan['null_value'])}"
+    for old_val, new_val in plan['mapping'].items():
+        case_stmt += f" WHEN {column_sql} = {value(old_val)} THEN {value(new_val)}"
+    return case_stmt + f" ELSE {column_sql} END"
+
+def build_copy_sql(table, new_table, columns, plans, keep_rowid=False, where="", verb="INSERT"):
+    # One INSERT ... SELECT that applies NULL substitution and every mapping while copying.
+    # keep_rowid copies the rowid of tables without an INTEGER PRIMARY KEY, and where
+    # (e.g. a rowid range) restricts the rows copied
+    names = ["rowid"] if keep_rowid else []
+    select_columns = ["rowid"] if keep_rowid else []
+    params = []
+    for col in columns:
+        name = quote_identifier(col[1])
+        names.append(name)
+        select_columns.append(build_value_expr(name, plans.get(col[1]), params))
+    insert_sql = (f"{verb} INTO {quote_identifier(new_table)} ({', '.join(names)}) "
+                  f"SELECT {', '.join(select_columns)} FROM {quote_identifier(table)} {where}").rstrip()
+    return insert_sql, params
+
+def mirror_trigger_names(table):
+    return [f"{table}_updatedb_{event}" for event in ('insert', 'update', 'delete')]
+
+def build_mirror_triggers(table, new_table, columns, plans, keep_rowid=False):
+    # Triggers that replay every INSERT, UPDATE and DELETE on table into new_table (mapped like
+    # the copy) while a chunked copy runs. A row the new constraints reject is skipped
+    # (INSERT OR IGNORE) rather than failing the application's write; the swap finds it.
+    table_sql = quote_identifier(table)
+    new_table_sql = quote_identifier(new_table)
+    names = (["rowid"] if keep_rowid else []) + [quote_identifier(col[1]) for col in columns]
+    values = (["NEW.rowid"] if keep_rowid else []) + [
+        build_value_expr(f"NEW.{quote_identifier(col[1])}", plans.get(col[1])) for col in columns
+    ]
+    mirror = (f"DELETE FROM {new_table_sql} WHERE rowid = NEW.rowid; "
+              f"INSERT OR IGNORE INTO {new_table_sql} ({', '.join(names)}) VALUES ({', '.join(values)});")
+    insert_name, update_name, delete_name = (quote_identifier(name) for name in mirror_trigger_names(table))
+    return [
+        f"CREATE TRIGGER {insert_name} AFTER INSERT ON {table_sql} BEGIN {mirror} END",
+        f"CREATE TRIGGER {update_name} AFTER UPDATE ON {table_sql} BEGIN "
+        f"DELETE FROM {new_table_sql} WHERE rowid = OLD.rowid; {mirror} END",
+        f"CREATE TRIGGER {delete_name} AFTER DELETE ON {table_sql} BEGIN "
+        f"DELETE FROM {new_table_sql} WHERE rowid = OLD.rowid; END",
+    ]
+
+def foreign_key_violations(cursor, tables):
+    violations = set()
+    for table in tables:
+        try:
+            cursor.execute(f"PRAGMA foreign_key_check({quote_identifier(table)})")
+        except sqlite3.OperationalError:
+            continue  # "foreign key mismatch": the parent key has no unique index, so it cannot be checked
+        violations.update(tuple(row) for row in cursor.fetchall())
+    return violations
+
+def save_dependents(cursor, table):
+    # What DROP TABLE takes with it and the rebuild must put back: the table's indexes and
+    # triggers (without the mirror triggers of a chunked copy), its AUTOINCREMENT counter, and the foreign
+    # key violations that already exist around it (so only new ones are reported)
+    cursor.execute("SELECT type, sql FROM sqlite_master WHERE tbl_name=? AND type IN ('index', 'trigger') "
+                   "AND sql IS NOT NULL AND name NOT IN (?, ?, ?) ORDER BY type, name",
+                   (table, *mirror_trigger_names(table)))
+    rows = cursor.fetchall()
+    seq = None
+    if table_exists(cursor, 'sqlite_sequence'):
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,))
+        row = cursor.fetchone()
+        seq = row[0] if row else None
+    # The table itself as a child, and every table whose foreign keys reference it
+    cursor.execute("SELECT m.name FROM sqlite_master m, pragma_foreign_key_list(m.name) f "
+                   "WHERE m.type='table' AND f.\"table\" = ? COLLATE NOCASE", (table,))
+    related = sorted({table} | {row[0] for row in cursor.fetchall()})
+    return {
+        'indexes': [sql for kind, sql in rows if kind == 'index'],
+        'triggers': [sql for kind, sql in rows if kind == 'trigger'],
+        'seq': seq,
+        'related': related,
+        'violations': foreign_key_violations(cursor, related),
+    }
+
+def restore_dependents(cursor, table, saved):
+    # Recreate the indexes and triggers, keep the AUTOINCREMENT counter from going backwards and
+    # verify foreign keys (raises ValueError on violations the rebuild introduced)
+    for sql in saved['indexes'] + saved['triggers']:
+        cursor.execute(sql)
+    if saved['seq'] is not None:
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, saved['seq']))
+        elif row[0] < saved['seq']:
+            cursor.execute("UPDATE sqlite_sequence SET seq=? WHERE name=?", (saved['seq'], table))
+    introduced = foreign_key_violations(cursor, saved['related']) - saved['violations']
+    if introduced:
+        listed = ", ".join(f"{child} rowid {rowid} -> {parent}" for child, rowid, parent, _ in sorted(introduced)[:10])
+        raise ValueError(f"Rebuilding '{table}' would break {len(introduced)} foreign key reference(s): {listed}")
+
+def swap_tables(cursor, table, new_table):
+    # Replace table with new_table, keeping its indexes, triggers and AUTOINCREMENT counter;
+    # the caller owns the transaction
+    saved = save_dependents(cursor, table)
+    cursor.execute(f"DROP TABLE {quote_identifier(table)}")
+    cursor.execute(f"ALTER TABLE {quote_identifier(new_table)} RENAME TO {quote_identifier(table)}")
+    restore_dependents(cursor, table, saved)
+
+def rebuild_table(cursor, table, columns, plans):
+    # Create-copy-swap for one table; the caller owns the transaction
+    new_table = f"{table}_new"
+    if table_exists(cursor, new_table):
+        raise ValueError(f"'{new_table}' already exists (left over from an earlier run?)")
+    cursor.execute(build_create_table_sql(cursor, table, new_table, columns, plans))
+    keep_rowid = rowid_alias(columns) is None and has_rowid(cursor, table)
+    insert_sql, params = build_copy_sql(table, new_table, columns, plans, keep_rowid)
+    cursor.execute(insert_sql, params)
+    rows_copied = cursor.rowcount
+    swap_tables(cursor, table, new_table)
+    return rows_copied
+
+def print_copy_progress(table, copied, total, copied_now, started):
+    elapsed = time.monotonic() - started
+    rate = copied_now / elapsed if elapsed > 0 else 0
+    eta = f"{(total - copied) / rate:.0f}s" if rate and total > copied else "-"
+    print(f"  {table}: {copied}/{total} rows ({copied * 100 // max(total, 1)}%), {rate:,.0f} rows/s, ETA {eta}")
+
+def copy_in_chunks(conn, table, columns, plans, chunk_size, restart=False, pause=0.0):
+    # Rebuild one table by copying rowid ranges of chunk_size rows, each range in its own short
+    # write transaction together with its checkpoint, so the write lock is released between
+    # chunks (for pause seconds) and the journal/WAL only ever holds one chunk. An interrupted
+    # copy resumes from the checkpoint when run again with the same spec.
+    #
+    # Triggers installed with the new table mirror every change made to the original while the
+    # copy runs (or is interrupted), so updates and deletes in ranges already copied are kept.
+    # Chunks therefore use INSERT OR REPLACE (a chunk re-reads rows a trigger already mirrored),
+    # a copy whose triggers are gone is not resumed, and the swap (copying rows added since the
+    # last chunk, DROP and RENAME) only has to re-copy rows a trigger skipped. Returns the number
+    # of rows copied.
+    cursor = conn.cursor()
+    if not has_rowid(cursor, table):
+        # No rowid ranges to walk: copy a WITHOUT ROWID table in one transaction
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            rows_copied = rebuild_table(cursor, table, columns, plans)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return rows_copied
+    new_table = f"{table}_new"
+    table_sql = quote_identifier(table)
+    create_sql = build_create_table_sql(cursor, table, new_table, columns, plans)
+    keep_rowid = rowid_alias(columns) is None
+    verb = "INSERT OR REPLACE"
+    insert_sql, params = build_copy_sql(table, new_table, columns, plans, keep_rowid,
+                                        "WHERE rowid > ? AND rowid <= ?", verb)
+    # The copy's mapped values are bound, so they are compared along with its SQL
+    copy_params = json.dumps(params)
+    trigger_names = mirror_trigger_names(table)
+
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} ("
+                   "table_name TEXT PRIMARY KEY, create_sql TEXT NOT NULL, copy_sql TEXT NOT NULL, "
+                   "copy_params TEXT NOT NULL, last_rowid INTEGER NOT NULL, rows_copied INTEGER NOT NULL, "
+                   "started DATETIME NOT NULL, updated DATETIME NOT NULL)")
+    cursor.execute(f"SELECT create_sql, copy_sql, copy_params, last_rowid, rows_copied FROM {CHECKPOINT_TABLE} "
+                   "WHERE table_name = ?", (table,))
+    checkpoint = cursor.fetchone()
+    if checkpoint is not None and not restart:
+        if checkpoint[:3] != (create_sql, insert_sql, copy_params):
+            raise ValueError(f"An interrupted copy of '{table}' used a different table definition or value "
+                             "mappings; rerun with --restart-copy to start it over")
+        cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type='trigger' AND tbl_name=? "
+                       f"AND name IN ({', '.join('?' * len(trigger_names))})", (table, *trigger_names))
+        if cursor.fetchone()[0] != len(trigger_names):
+            raise ValueError(f"The triggers of the interrupted copy of '{table}' are missing, so changes made "
+                             "since it stopped were not mirrored; rerun with --restart-copy to start it over")
+    if checkpoint is not None and restart:
+        cursor.execute("BEGIN IMMEDIATE")
+        for name in trigger_names:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {quote_identifier(name)}")
+        cursor.execute(f"DROP TABLE IF EXISTS {quote_identifier(new_table)}")
+        cursor.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE table_name = ?", (table,))
+        cursor.execute("COMMIT")
+        checkpoint = None
+
+    if checkpoint is None:
+        if table_exists(cursor, new_table):
+            raise ValueError(f"'{new_table}' already exists (left over from an earlier run?)")
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(create_sql)
+        cursor.execute(f"INSERT INTO {CHECKPOINT_TABLE} VALUES (?, ?, ?, ?, "
+                       f"(SELECT COALESCE(MIN(rowid), 1) - 1 FROM {table_sql}), 0, "
+                       "datetime('now'), datetime('now'))", (table, create_sql, insert_sql, copy_params))
+        for trigger_sql in build_mirror_triggers(table, new_table, columns, plans, keep_rowid):
+            cursor.execute(trigger_sql)
+        cursor.execute("COMMIT")
+        cursor.execute(f"SELECT last_rowid, rows_copied FROM {CHECKPOINT_TABLE} WHERE table_name = ?", (table,))
+        last_rowid, rows_copied = cursor.fetchone()
+    else:
+        last_rowid, rows_copied = checkpoint[3], checkpoint[4]
+        print(f"  Resuming '{table}' after rowid {last_rowid} ({rows_copied} rows already copied)")
+
+    cursor.execute(f"SELECT COUNT(*) FROM {table_sql} WHERE rowid > ?", (last_rowid,))
+    total = rows_copied + cursor.fetchone()[0]
+    started = time.monotonic()
+    last_report = started
+    copied_now = 0
+
+    while True:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Upper end of the next chunk: a seek on the rowid b-tree, so sparse rowids still give full chunks
+        cursor.execute(f"SELECT rowid FROM {table_sql} WHERE rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?",
+                       (last_rowid, chunk_size - 1))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(f"SELECT MAX(rowid) FROM {table_sql} WHERE rowid > ?", (last_rowid,))
+            row = cursor.fetchone()
+        if row is None or row[0] is None:
+            cursor.execute("COMMIT")
+            break
+        cursor.execute(insert_sql, params + [last_rowid, row[0]])
+        copied = cursor.rowcount
+        cursor.execute(f"UPDATE {CHECKPOINT_TABLE} SET last_rowid = ?, rows_copied = rows_copied + ?, "
+                       "updated = datetime('now') WHERE table_name = ?", (row[0], copied, table))
+        cursor.execute("COMMIT")
+        last_rowid = row[0]
+        rows_copied += copied
+        copied_now += copied
+
+        now = time.monotonic()
+        if now - last_report >= 1.0:
+            print_copy_progress(table, rows_copied, max(total, rows_copied), copied_now, started)
+            last_report = now
+        if pause:
+            time.sleep(pause)
+    print_copy_progress(table, rows_copied, rows_copied, copied_now, started)
+
+    # Swap: rows inserted since the last chunk are copied under the same lock as the rename
+    count_sql = f"SELECT (SELECT COUNT(*) FROM {table_sql}), (SELECT COUNT(*) FROM {quote_identifier(new_table)})"
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        swap_started = time.monotonic()
+        cursor.execute(insert_sql, params + [last_rowid, 2 ** 63 - 1])
+        rows_copied += cursor.rowcount
+        cursor.execute(count_sql)
+        original_count, new_count = cursor.fetchone()
+        if original_count != new_count:
+            # Rows a trigger skipped (a value the new constraints reject): copy them again, so
+            # they are mapped with the current spec or the error names the constraint
+            repair_sql, repair_params = build_copy_sql(
+                table, new_table, columns, plans, keep_rowid,
+                f"WHERE rowid NOT IN (SELECT rowid FROM {quote_identifier(new_table)})", verb)
+            try:
+                cursor.execute(repair_sql, repair_params)
+            except sqlite3.IntegrityError as e:
+                raise ValueError(f"Rows written to '{table}' during the copy break the new constraints ({e}); "
+                                 "map their values in the spec and rerun to resume")
+            print(f"  Re-copied {cursor.rowcount} rows the triggers could not mirror")
+            cursor.execute(count_sql)
+            original_count, new_count = cursor.fetchone()
+        if original_count != new_count:
+            raise ValueError(f"'{table}' has {original_count} rows but {new_count} were copied. "
+                             "Rerun with --restart-copy while the application is idle")
+        # Dropping the original drops the mirror triggers with it
+        swap_tables(cursor, table, new_table)
+        cursor.execute(f"DELETE FROM {CHECKPOINT_TABLE} WHERE table_name = ?", (table,))
+        cursor.execute(f"SELECT COUNT(*) FROM {CHECKPOINT_TABLE}")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"DROP TABLE {CHECKPOINT_TABLE}")
+        cursor.execute("COMMIT")
+        print(f"  Swapped '{table}' in {time.monotonic() - swap_started:.3f}s")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    return rows_copied
+
+def print_plan(table, plans):
+    print(f"\nPlan for '{table}':")
+    print("-" * 80)
+    for plan in plans.values():
+        print(f"  {plan['column']}:")
+        if plan['allowed']:
+            print(f"    allowed values: {', '.join(str(val) for val in plan['allowed'])}"
+                  + (" (case-insensitive)" if plan['ignore_case'] else ""))
+        if plan['default'] is not None:
+            print(f"    default: '{plan['default']}'")
+        if plan['not_null']:
+            print("    NOT NULL")
+        if plan['type']:
+            print(f"    type: {plan['type']}")
+        if plan['null_count'] and plan['null_value'] is not None:
+            print(f"    {plan['null_count']} NULL rows -> '{plan['null_value']}'")
+        for old_val, new_val in plan['case_fixes'].items():
+            print(f"    case fix: '{old_val}' -> '{new_val}'")
+        for old_val, count in plan['nonconforming'].items():
+            target = plan['mapping'].get(old_val)
+            print(f"    nonconforming: '{old_val}' ({count} rows) -> "
+                  + (f"'{target}'" if target is not None else "allowed"))
+        explicit = {old: new for old, new in plan['mapping'].items()
+                    if old not in plan['case_fixes'] and old not in plan['nonconforming']}
+        for old_val, new_val in explicit.items():
+            print(f"    map: '{old_val}' -> '{new_val}'")
+
+def run_spec(args):
+    # Apply every table of a migration spec: one create-copy-swap per table, all in one
+    # transaction, with no prompts. Any problem leaves the database unchanged.
+    try:
+        spec = load_spec(args.spec)
+    except (OSError, ValueError) as e:
+        print(f"Error reading spec '{args.spec}': {e}")
+        sys.exit(1)
+
+    try:
+        # Autocommit mode so the transaction below is exactly the one we open
+        conn = sqlite3.connect(args.destination, isolation_level=None)
+        cursor = conn.cursor()
+        # Dropping a parent table must not cascade into (or be refused for) its children, and the
+        # rename must leave views and triggers that name the table alone (they resolve to the new one)
+        cursor.execute("PRAGMA foreign_keys=OFF")
+        cursor.execute("PRAGMA legacy_alter_table=ON")
+    except Exception as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+
+    if not args.dry_run and not args.no_backup:
+        # Before the write lock is taken, so the time-sliced copy still yields to the application
+        try:
+            backup_path = backup_database(args)
+            print(f"Database backup created at: {backup_path}")
+        except Exception as e:
+            print(f"Error: Failed to create backup: {e}")
+            print("No changes made to the database.")
+            conn.close()
+            sys.exit(1)
+
+    started = time.perf_counter()
+    chunk_size = args.chunk_size or (ONLINE_CHUNK_SIZE if args.online else 0)
+    chunk_pause = args.chunk_pause if args.chunk_pause is not None else (ONLINE_CHUNK_PAUSE if args.online else 0.0)
+    chunked = chunk_size > 0 and not args.dry_run
+    try:
+        # Writers are held off from planning to commit, so the plan matches the data copied
+        # (a chunked copy commits as it goes, so it only plans under a read transaction)
+        cursor.execute("BEGIN" if args.dry_run or chunked else "BEGIN IMMEDIATE")
+
+        tables = []
+        for table, table_spec in spec['tables'].items():
+            if not table_exists(cursor, table):
+                raise ValueError(f"'{table}' table does not exist in this database")
+            cursor.execute(f"PRAGMA table_info({quote_identifier(table)})")
+            columns = cursor.fetchall()
+            plans = {}
+            for column_name, column_spec in table_spec['columns'].items():
+                plan = plan_column(cursor, table, columns, column_name, column_spec)
+                plans[plan['column']] = plan
+            print_plan(table, plans)
+            tables.append((table, columns, plans))
+
+        if args.dry_run:
+            for table, columns, plans in tables:
+                print(f"\nSQL for '{table}':")
+                print(build_create_table_sql(cursor, table, f"{table}_new", columns, plans))
+                print(build_copy_sql(table, f"{table}_new", columns, plans)[0])
+            cursor.execute("ROLLBACK")
+            print("\nDry run: No changes made to the database.")
+            return
+
+        if chunked:
+            cursor.execute("ROLLBACK")
+            print()
+            for table, columns, plans in tables:
+                table_started = time.perf_counter()
+                rows_copied = copy_in_chunks(conn, table, columns, plans, chunk_size, args.restart_copy,
+                                             chunk_pause)
+                print(f"Rebuilt '{table}': {rows_copied} rows copied in {time.perf_counter() - table_started:.2f}s")
+            print(f"\nCompleted {len(tables)} table(s) in {time.perf_counter() - started:.2f}s")
+            return
+
+        print()
+        for table, columns, plans in tables:
+            table_started = time.perf_counter()
+            rows_copied = rebuild_table(cursor, table, columns, plans)
+            print(f"Rebuilt '{table}': {rows_copied} rows copied in {time.perf_counter() - table_started:.2f}s")
+
+        cursor.execute("COMMIT")
+        print(f"\nCommitted {len(tables)} table(s) in {time.perf_counter() - started:.2f}s")
+    except (Exception, KeyboardInterrupt) as e:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        print(f"Error: {e}" if isinstance(e, Exception) else "\nInterrupted.")
+        if chunked:
+            print("Tables already swapped keep their changes; copied chunks are kept and the same command resumes.")
+        else:
+            print("Changes rolled back. Database is unchanged.")
+        sys.exit(1)
+    finally:
+        conn.close()
+
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='SQLite table modifier for adding constraints and default values')
@@ -27,6 +915,19 @@ def main():
     parser.add_argument('-n', '--null-value', metavar='<null substitution>', help='Value to substitute for NULL values during copy (if different from default)')
     parser.add_argument('-g', '--nonconforming-value', metavar='<value>', help='Value to map nonconforming values to (skips interactive prompt)')
     parser.add_argument('-s', '--sample-limit', type=int, default=3, help='Number of sample rows to display for each nonconforming value (default: 3)')
+    parser.add_argument('-p', '--profile', action='store_true', help='Report the column\'s cardinality, NULL ratio, case variants and value counts (no changes made)')
+    parser.add_argument('--top', type=int, default=25, metavar='<count>', help='Values listed by --profile (default: 25)')
+    parser.add_argument('--spec', metavar='<spec file>', help='JSON or TOML migration spec covering many tables and columns (non-interactive)')
+    parser.add_argument('--dry-run', action='store_true', help='With --spec, show the plan and SQL without changing the database')
+    parser.add_argument('--no-backup', action='store_true', help='With --spec, skip the backup before rebuilding')
+    parser.add_argument('--chunk-size', type=int, default=0, metavar='<rows>', help='With --spec, copy each table in resumable chunks of this many rows, committing after each; triggers mirror changes made meanwhile (default: 0, one transaction)')
+    parser.add_argument('--restart-copy', action='store_true', help='With --chunk-size, discard an interrupted copy instead of resuming it')
+    parser.add_argument('--chunk-pause', type=float, metavar='<seconds>', help=f'Pause between chunks so the application can write (default: 0, or {ONLINE_CHUNK_PAUSE} with --online)')
+    parser.add_argument('--online', action='store_true', help=f'With --spec, migrate while the application keeps writing: a chunked copy (default chunk size {ONLINE_CHUNK_SIZE}) that pauses between chunks, then a short swap')
+    parser.add_argument('--backup-pages', type=int, default=1024, metavar='<pages>', help='Pages copied per backup step (default: 1024)')
+    parser.add_argument('--backup-pause', type=float, default=0.01, metavar='<seconds>', help='Pause between backup steps so other writers can run (default: 0.01)')
+    parser.add_argument('--compress-backup', action='store_true', help='Gzip the backup (written as <database>.backup.gz)')
+    parser.add_argument('--no-verify-backup', action='store_true', help='Skip PRAGMA integrity_check on the finished backup')
     
     # Parse arguments
     args = parser.parse_args()
@@ -45,10 +946,19 @@ def main():
         print(f"Error: Database file '{args.destination}' does not exist.")
         sys.exit(1)
     
+    # Spec mode applies a whole migration without prompts
+    if args.spec:
+        run_spec(args)
+        return
+    
     # Connect to database
     try:
         conn = sqlite3.connect(args.destination)
         cursor = conn.cursor()
+        # Dropping the original table must not cascade into (or be refused for) its children, and
+        # the rename must leave views and triggers that name the table alone
+        cursor.execute("PRAGMA foreign_keys=OFF")
+        cursor.execute("PRAGMA legacy_alter_table=ON")
     except Exception as e:
         print(f"Error connecting to database: {e}")
         sys.exit(1)
@@ -83,21 +993,22 @@ def main():
         
         # Print current table structure
         print(f"\nTable structure for '{args.table}':")
-        print("-" * 80)
-        print(f"{'ID':<3} | {'Name':<20} | {'Type':<10} | {'NotNull':<7} | {'Default':<20} | {'PK':<2}")
-        print("-" * 80)
-        for col in columns:
-            print(f"{col[0]:<3} | {col[1]:<20} | {col[2]:<10} | {col[3]:<7} | {str(col[4]):<20} | {col[5]:<2}")
+        print_table_structure(columns)
         
         # If info flag is provided, exit after displaying information
         if args.info:
-            conn.close()
             print("\nInformation mode: No changes made to the database.")
             sys.exit(0)
         
-        # Check current values in the column
-        cursor.execute(f"SELECT DISTINCT {args.column} FROM {args.table} WHERE {args.column} IS NOT NULL")
-        existing_values = [row[0] for row in cursor.fetchall() if row[0] is not None]
+        # Profile the column in one scan: counts and sample rows for every value
+        profile = profile_column(cursor, args.table, columns, args.column, args.sample_limit)
+        
+        if args.profile:
+            print_profile(args.table, args.column, profile, args.top)
+            print("\nProfile mode: No changes made to the database.")
+            sys.exit(0)
+        
+        existing_values = [val for val in profile if val is not None]
         
         # Prepare allowed values 
         allowed_values = [val.strip() for val in args.values.split(',')]
@@ -111,9 +1022,9 @@ def main():
             if val in allowed_values:
                 # Value matches exactly - no mapping needed
                 continue
-            elif val.lower() in allowed_values_lower:
+            elif str(val).lower() in allowed_values_lower:
                 # Value matches when ignoring case - map to correct case
-                correct_index = allowed_values_lower.index(val.lower())
+                correct_index = allowed_values_lower.index(str(val).lower())
                 correct_value = allowed_values[correct_index]
                 case_mapping[val] = correct_value
                 print(f"Found incorrect case: '{val}' will be fixed to '{correct_value}'")
@@ -125,16 +1036,11 @@ def main():
         if truly_non_conforming:
             print("\nWARNING: The following values currently exist in the column but are not in your allowed values list:")
             
-            # Collect information about nonconforming values
+            # Collect information about nonconforming values (already gathered by the profile)
             nonconforming_info = {}
             for val in truly_non_conforming:
-                # Get count of rows with this value
-                cursor.execute(f"SELECT COUNT(*) FROM {args.table} WHERE {args.column} = ?", (val,))
-                count = cursor.fetchone()[0]
-                
-                # Get sample rows with this value
-                cursor.execute(f"SELECT * FROM {args.table} WHERE {args.column} = ? LIMIT {args.sample_limit}", (val,))
-                sample_rows = cursor.fetchall()
+                count = profile[val]['count']
+                sample_rows = profile[val]['samples']
                 
                 # Store information
                 nonconforming_info[val] = {
@@ -249,10 +1155,8 @@ def main():
             sys.exit(0)
         
         # Create backup
-        backup_path = f"{args.destination}.backup"
         try:
-            with open(args.destination, 'rb') as src, open(backup_path, 'wb') as dst:
-                dst.write(src.read())
+            backup_path = backup_database(args)
             print(f"Database backup created at: {backup_path}")
         except Exception as e:
             print(f"Warning: Failed to create backup: {e}")
@@ -261,37 +1165,18 @@ def main():
                 conn.close()
                 sys.exit(0)
         
-        # Prepare the CHECK constraint
-        check_values_str = "', '".join(allowed_values)
-        check_constraint = f"CHECK ({args.column} IN ('{check_values_str}'))"
-        
-        if args.ignore_case:
-            # For case-insensitive check, we need a different approach
-            # We'll use the UPPER function in the check constraint
-            upper_values = [val.upper() for val in allowed_values]
-            check_values_str = "', '".join(upper_values)
-            check_constraint = f"CHECK (UPPER({args.column}) IN ('{check_values_str}'))"
-        
-        # Build the create table SQL statement
-        create_table_sql = f"CREATE TABLE {args.table}_new ("
-        column_defs = []
-        
-        for col in columns:
-            col_id, col_name, col_type, col_notnull, col_default, col_pk = col
-            
-            if col_name == args.column:
-                column_defs.append(f"{args.column} TEXT DEFAULT '{args.default}' {check_constraint}")
-            else:
-                col_def = f"{col_name} {col_type}"
-                if col_notnull:
-                    col_def += " NOT NULL"
-                if col_default is not None:
-                    col_def += f" DEFAULT {col_default}"
-                if col_pk:
-                    col_def += " PRIMARY KEY"
-                column_defs.append(col_def)
-        
-        create_table_sql += ", ".join(column_defs) + ")"
+        # Build the create table SQL statement from the original definition, so UNIQUE,
+        # AUTOINCREMENT, foreign keys and the other columns' constraints are kept
+        column_plan = {
+            'column': args.column,
+            'type': 'TEXT',
+            'default': args.default,
+            'not_null': False,
+            'allowed': allowed_values,
+            'ignore_case': args.ignore_case,
+        }
+        create_table_sql = build_create_table_sql(cursor, args.table, f"{args.table}_new", columns,
+                                                  {args.column: column_plan})
         
         # Show the SQL that will be executed for creating the new table
         print("\nSQL for creating the new table:")
@@ -376,7 +1261,8 @@ def main():
             conn.close()
             sys.exit(0)
         
-        # Drop old table
+        # Drop old table (its indexes and triggers go with it; keep them to recreate)
+        dependents = save_dependents(cursor, args.table)
         cursor.execute(f"DROP TABLE {args.table}")
         print(f"Dropped original table '{args.table}'")
         
@@ -387,6 +1273,10 @@ def main():
         if not get_confirmation("Rename the new table to the original name?"):
             print("Warning: Original table has been dropped but new table hasn't been renamed.")
             print(f"You can access your data in the '{args.table}_new' table.")
+            if dependents['indexes'] or dependents['triggers']:
+                print("Recreate the original indexes and triggers after renaming it:")
+                for sql in dependents['indexes'] + dependents['triggers']:
+                    print(f"  {sql};")
             conn.commit()
             conn.close()
             sys.exit(0)
@@ -396,6 +1286,10 @@ def main():
         new_table_created = False  # No longer need cleanup since we renamed
         print(f"Renamed new table to '{args.table}'")
         
+        # Recreate indexes and triggers, restore the AUTOINCREMENT counter and check foreign keys
+        restore_dependents(cursor, args.table, dependents)
+        print(f"Recreated {len(dependents['indexes'])} index(es) and {len(dependents['triggers'])} trigger(s); foreign keys verified")
+        
         # Commit changes
         conn.commit()
         print("Changes committed successfully")
@@ -416,17 +1310,15 @@ def main():
         print("Changes rolled back. Database is unchanged.")
     finally:
         # Verify the final table structure
-        try:
-            cursor.execute(f"PRAGMA table_info({args.table})")
-            new_columns = cursor.fetchall()
-            print("\nFinal table structure:")
-            print("-" * 80)
-            print(f"{'ID':<3} | {'Name':<20} | {'Type':<10} | {'NotNull':<7} | {'Default':<20} | {'PK':<2}")
-            print("-" * 80)
-            for col in new_columns:
-                print(f"{col[0]:<3} | {col[1]:<20} | {col[2]:<10} | {col[3]:<7} | {str(col[4]):<20} | {col[5]:<2}")
-        except Exception as e:
-            print(f"Error displaying final structure: {e}")
+        # (report modes made no changes, so there is nothing to verify)
+        if not (args.info or args.profile):
+            try:
+                cursor.execute(f"PRAGMA table_info({args.table})")
+                new_columns = cursor.fetchall()
+                print("\nFinal table structure:")
+                print_table_structure(new_columns)
+            except Exception as e:
+                print(f"Error displaying final structure: {e}")
         
         # Close connection
         conn.close()
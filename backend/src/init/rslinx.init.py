@@ -1,17 +1,66 @@
-import win32ui
-import dde
+from __future__ import annotations
+
+import os
+import re
+import sys
 import time
 import json
-from typing import Dict, Any, Tuple
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'services', 'controllers', 'DDE'))
+
+from dde_transport import transport as dde
+from bridge_metrics import InstrumentedConversation, metrics
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
 
+def lock_file(f) -> None:
+    """Block until this process holds the exclusive lock on an open file."""
+    if os.name == "nt":
+        f.seek(0)
+        # LK_LOCK retries once a second for 10 seconds before raising OSError
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
 
-def check_server_available(server_name: str, topic: str) -> Tuple[bool, str]:
+
+def unlock_file(f) -> None:
+    if os.name == "nt":
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def remaining_budget(budget: float, deadline: Optional[float] = None) -> float:
+    """
+    Seconds a retry loop may spend: budget, cut short by an absolute deadline.
+
+    Args:
+        budget (float): The caller's own limit in seconds
+        deadline (float): Optional Unix time by which the caller needs an answer
+    """
+    if deadline is None:
+        return budget
+    return max(0.0, min(budget, deadline - time.time()))
+
+
+def check_server_available(server_name: str, topic: str, timeout: float = 5.0, deadline: Optional[float] = None) -> Tuple[bool, str]:
     """
     Check DDE server availability with timeout and retry logic.
     
     Args:
         server_name (str): Name of the DDE server (e.g., "RSLinx")
         topic (str): Topic name (e.g., "ExcelLink")
+        timeout (float): Seconds to keep retrying the connection
+        deadline (float): Optional Unix time the check must finish by; it shortens timeout
     
     Returns:
         Tuple[bool, str]: (success status, diagnostic message)
@@ -24,7 +73,7 @@ def check_server_available(server_name: str, topic: str) -> Tuple[bool, str]:
         test_conv = dde.CreateConversation(test_server)
         
         start_time = time.time()
-        timeout = 5  # seconds
+        timeout = remaining_budget(timeout, deadline)
         last_error = None
         
         while time.time() - start_time < timeout:
@@ -33,7 +82,7 @@ def check_server_available(server_name: str, topic: str) -> Tuple[bool, str]:
                 return True, "Connection successful"
             except dde.error as e:
                 last_error = str(e)
-                time.sleep(0.5)
+                time.sleep(min(0.5, max(0.0, start_time + timeout - time.time())))
         
         error_info = {
             "attempted_server": server_name,
@@ -54,15 +103,210 @@ def check_server_available(server_name: str, topic: str) -> Tuple[bool, str]:
         except:
             pass
 
-def initialize_dde_connection(server_name: str, topic: str, max_retries: int = 3, retry_delay: float = 1.0) -> Tuple[dde.Server, dde.Connection, str]:
+class AvailabilityBreaker:
+    """
+    Circuit breaker caching whether a DDE server/topic is reachable.
+
+    closed:    connections are attempted directly, with no pre-flight probe
+    open:      callers fail fast until the backoff expires
+    half_open: one caller is let through to test the server; success closes
+               the breaker, failure reopens it with a doubled backoff
+
+    When state_file is set the verdict is shared between processes, so
+    one-shot bridge invocations also skip a server that is known to be down.
+    Every decision reloads the file under a file lock, and the file is
+    replaced atomically, so concurrent processes neither lose an update nor
+    read a partial one.
+
+    Args:
+        key (str): Identifies the server/topic in the state file
+        base_backoff (float): Seconds the breaker stays open after the first failure
+        max_backoff (float): Upper bound for the exponential backoff
+        state_file (str): Optional JSON file shared between processes
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, key: str, base_backoff: float = 1.0, max_backoff: float = 60.0, state_file: Optional[str] = None):
+        self.key = key
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state_file = state_file
+        self.state = self.CLOSED
+        self.failures = 0
+        self.retry_at = 0.0  # wall clock, so it means the same thing in every process
+        self.last_error = ""
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _shared(self):
+        """
+        Hold the breaker for a read-modify-write: the thread lock and, with a
+        state file, an exclusive lock on '<state_file>.lock' so another
+        process cannot interleave. The shared state is reloaded first.
+        """
+        with self._lock:
+            guard = None
+            if self.state_file:
+                try:
+                    guard = open(self.state_file + ".lock", "a+b")
+                    lock_file(guard)
+                except OSError:
+                    # An unwritable or stuck lock file must not stop connections
+                    if guard is not None:
+                        guard.close()
+                    guard = None
+            try:
+                self._load()
+                yield
+            finally:
+                if guard is not None:
+                    try:
+                        unlock_file(guard)
+                    except OSError:
+                        pass
+                    guard.close()
+
+    def _load(self) -> None:
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file) as f:
+                shared = json.load(f).get(self.key)
+        except (OSError, ValueError, AttributeError):
+            return
+        if shared:
+            self.state = shared["state"]
+            self.failures = shared["failures"]
+            self.retry_at = shared["retry_at"]
+            self.last_error = shared["last_error"]
+
+    def _save(self) -> None:
+        """Write this key into the state file, replacing it atomically (other keys are kept)."""
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file) as f:
+                shared = json.load(f)
+        except (OSError, ValueError):
+            shared = {}
+        if not isinstance(shared, dict):
+            shared = {}
+        shared[self.key] = {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_at": self.retry_at,
+            "last_error": self.last_error,
+        }
+        # A reader never sees a half-written file
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix=".dde_breaker_", suffix=".tmp",
+                                             dir=os.path.dirname(os.path.abspath(self.state_file)))
+            with os.fdopen(fd, "w") as f:
+                json.dump(shared, f)
+            os.replace(temp_path, self.state_file)
+        except OSError:
+            if temp_path is not None:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def allow(self) -> Tuple[bool, str]:
+        """
+        Decide whether a caller may try to connect.
+
+        Returns:
+            Tuple[bool, str]: (allowed, reason when refused)
+        """
+        with self._shared():
+            if self.state == self.CLOSED:
+                return True, ""
+            remaining = self.retry_at - time.time()
+            if remaining <= 0:
+                # Let one trial caller through; others keep failing fast until
+                # it reports back (or its window lapses, e.g. the process died)
+                self.state = self.HALF_OPEN
+                self.retry_at = time.time() + self.base_backoff
+                self._save()
+                return True, ""
+            return False, f"circuit {self.state}, retry in {max(remaining, 0):.1f}s. Last error: {self.last_error}"
+
+    def record_success(self) -> None:
+        with self._shared():
+            if self.state != self.CLOSED or self.failures:
+                self.state = self.CLOSED
+                self.failures = 0
+                self.last_error = ""
+                self._save()
+
+    def record_failure(self, error: str) -> None:
+        with self._shared():
+            self.failures += 1
+            backoff = min(self.base_backoff * (2 ** (self.failures - 1)), self.max_backoff)
+            self.state = self.OPEN
+            self.retry_at = time.time() + backoff
+            self.last_error = error
+            self._save()
+
+    def status(self) -> Dict[str, Any]:
+        with self._shared():
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "retry_in": max(self.retry_at - time.time(), 0.0) if self.state != self.CLOSED else 0.0,
+                "last_error": self.last_error,
+            }
+
+
+_breakers: Dict[Tuple[str, str], AvailabilityBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def default_breaker_state_file(server_name: str, topic: str) -> str:
+    """Breaker state file for a server/topic in the temp dir, shared by every bridge process on the host."""
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{server_name}_{topic}")
+    return os.path.join(tempfile.gettempdir(), f"dde_breaker_{name}.json")
+
+
+def get_availability_breaker(server_name: str, topic: str) -> AvailabilityBreaker:
+    """
+    Return the process-wide breaker for a server/topic. Its verdict is shared
+    with other processes through $DDE_BREAKER_STATE, or by default through a
+    per-server/topic file in the temp dir.
+    """
+    with _breakers_lock:
+        key = (server_name, topic)
+        if key not in _breakers:
+            _breakers[key] = AvailabilityBreaker(
+                f"{server_name}|{topic}",
+                state_file=os.environ.get("DDE_BREAKER_STATE") or default_breaker_state_file(server_name, topic)
+            )
+        return _breakers[key]
+
+
+def initialize_dde_connection(server_name: str, topic: str, max_retries: int = 3, retry_delay: float = 1.0,
+                              deadline: Optional[float] = None) -> Tuple[dde.Server, dde.Connection, str]:
     """
     Initialize a DDE connection with retry logic.
+
+    Availability is decided by the server/topic's AvailabilityBreaker rather
+    than a probe: while it is closed the connection is attempted directly,
+    while it is open this returns immediately, and a half-open trial makes a
+    single attempt.
+
+    With a deadline, no attempt is made once it has passed and retries stop
+    when the next one could not start before it.
     
     Args:
         server_name (str): Name of the DDE server (e.g., "RSLinx")
         topic (str): Topic name (e.g., "ExcelLink")
         max_retries (int): Maximum number of connection attempts
         retry_delay (float): Delay between retries in seconds
+        deadline (float): Optional Unix time by which the caller needs the connection
     
     Returns:
         Tuple[dde.Server, dde.Connection, str]: (DDE server instance, DDE conversation instance, error message)
@@ -71,14 +315,23 @@ def initialize_dde_connection(server_name: str, topic: str, max_retries: int = 3
     server = None
     conversation = None
 
+    breaker = get_availability_breaker(server_name, topic)
+
+    if deadline is not None and time.time() >= deadline:
+        # Not a verdict on the server, so the breaker is left alone
+        metrics.count("expired", phase="connect")
+        return None, None, "Deadline expired before connecting"
+
     try:
-        # Check server availability first
-        server_available, diagnostic_info = check_server_available(server_name, topic)
-        if not server_available:
-            return None, None, f"DDE Server not available: {diagnostic_info}"
+        allowed, reason = breaker.allow()
+        if not allowed:
+            metrics.count("breaker_rejections")
+            return None, None, f"DDE Server not available: {reason}"
+        if breaker.state == AvailabilityBreaker.HALF_OPEN:
+            max_retries = 1
 
         # Initialize win32ui
-        win32ui.GetApp()
+        dde.GetApp()
         
         # Create DDE server
         server = dde.CreateServer()
@@ -91,19 +344,28 @@ def initialize_dde_connection(server_name: str, topic: str, max_retries: int = 3
         last_error = None
         for attempt in range(max_retries):
             try:
-                conversation.ConnectTo(server_name, topic)
+                with metrics.timed("connect"):
+                    conversation.ConnectTo(server_name, topic)
+                breaker.record_success()
                 return server, conversation, ""
             except dde.error as e:
                 last_error = str(e)
-                if attempt < max_retries - 1:
+                out_of_time = remaining_budget(retry_delay, deadline) < retry_delay
+                if attempt < max_retries - 1 and not out_of_time:
+                    metrics.count("retries", phase="connect")
                     time.sleep(retry_delay)
                     continue
                 else:
                     cleanup_dde_resources(server, conversation)
+                    breaker.record_failure(last_error)
+                    if out_of_time and attempt < max_retries - 1:
+                        metrics.count("expired", phase="connect")
+                        return None, None, f"Failed to connect after {attempt + 1} attempts before the deadline. Last error: {last_error}"
                     return None, None, f"Failed to connect after {max_retries} attempts. Last error: {last_error}"
                 
     except Exception as e:
         cleanup_dde_resources(server, conversation)
+        breaker.record_failure(str(e))
         return None, None, str(e)
 
 def cleanup_dde_resources(server: dde.Server = None, conversation: dde.Connection = None) -> None:
@@ -115,10 +377,11 @@ def cleanup_dde_resources(server: dde.Server = None, conversation: dde.Connectio
         conversation (dde.Connection): DDE conversation instance to cleanup
     """
     try:
-        if conversation:
-            del conversation
-        if server:
-            server.Destroy()
+        with metrics.timed("cleanup"):
+            if conversation:
+                del conversation
+            if server:
+                server.Destroy()
     except:
         pass
 
@@ -134,7 +397,183 @@ def validate_connection(conversation: dde.Connection, test_tag: str) -> Tuple[bo
         Tuple[bool, str]: (success status, error message if any)
     """
     try:
-        _ = conversation.Request(test_tag)
+        with metrics.timed("validate", tag=test_tag):
+            _ = conversation.Request(test_tag)
         return True, ""
     except Exception as e:
-        return False, str(e)
\ No newline at end of file
+        return False, str(e)
+
+
+class PooledConnection:
+    """A DDE server/conversation pair owned by a DDEConnectionPool."""
+
+    def __init__(self, server: dde.Server, conversation: dde.Connection):
+        now = time.monotonic()
+        self.server = server
+        self.conversation = conversation
+        self.created_at = now
+        self.last_used = now
+        self.last_validated = now
+        self.in_use = False
+
+    def close(self) -> None:
+        cleanup_dde_resources(self.server, self.conversation)
+        self.server = None
+        self.conversation = None
+
+
+class DDEConnectionPool:
+    """
+    Pool of live DDE conversations keyed by (server_name, topic).
+
+    Idle conversations are probed with validate_connection before being handed
+    out again, dead ones are dropped, and long-idle ones are evicted. DDE
+    handles are thread-affine, so maintain() must be called from the thread
+    that owns the pool (serve mode calls it whenever it is waiting for input);
+    it reconnects keys whose conversation died so the next borrow is warm.
+
+    Args:
+        probe_tag (str): Tag read by validate_connection (e.g., "DDETest")
+        validate_interval (float): Seconds an idle conversation may go unprobed
+        max_idle (float): Seconds after which an idle conversation is evicted
+        max_per_key (int): Maximum open conversations per (server_name, topic)
+        max_retries (int): Connection attempts passed to initialize_dde_connection
+        retry_delay (float): Delay between connection attempts in seconds
+    """
+
+    def __init__(self, probe_tag: str = "DDETest", validate_interval: float = 5.0,
+                 max_idle: float = 300.0, max_per_key: int = 2,
+                 max_retries: int = 3, retry_delay: float = 1.0):
+        self.probe_tag = probe_tag
+        self.validate_interval = validate_interval
+        self.max_idle = max_idle
+        self.max_per_key = max_per_key
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._entries: Dict[Tuple[str, str], List[PooledConnection]] = {}
+        self._reconnect: set = set()
+        self._lock = threading.RLock()
+
+    def _connect(self, server_name: str, topic: str, max_retries: int = None, deadline: Optional[float] = None) -> PooledConnection:
+        server, conversation, error = initialize_dde_connection(
+            server_name, topic, max_retries or self.max_retries, self.retry_delay, deadline
+        )
+        if conversation is None:
+            raise ConnectionError(error)
+        return PooledConnection(server, conversation)
+
+    def _is_alive(self, entry: PooledConnection) -> bool:
+        if time.monotonic() - entry.last_validated < self.validate_interval:
+            return True
+        alive, _ = validate_connection(entry.conversation, self.probe_tag)
+        if alive:
+            entry.last_validated = time.monotonic()
+        return alive
+
+    def acquire(self, server_name: str, topic: str, deadline: Optional[float] = None) -> PooledConnection:
+        """
+        Hand out a live conversation, connecting a new one if none is idle.
+        A deadline (Unix time) bounds the connection retries.
+
+        Raises:
+            ConnectionError: If no conversation could be established
+        """
+        key = (server_name, topic)
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            for entry in list(entries):
+                if entry.in_use:
+                    continue
+                if self._is_alive(entry):
+                    entry.in_use = True
+                    return entry
+                entries.remove(entry)
+                entry.close()
+
+            if len(entries) >= self.max_per_key:
+                raise ConnectionError(f"All {self.max_per_key} conversations to {server_name}|{topic} are busy")
+
+            try:
+                entry = self._connect(server_name, topic, deadline=deadline)
+            except ConnectionError:
+                self._reconnect.add(key)
+                raise
+            entry.in_use = True
+            entries.append(entry)
+            if key in self._reconnect:
+                metrics.count("reconnects")
+                self._reconnect.discard(key)
+            return entry
+
+    def release(self, server_name: str, topic: str, entry: PooledConnection, healthy: bool = True) -> None:
+        """
+        Return a borrowed conversation. Unhealthy ones are closed and their key
+        is scheduled for reconnection by maintain().
+        """
+        key = (server_name, topic)
+        with self._lock:
+            entry.in_use = False
+            entry.last_used = time.monotonic()
+            if healthy:
+                entry.last_validated = entry.last_used
+                return
+            entries = self._entries.get(key, [])
+            if entry in entries:
+                entries.remove(entry)
+            entry.close()
+            metrics.count("dropped")
+            self._reconnect.add(key)
+
+    @contextmanager
+    def connection(self, server_name: str, topic: str, deadline: Optional[float] = None):
+        """
+        Borrow a conversation for the duration of a with-block. An exception
+        raised inside the block marks the conversation as dead. Request/Poke
+        on the yielded conversation are timed per tag in bridge_metrics.
+        A deadline (Unix time) bounds the connection retries.
+        """
+        entry = self.acquire(server_name, topic, deadline)
+        healthy = False
+        try:
+            yield InstrumentedConversation(entry.conversation)
+            healthy = True
+        finally:
+            self.release(server_name, topic, entry, healthy)
+
+    def maintain(self) -> None:
+        """Probe idle conversations, evict dead or long-idle ones and reconnect dropped keys."""
+        now = time.monotonic()
+        with self._lock:
+            for key, entries in list(self._entries.items()):
+                for entry in list(entries):
+                    if entry.in_use:
+                        continue
+                    if now - entry.last_used > self.max_idle:
+                        entries.remove(entry)
+                        entry.close()
+                    elif not self._is_alive(entry):
+                        entries.remove(entry)
+                        entry.close()
+                        self._reconnect.add(key)
+                if not entries and key not in self._reconnect:
+                    del self._entries[key]
+
+            for key in list(self._reconnect):
+                try:
+                    # Single attempt: maintenance must not stall the caller
+                    entry = self._connect(*key, max_retries=1)
+                except ConnectionError:
+                    metrics.count("errors", phase="reconnect")
+                    continue
+                metrics.count("reconnects")
+                self._entries.setdefault(key, []).append(entry)
+                self._reconnect.discard(key)
+
+    def close_all(self) -> None:
+        """Close every pooled conversation."""
+        with self._lock:
+            for entries in self._entries.values():
+                for entry in entries:
+                    entry.close()
+            self._entries.clear()
+            self._reconnect.clear()
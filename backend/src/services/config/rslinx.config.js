@@ -1,77 +1,57 @@
 // RSLinx DDE Configuration
+import fs from "fs";
+
+// Shared with the Python bridge (DDE/tag_registry.py)
+const tagConfig = JSON.parse(
+  fs.readFileSync(new URL("./rslinx.tags.json", import.meta.url), "utf8")
+);
+
 const config = {
   // Server Settings
-  application: "RSLinx", // DDE server name
-  topic: process.env.RSLINX_TOPIC || "ExcelLink",
+  application: tagConfig.application, // DDE server name
+  // Default station; the first of RSLINX_TOPICS unless RSLINX_TOPIC is set
+  topic:
+    process.env.RSLINX_TOPIC ||
+    (process.env.RSLINX_TOPICS || "ExcelLink").split(",")[0].trim(),
+  // Pulling stations served by the bridge; with more than one, each topic
+  // runs in its own worker process (RSLINX_TOPICS=ExcelLink,Station2)
+  topics: (process.env.RSLINX_TOPICS || process.env.RSLINX_TOPIC || "ExcelLink")
+    .split(",")
+    .map((topic) => topic.trim())
+    .filter(Boolean),
 
-  // DDE Link Settings
-  defaultRow: "L1",
-  defaultColumn: "C1",
+  // Tags and their data types come from rslinx.tags.json, which the Python
+  // bridge compiles into its tag registry
+  defaultRow: tagConfig.row,
+  defaultColumn: tagConfig.column,
 
   // Tag Definitions - Using RSLinx DDE addressing format
-  tags: {
-    read: {
-      quantity: {
-        item: "Reel.RealData[0]",
-        row: "L1",
-        column: "C1",
-      },
-      completeRequest: {
-        item: "_200_GLB.BoolData[0].0",
-        row: "L1",
-        column: "C1",
-      },
-      ddeTest: {
-        item: "DDETest",
-        row: "L1",
-        column: "C1",
-      },
-    },
-    write: {
-      userName: {
-        item: "_200_GLB.StringData[0]",
-        row: "L1",
-        column: "C1",
-      },
-      moNumber: {
-        item: "_200_GLB.StringData[1]",
-        row: "L1",
-        column: "C1",
-      },
-      itemNumber: {
-        item: "_200_GLB.StringData[2]",
-        row: "L1",
-        column: "C1",
-      },
-      completeAck: {
-        item: "CompleteAck",
-        row: "L1",
-        column: "C1",
-      },
-      stepNumber: {
-        item: "_200_GLB.DintData[2]",
-        row: "L1",
-        column: "C1",
-      },
-    },
-  },
+  tags: Object.fromEntries(
+    Object.entries(tagConfig.tags).map(([group, tags]) => [
+      group,
+      Object.fromEntries(
+        Object.entries(tags).map(([name, tag]) => [
+          name,
+          { item: tag.item, row: tagConfig.row, column: tagConfig.column },
+        ])
+      ),
+    ])
+  ),
 
   // Data Type Mappings for DDE
-  dataTypes: {
-    userName: "STRING",
-    moNumber: "STRING",
-    itemNumber: "STRING",
-    completeAck: "BOOL",
-    stepNumber: "DINT",
-    quantity: "REAL",
-    completeRequest: "BOOL",
-    ddeTest: "REAL",
-  },
+  dataTypes: Object.fromEntries(
+    Object.values(tagConfig.tags).flatMap((tags) =>
+      Object.entries(tags).map(([name, tag]) => [name, tag.type])
+    )
+  ),
 
   // Connection Settings
   connection: {
     maxRetries: parseInt(process.env.DDE_MAX_RETRIES || "3"),
     retryInterval: parseInt(process.env.DDE_RETRY_INTERVAL || "5000"),
+    // Milliseconds a bridge request may take; it becomes the command's
+    // deadline, after which the bridge fails it without touching the PLC
+    requestTimeout: parseInt(process.env.DDE_REQUEST_TIMEOUT || "10000"),
   },
 
   // Cache Settings
@@ -79,6 +59,13 @@ const config = {
     enabled: process.env.DDE_CACHE_ENABLED === "true",
     updateRate: parseInt(process.env.DDE_CACHE_UPDATE_RATE || "1000"),
   },
+
+  // Pull-session recorder: samples the quantity of each pull into the
+  // pull_samples table of the application database
+  recorder: {
+    enabled: process.env.DDE_RECORD_PULLS === "true",
+    rate: parseFloat(process.env.DDE_RECORD_RATE || "10"), // samples per second
+  },
 };
 
 export default config;
@@ -0,0 +1,221 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Upper bounds of the latency buckets in seconds; a final +Inf bucket catches the rest.
+# They span a cached Request (well under a millisecond) to a ConnectTo timeout.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram. Observing is O(log buckets) and memory
+    never grows, so every call can be recorded.
+
+    Args:
+        buckets (Tuple[float, ...]): Ascending bucket upper bounds in seconds
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (max for the +Inf bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary in milliseconds plus the raw bucket counts."""
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.sum / self.count) if self.count else None,
+            "p50_ms": ms(self.quantile(0.5)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "p99_ms": ms(self.quantile(0.99)),
+            "max_ms": ms(self.max) if self.count else None,
+            "buckets": self.counts[:],
+        }
+
+
+class BridgeMetrics:
+    """
+    Per-phase latency histograms and event counters for the DDE bridge.
+
+    Phases: startup (process spawn to ready), queue (waiting for the DDE
+    thread), probe (check_dde_server), connect (each ConnectTo attempt),
+    validate (idle-conversation probe), request/poke (each DDE call),
+    cleanup (server teardown) and command (a whole dispatched command).
+
+    Every observation lands in the phase's overall histogram and, when given,
+    in a per-action and a per-tag histogram, so a slow PLC (request/poke time
+    on a few tags) can be told apart from a slow bridge (queue, connect or
+    cleanup time). Durations come from time.perf_counter(). Counters are
+    named with optional labels, e.g. count("retries", phase="connect").
+
+    The instance is shared by every module in the process (see `metrics`);
+    observations may come from any thread.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, phase: str, kind: str, label: str) -> LatencyHistogram:
+        key = (phase, kind, label)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram()
+        return histogram
+
+    def observe(self, phase: str, seconds: float, action: str = None, tag: str = None) -> None:
+        with self._lock:
+            self._histogram(phase, "phase", "").observe(seconds)
+            if action:
+                self._histogram(phase, "action", action).observe(seconds)
+            if tag:
+                self._histogram(phase, "tag", tag).observe(seconds)
+
+    @contextmanager
+    def timed(self, phase: str, action: str = None, tag: str = None):
+        """
+        Time a with-block into phase. The duration is recorded even if the
+        block raises, and the failure is counted under errors{phase=...}.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.count("errors", phase=phase)
+            raise
+        finally:
+            self.observe(phase, time.perf_counter() - start, action, tag)
+
+    def count(self, name: str, amount: int = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        All histograms and counters as plain data:
+        {uptime, buckets_ms, phases: {phase: summary}, actions: {action: {phase: summary}},
+         tags: {tag: {phase: summary}}, counters: {name: total}}
+        """
+        with self._lock:
+            phases, actions, tags = {}, {}, {}
+            for (phase, kind, label), histogram in sorted(self._histograms.items()):
+                summary = histogram.snapshot()
+                if kind == "phase":
+                    phases[phase] = summary
+                elif kind == "action":
+                    actions.setdefault(label, {})[phase] = summary
+                else:
+                    tags.setdefault(label, {})[phase] = summary
+
+            # Flat keys: "reconnects", "errors{phase=connect}"
+            counters = {}
+            for (name, labels), total in sorted(self._counters.items()):
+                if labels:
+                    name += "{" + ",".join(f"{key}={value}" for key, value in labels) + "}"
+                counters[name] = total
+
+            return {
+                "uptime": round(time.monotonic() - self.started, 3),
+                "buckets_ms": [bound * 1000 for bound in LATENCY_BUCKETS],
+                "phases": phases,
+                "actions": actions,
+                "tags": tags,
+                "counters": counters,
+            }
+
+    def prometheus(self, prefix: str = "dde_bridge") -> str:
+        """Render everything in the Prometheus text exposition format."""
+        lines: List[str] = [
+            f"# HELP {prefix}_phase_seconds Time spent per bridge phase",
+            f"# TYPE {prefix}_phase_seconds histogram",
+        ]
+        with self._lock:
+            for (phase, kind, label), histogram in sorted(self._histograms.items()):
+                labels = f'phase="{phase}"'
+                if kind != "phase":
+                    labels += f',{kind}="{_escape(label)}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_phase_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                lines.append(f'{prefix}_phase_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{prefix}_phase_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"{prefix}_phase_seconds_count{{{labels}}} {histogram.count}")
+
+            seen = set()
+            for (name, labels), total in sorted(self._counters.items()):
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# TYPE {prefix}_{name}_total counter")
+                rendered = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+                lines.append(f"{prefix}_{name}_total{{{rendered}}} {total}" if rendered else f"{prefix}_{name}_total {total}")
+
+            lines.append(f"# TYPE {prefix}_uptime_seconds gauge")
+            lines.append(f"{prefix}_uptime_seconds {time.monotonic() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class InstrumentedConversation:
+    """
+    Wraps a DDE conversation so every Request/Poke is timed per tag. Anything
+    else is forwarded to the wrapped conversation unchanged.
+    """
+
+    def __init__(self, conversation, recorder: "BridgeMetrics" = None):
+        self._conversation = conversation
+        self._metrics = recorder or metrics
+
+    def Request(self, item: str) -> str:
+        with self._metrics.timed("request", tag=item):
+            return self._conversation.Request(item)
+
+    def Poke(self, item: str, value: str) -> None:
+        with self._metrics.timed("poke", tag=item):
+            self._conversation.Poke(item, value)
+
+    def __getattr__(self, name):
+        return getattr(self._conversation, name)
+
+
+# Process-wide registry used by dde_manager.py and rslinx.init.py
+metrics = BridgeMetrics()
@@ -0,0 +1,296 @@
+import os
+import json
+import queue
+import socket
+import struct
+import threading
+import itertools
+import socketserver
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Every message is a 4-byte big-endian length followed by that many bytes of UTF-8 JSON
+HEADER = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024
+
+# The bridge does not authenticate its clients, so by default it only listens here
+LOOPBACK_HOSTS = ("127.0.0.1", "::1")
+
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    payload = json.dumps(message).encode("utf-8")
+    return HEADER.pack(len(payload)) + payload
+
+
+def read_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly size bytes, or return None if the peer closes first."""
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame(sock: socket.socket) -> Optional[bytes]:
+    """
+    Read one framed payload.
+
+    Returns:
+        Optional[bytes]: The JSON payload, or None when the connection closes
+
+    Raises:
+        ValueError: If the peer announces a frame larger than MAX_FRAME
+    """
+    header = read_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ValueError(f"Frame of {size} bytes exceeds the {MAX_FRAME} byte limit")
+    return read_exact(sock, size)
+
+
+def parse_address(address: str, allow_remote: bool = False) -> Tuple[int, Any]:
+    """
+    Parse 'tcp:HOST:PORT' or 'unix:PATH' into (socket family, address).
+
+    HOST must be a loopback address (127.0.0.1, or ::1 written as [::1])
+    unless allow_remote is set.
+
+    Raises:
+        ValueError: If the address is malformed or names a host that is not allowed
+    """
+    kind, _, rest = address.partition(":")
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        host = host.strip("[]") or "127.0.0.1"
+        if not allow_remote and host not in LOOPBACK_HOSTS:
+            raise ValueError(f"Refusing to use {host}: only {' and '.join(LOOPBACK_HOSTS)} are allowed without --allow-remote")
+        return (socket.AF_INET6 if ":" in host else socket.AF_INET), (host, int(port))
+    if kind == "unix":
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix domain sockets are not supported on this platform")
+        return socket.AF_UNIX, rest
+    raise ValueError(f"Unknown listen address: {address}")
+
+
+class SocketClient:
+    """
+    A connected socket client as seen by the BridgeServer.
+
+    send() only queues the message; a dedicated thread writes it, so a client
+    that stops reading never blocks the DDE thread. A client more than
+    max_backlog messages behind is disconnected.
+
+    Args:
+        sock (socket.socket): The client's connection
+        max_backlog (int): Queued messages before the client is dropped
+    """
+
+    def __init__(self, sock: socket.socket, max_backlog: int = 10000):
+        self.sock = sock
+        self.max_backlog = max_backlog
+        self.outbox: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def send(self, message: Dict[str, Any]) -> None:
+        """
+        Queue one message for the client.
+
+        Raises:
+            ConnectionError: If the client has fallen max_backlog messages behind
+        """
+        if self.outbox.qsize() >= self.max_backlog:
+            self._hang_up()
+            raise ConnectionError(f"Client is {self.max_backlog} messages behind")
+        self.outbox.put(message)
+
+    def close(self) -> None:
+        """Stop the writer once the queued messages are written."""
+        self.outbox.put(None)
+
+    def _hang_up(self) -> None:
+        # Also ends the handler's read loop, which disconnects the client
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _write_loop(self) -> None:
+        try:
+            while True:
+                message = self.outbox.get()
+                if message is None:
+                    break
+                self.sock.sendall(encode_frame(message))
+        except OSError:
+            self._hang_up()
+
+
+class _ClientHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        bridge = self.server.bridge
+        client = SocketClient(self.request)
+        try:
+            while True:
+                payload = read_frame(self.request)
+                if payload is None:
+                    break
+                bridge.submit(client, payload.decode("utf-8"))
+        except (OSError, ValueError):
+            pass
+        finally:
+            bridge.disconnect(client)
+            client.close()
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _TCP6Server(_TCPServer):
+    address_family = socket.AF_INET6
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class BridgeSocketServer:
+    """
+    Accepts local clients and forwards their framed commands to a BridgeServer.
+
+    Each client gets its own threads for reading and writing; every command
+    still runs on the bridge's single DDE thread, so all clients share one
+    set of conversations.
+
+    Args:
+        address (str): 'tcp:127.0.0.1:PORT' or 'unix:PATH'
+        bridge (BridgeServer): The dispatcher from dde_manager.py
+        allow_remote (bool): Accept a TCP host other than the loopback address
+    """
+
+    def __init__(self, address: str, bridge, allow_remote: bool = False):
+        family, bind_to = parse_address(address, allow_remote)
+        if family == socket.AF_INET:
+            server_class = _TCPServer
+        elif family == socket.AF_INET6:
+            server_class = _TCP6Server
+        else:
+            server_class = _UnixServer
+            if os.path.exists(bind_to):
+                os.unlink(bind_to)  # left behind by a previous bridge
+        self.unix_path = bind_to if family == getattr(socket, "AF_UNIX", None) else None
+        self.server = server_class(bind_to, _ClientHandler)
+        self.server.bridge = bridge
+        self.address = self.server.server_address
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+
+
+class BridgeClient:
+    """
+    Client for a bridge started with --listen.
+
+    Replies are matched to requests by id. Events pushed under a subscription's
+    id are passed to the callback given when subscribing.
+
+    Args:
+        address (str): 'tcp:127.0.0.1:PORT' or 'unix:PATH'
+        timeout (float): Default seconds to wait for a reply
+    """
+
+    def __init__(self, address: str, timeout: float = 10.0):
+        family, connect_to = parse_address(address, allow_remote=True)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(connect_to)
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._listeners: Dict[Any, Callable[[Dict[str, Any]], None]] = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def _read_loop(self) -> None:
+        try:
+            while True:
+                payload = read_frame(self.sock)
+                if payload is None:
+                    break
+                message = json.loads(payload)
+                request_id = message.pop("id", None)
+                if "event" in message:
+                    listener = self._listeners.get(request_id)
+                    if listener:
+                        listener(message)
+                    continue
+                with self._lock:
+                    waiter = self._pending.pop(request_id, None)
+                if waiter:
+                    waiter["reply"] = message
+                    waiter["done"].set()
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                waiters, self._pending = self._pending, {}
+            for waiter in waiters.values():
+                waiter["reply"] = {"error": "Bridge connection closed"}
+                waiter["done"].set()
+
+    def request(self, command: Dict[str, Any], timeout: float = None,
+                on_event: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+        """
+        Send a command and wait for its reply.
+
+        Raises:
+            TimeoutError: If no reply arrives within timeout
+        """
+        request_id = next(self._ids)
+        waiter = {"done": threading.Event(), "reply": None}
+        with self._lock:
+            self._pending[request_id] = waiter
+        if on_event:
+            self._listeners[request_id] = on_event
+        with self._send_lock:
+            self.sock.sendall(encode_frame(dict(command, id=request_id)))
+        if not waiter["done"].wait(timeout or self.timeout):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise TimeoutError(f"No reply to {command.get('action')} within {timeout or self.timeout}s")
+        return waiter["reply"]
+
+    def subscribe(self, items, on_event: Callable[[Dict[str, Any]], None], interval: int = 100, **command) -> Any:
+        """Open a hot link; returns the subscription id to pass to unsubscribe()."""
+        reply = self.request(dict(command, action="subscribe", items=list(items), interval=interval), on_event=on_event)
+        if reply.get("error"):
+            raise RuntimeError(reply["error"])
+        return reply["subscription"]
+
+    def unsubscribe(self, subscription: Any) -> Dict[str, Any]:
+        self._listeners.pop(subscription, None)
+        return self.request({"action": "unsubscribe", "subscription": subscription})
+
+    def close(self) -> None:
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
@@ -5,25 +5,35 @@ import { dirname, join } from "node:path";
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
 
+// Parsed links, so each link is only run through the regex once
+const parsedLinks = new Map();
+
 export class DDEClient {
   constructor() {
     this.pythonScript = join(__dirname, "dde_bridge.py");
   }
 
   parseDDELink(link) {
+    const cached = parsedLinks.get(link);
+    if (cached) {
+      return { ...cached };
+    }
+
     // Parse Excel DDE link format: [ExcelLink]_200_GLB.DintData[2],L1,C1
     const match = link.match(/\[([^\]]+)\]([^,]+),([^,]+),([^,]+)/);
     if (!match) {
       throw new Error("Invalid DDE link format");
     }
 
-    return {
+    const parsed = {
       application: "RSLinx", // The actual DDE server name
       topic: match[1], // ExcelLink
       item: match[2], // _200_GLB.DintData[2]
       row: match[3], // L1
       column: match[4], // C1
     };
+    parsedLinks.set(link, parsed);
+    return { ...parsed };
   }
 
   async readTag(ddeLink) {
@@ -1,54 +1,36 @@
+import time
+
+STARTED = time.perf_counter()
+
 import sys
+import os
 import json
-import win32ui
-import dde
-import time
 
-def check_dde_server(server_name, topic):
-    """
-    Attempt to verify DDE server availability and provide diagnostic information.
-    """
-    try:
-        # Create a temporary server for testing
-        test_server = dde.CreateServer()
-        test_server.Create("DDETest", dde.CBF_FAIL_EXECUTES | dde.CBF_FAIL_ADVISES)
-        
-        # Create a conversation for testing
-        test_conv = dde.CreateConversation(test_server)
-        
-        # Try to connect with a timeout
-        start_time = time.time()
-        timeout = 5  # seconds
-        last_error = None
-        
-        while time.time() - start_time < timeout:
-            try:
-                test_conv.ConnectTo(server_name, topic)
-                return True, "Connection successful"
-            except dde.error as e:
-                last_error = str(e)
-                time.sleep(0.5)
-        
-        error_info = {
-            "attempted_server": server_name,
-            "attempted_topic": topic,
-            "last_error": last_error,
-            "timeout": timeout
-        }
-        return False, json.dumps(error_info)
-        
-    except Exception as e:
-        return False, f"Server check failed: {str(e)}"
-    finally:
-        try:
-            if 'test_conv' in locals():
-                del test_conv
-            if 'test_server' in locals():
-                test_server.Destroy()
-        except:
-            pass
-
-def read_dde_value(parsed_link):
+from dde_transport import transport as dde
+
+RSLINX_INIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'init', 'rslinx.init.py')
+
+_rslinx_init = None
+
+def load_rslinx_init():
+    """Load init/rslinx.init.py once (its file name is not importable as a module)"""
+    global _rslinx_init
+    if _rslinx_init is None:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location('rslinx_init', RSLINX_INIT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _rslinx_init = module
+    return _rslinx_init
+
+def dde_error(parsed_link, error):
+    """Failed-read reply naming the server, topic and item"""
+    return {
+        'value': None,
+        'error': f"DDE Error: {str(error)}\nServer: {parsed_link['application']}\nTopic: {parsed_link['topic']}\nItem: {parsed_link['item']}"
+    }
+
+def read_dde_value(parsed_link, pool=None):
     """
     Read a value from DDE using the parsed link components.
     
@@ -61,44 +43,37 @@ def read_dde_value(parsed_link):
                 'row': 'L1',               # Not used for RSLinx
                 'column': 'C1'             # Not used for RSLinx
             }
+        pool (DDEConnectionPool): Optional pool from rslinx.init.py to borrow
+            a live conversation from instead of connecting for this one read
     """
-    server = None
-    conversation = None
-    
-    try:
-        # First check if the DDE server is available
-        server_available, diagnostic_info = check_dde_server(
-            parsed_link['application'], 
-            parsed_link['topic']
-        )
-        
-        if not server_available:
+    if pool is not None:
+        try:
+            with pool.connection(parsed_link['application'], parsed_link['topic']) as pooled:
+                value = pooled.Request(parsed_link['item'])
+            return {
+                'value': value,
+                'error': None
+            }
+        except dde.error as e:
+            return dde_error(parsed_link, e)
+        except Exception as e:
             return {
                 'value': None,
-                'error': f"DDE Server not available: {diagnostic_info}"
+                'error': f"Unexpected error: {str(e)}"
             }
-        
-        # Initialize win32ui
-        win32ui.GetApp()
-        
-        # Create DDE server
-        server = dde.CreateServer()
-        server.Create("DDEClient", dde.CBF_FAIL_EXECUTES | dde.CBF_FAIL_ADVISES)
-        
-        # Create a DDE conversation using the server
-        conversation = dde.CreateConversation(server)
-        
-        # Connect to RSLinx with retries
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                conversation.ConnectTo(parsed_link['application'], parsed_link['topic'])
-                break
-            except dde.error as e:
-                if attempt == max_retries - 1:
-                    raise
-                time.sleep(1)
-        
+
+    # Connecting goes through rslinx.init.py like every other bridge: its
+    # availability breaker is shared through a state file ($DDE_BREAKER_STATE,
+    # or one per server/topic in the temp dir), so a fresh process fails fast
+    rslinx_init = load_rslinx_init()
+    server, conversation, error = rslinx_init.initialize_dde_connection(parsed_link['application'], parsed_link['topic'])
+    if conversation is None:
+        return {
+            'value': None,
+            'error': error
+        }
+
+    try:
         # For RSLinx, we just use the item/tag directly
         value = conversation.Request(parsed_link['item'])
         
@@ -108,26 +83,51 @@ def read_dde_value(parsed_link):
         }
         
     except dde.error as e:
-        return {
-            'value': None,
-            'error': f"DDE Error: {str(e)}\nServer: {parsed_link['application']}\nTopic: {parsed_link['topic']}\nItem: {parsed_link['item']}"
-        }
+        return dde_error(parsed_link, e)
     except Exception as e:
         return {
             'value': None,
             'error': f"Unexpected error: {str(e)}"
         }
     finally:
-        try:
-            if conversation:
-                del conversation
-            if server:
-                server.Destroy()
-        except:
-            pass
+        rslinx_init.cleanup_dde_resources(server, conversation)
+
+def bench_startup(argv):
+    """Report cold-start import and first-read times of this script (see startup_bench)"""
+    import argparse
+    from startup_bench import run_startup_benchmark
+
+    parser = argparse.ArgumentParser(description='Startup benchmark for dde_bridge.py')
+    parser.add_argument('--item', default=os.environ.get('DDE_PROBE_TAG', 'DDETest'), help='Tag read by every run')
+    parser.add_argument('--runs', type=int, default=10, help='Spawns measured')
+    parser.add_argument('--baseline', metavar='<filepath>', help='JSON file of stored startup medians to compare against (created on first use)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Fractional slowdown over the baseline reported as a regression')
+    args = parser.parse_args(argv)
+
+    report = run_startup_benchmark(
+        os.path.abspath(__file__),
+        {'application': 'RSLinx', 'topic': 'ExcelLink', 'item': args.item},
+        runs=args.runs,
+        baseline=args.baseline,
+        tolerance=args.tolerance
+    )
+    print(json.dumps(report, indent=2))
+    if report.get('regressions'):
+        sys.exit(1)
 
 def main():
     """Main entry point for the DDE bridge script."""
+    if sys.argv[1:2] == ['--bench-child']:
+        ready = time.perf_counter()
+        result = read_dde_value(json.loads(sys.argv[2]))
+        done = time.perf_counter()
+        from startup_bench import report_child
+        report_child(STARTED, ready, done, result)
+        return
+    if sys.argv[1:2] == ['--bench-startup']:
+        bench_startup(sys.argv[2:])
+        return
+
     try:
         # Check if we received a tag name argument
         if len(sys.argv) != 2:
@@ -0,0 +1,200 @@
+import json
+import asyncio
+import itertools
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+# Actions whose request id keeps receiving events after the reply
+STREAMING_ACTIONS = ("subscribe", "handshake")
+
+
+class AsyncDDEScheduler:
+    """
+    Asyncio front end for a BridgeServer.
+
+    DDE conversations are thread-affine and blocking, so the bridge runs on one
+    dedicated worker thread and every request reaches it through its queue.
+    Async callers get a future per request with its own timeout; identical
+    reads already in flight are coalesced by the bridge, so many callers
+    asking for the same tag at once cost a single Request.
+
+    The scheduler is itself the bridge client: replies are routed back to
+    their futures by request id, like BridgeClient does over a socket.
+
+    Args:
+        bridge (BridgeServer): Dispatcher from dde_manager.py (or a TopicRouter)
+        default_timeout (float): Seconds to wait for a reply when none is given
+    """
+
+    def __init__(self, bridge, default_timeout: float = 10.0):
+        self.bridge = bridge
+        self.default_timeout = default_timeout
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._listeners: Dict[int, Tuple[asyncio.AbstractEventLoop, Callable[[Dict[str, Any]], None]]] = {}
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the DDE worker thread."""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self.bridge.run, name="dde-worker", daemon=True)
+            self._worker.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker once the requests already queued have run."""
+        if self._worker is not None:
+            self.bridge.stop()
+            self._worker.join(timeout)
+            self._worker = None
+
+    def wait(self) -> None:
+        """Block until the worker exits (interruptible with Ctrl+C)."""
+        while self._worker is not None and self._worker.is_alive():
+            self._worker.join(0.5)
+
+    def send(self, message: Dict[str, Any]) -> None:
+        """Called by the bridge on the worker thread with a reply or event."""
+        request_id = message.get("id")
+        if "event" in message:
+            listener = self._listeners.get(request_id)
+            if listener:
+                loop, on_event = listener
+                loop.call_soon_threadsafe(on_event, message)
+            return
+
+        with self._lock:
+            waiter = self._pending.pop(request_id, None)
+        if waiter:
+            loop, future = waiter
+            loop.call_soon_threadsafe(self._resolve, future, message)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, message: Dict[str, Any]) -> None:
+        if not future.done():
+            future.set_result(message)
+
+    async def submit(self, command: Dict[str, Any], timeout: float = None,
+                     on_event: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+        """
+        Queue a command for the worker and wait for its reply.
+
+        Returns:
+            Dict[str, Any]: The bridge reply (including its 'id'), or
+            {'error': ...} if it timed out. A timed-out request is abandoned,
+            not cancelled: the worker may still run it.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = (loop, future)
+        if on_event:
+            self._listeners[request_id] = (loop, on_event)
+        if command.get("action") == "unsubscribe":
+            self._listeners.pop(command.get("subscription"), None)
+
+        self.bridge.submit(self, dict(command, id=request_id))
+
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            self._listeners.pop(request_id, None)
+            return {
+                'id': request_id,
+                'error': f"Timed out after {timeout}s waiting for {command.get('action')}"
+            }
+
+    async def read(self, item: str, timeout: float = None, **command) -> Dict[str, Any]:
+        return await self.submit(dict(command, action='read', item=item), timeout)
+
+    async def read_many(self, items: Iterable[str], timeout: float = None, **command) -> Dict[str, Any]:
+        return await self.submit(dict(command, action='read_many', items=list(items)), timeout)
+
+    async def write(self, item: str, value: Any, timeout: float = None, **command) -> Dict[str, Any]:
+        return await self.submit(dict(command, action='write', item=item, value=value), timeout)
+
+    async def write_many(self, items, timeout: float = None, **command) -> Dict[str, Any]:
+        return await self.submit(dict(command, action='write_many', items=items), timeout)
+
+    async def subscribe(self, items: Iterable[str], on_event: Callable[[Dict[str, Any]], None],
+                        interval: int = 100, timeout: float = None, **command) -> Dict[str, Any]:
+        """
+        Open a hot link; on_event runs on the event loop for each change. Pass
+        the reply's 'subscription' id to unsubscribe().
+        """
+        return await self.submit(
+            dict(command, action='subscribe', items=list(items), interval=interval),
+            timeout,
+            on_event
+        )
+
+    async def unsubscribe(self, subscription: int, timeout: float = None) -> Dict[str, Any]:
+        return await self.submit({'action': 'unsubscribe', 'subscription': subscription}, timeout)
+
+
+async def serve_lines(scheduler: AsyncDDEScheduler, stream_in, client) -> None:
+    """
+    JSON-lines front end over the scheduler (dde_manager.py --serve).
+
+    Each line read from stream_in is one command; it runs as its own task, so
+    a slow command never holds up the ones behind it and every reply goes to
+    client (any object with send(message)) under the caller's own 'id' as soon
+    as it is ready. The 'subscription' and 'watching' ids of a stream are the
+    caller's request id too, as unsubscribe expects. Returns once stream_in
+    closes and every outstanding command has been answered.
+
+    Args:
+        scheduler (AsyncDDEScheduler): Started scheduler the commands go through
+        stream_in: Text stream of commands (sys.stdin)
+        client: Receives every reply and event
+    """
+    loop = asyncio.get_running_loop()
+    streams: Dict[Any, int] = {}
+    tasks = set()
+
+    async def relay(command: Dict[str, Any]) -> None:
+        request_id = command.get("id")
+        action = command.get("action")
+        on_event = None
+        if action in STREAMING_ACTIONS:
+            def on_event(event):
+                client.send(dict(event, id=request_id))
+        elif action == "unsubscribe" and command.get("subscription") in streams:
+            command = dict(command, subscription=streams.pop(command["subscription"]))
+
+        reply = await scheduler.submit(command, on_event=on_event)
+        stream_id = reply.get("id")
+        if action in STREAMING_ACTIONS and not reply.get("error"):
+            streams[request_id] = stream_id
+        reply = dict(reply, id=request_id)
+        for field in ("subscription", "watching"):
+            if field in reply and reply[field] == stream_id:
+                reply[field] = request_id
+        client.send(reply)
+
+    while True:
+        # A blocking read on the default executor works for pipes and consoles alike
+        line = await loop.run_in_executor(None, stream_in.readline)
+        if not line:
+            break
+        if not line.strip():
+            continue
+        try:
+            command = json.loads(line)
+        except ValueError as e:
+            client.send({"error": str(e), "id": None})
+            continue
+        if not isinstance(command, dict):
+            client.send({"error": "Command must be a JSON object", "id": None})
+            continue
+        task = loop.create_task(relay(command))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import random
+import threading
+from typing import Any, Dict, List
+
+from dde_transport import DDETransport
+from tag_registry import get_registry
+
+
+def simulated_tags() -> Dict[str, str]:
+    """item -> declared data type of every tag in the shared tag table (rslinx.tags.json)."""
+    return {definition.item: definition.data_type for definition in get_registry().tags.values()}
+
+# stepNumber value the checkout sequence ends on; the pull starts there
+PULL_START_STEP = 4
+
+
+class SimulatedDDEError(Exception):
+    """Raised by the simulator where pywin32 would raise dde.error."""
+
+
+def format_value(data_type: str, value: Any) -> str:
+    """Render a value the way RSLinx returns it over DDE."""
+    if data_type == "BOOL":
+        return "1" if value else "0"
+    if data_type == "DINT":
+        return str(int(value))
+    if data_type == "REAL":
+        return repr(round(float(value), 4))
+    return str(value)
+
+
+def parse_value(data_type: str, text: str) -> Any:
+    """Interpret a poked string for a declared data type."""
+    if data_type == "BOOL":
+        return text.strip().lower() in ("1", "true", "-1", "on")
+    if data_type == "DINT":
+        return int(float(text))
+    if data_type == "REAL":
+        return float(text)
+    return text
+
+
+class EncoderModel:
+    """
+    Drives the pulled-cable quantity.
+
+    A pull starts when the checkout sequence writes its last stepNumber. The
+    quantity then advances at `rate` units per second (plus optional noise)
+    until `pull_length` is reached, when completeRequest is raised. Writing
+    completeAck ends the handshake and resets the machine for the next pull.
+
+    Args:
+        rate (float): Quantity units per second while pulling
+        pull_length (float): Quantity at which the PLC raises completeRequest (0 = never)
+        noise (float): Fractional random variation applied to the rate
+    """
+
+    def __init__(self, rate: float = 2.0, pull_length: float = 50.0, noise: float = 0.0):
+        self.rate = rate
+        self.pull_length = pull_length
+        self.noise = noise
+        self.pulling = False
+        self._last = time.monotonic()
+
+    def start(self, plc: "SimulatedPLC") -> None:
+        plc.values[plc.quantity_tag] = 0.0
+        plc.values[plc.complete_request_tag] = False
+        self.pulling = True
+        self._last = time.monotonic()
+
+    def advance(self, plc: "SimulatedPLC") -> None:
+        now = time.monotonic()
+        elapsed, self._last = now - self._last, now
+        if not self.pulling:
+            return
+        rate = self.rate * (1 + random.uniform(-self.noise, self.noise)) if self.noise else self.rate
+        quantity = plc.values[plc.quantity_tag] + rate * elapsed
+        if self.pull_length and quantity >= self.pull_length:
+            quantity = self.pull_length
+            self.pulling = False
+            plc.values[plc.complete_request_tag] = True
+        plc.values[plc.quantity_tag] = quantity
+
+
+class SimulatedPLC:
+    """
+    In-memory tag table standing in for RSLinx and the PLC.
+
+    Args:
+        tags (Dict[str, str]): item -> data type (REAL, DINT, BOOL, STRING); defaults to
+            the shared tag table, whose quantity, completeRequest, completeAck and
+            stepNumber tags drive the checkout handshake
+        topics (List[str]): Topics RSLinx accepts connections on
+        encoder (EncoderModel): Quantity model, or None for a static table
+        latency (float): Seconds added to every Request/Poke
+        jitter (float): Maximum random seconds added on top of latency
+        connect_latency (float): Seconds added to every ConnectTo
+        fail_rate (float): Probability that a Request/Poke raises
+        disconnect_rate (float): Probability that a call drops its conversation
+        available (bool): False makes every ConnectTo fail, as if RSLinx is down
+    """
+
+    def __init__(self, tags: Dict[str, str] = None, topics: List[str] = None,
+                 encoder: EncoderModel = None, latency: float = 0.0, jitter: float = 0.0,
+                 connect_latency: float = 0.0, fail_rate: float = 0.0,
+                 disconnect_rate: float = 0.0, available: bool = True):
+        self.tags = dict(tags or simulated_tags())
+        registry = get_registry()
+        self.quantity_tag = registry.item("quantity")
+        self.complete_request_tag = registry.item("completeRequest")
+        self.complete_ack_tag = registry.item("completeAck")
+        self.step_number_tag = registry.item("stepNumber")
+        self.topics = list(topics or ["ExcelLink"])
+        self.encoder = encoder
+        self.latency = latency
+        self.jitter = jitter
+        self.connect_latency = connect_latency
+        self.fail_rate = fail_rate
+        self.disconnect_rate = disconnect_rate
+        self.available = available
+        self.values = {item: parse_value(data_type, "0") for item, data_type in self.tags.items()}
+        self.counters = {"connects": 0, "requests": 0, "pokes": 0, "faults": 0}
+        self._lock = threading.Lock()
+
+    def _delay(self, base: float) -> None:
+        delay = base + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _inject_fault(self, conversation: "SimulatedConversation", item: str) -> None:
+        if self.disconnect_rate and random.random() < self.disconnect_rate:
+            conversation.connected = False
+            self.counters["faults"] += 1
+            raise SimulatedDDEError("Simulated disconnect")
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.counters["faults"] += 1
+            raise SimulatedDDEError(f"Simulated failure on {item}")
+
+    def connect(self, server_name: str, topic: str) -> None:
+        self._delay(self.connect_latency)
+        self.counters["connects"] += 1
+        if not self.available or server_name != "RSLinx" or topic not in self.topics:
+            raise SimulatedDDEError("ConnectTo failed")
+
+    def request(self, conversation: "SimulatedConversation", item: str) -> str:
+        self._delay(self.latency)
+        with self._lock:
+            self.counters["requests"] += 1
+            self._inject_fault(conversation, item)
+            if item not in self.tags:
+                raise SimulatedDDEError(f"Request failed for {item}")
+            if self.encoder:
+                self.encoder.advance(self)
+            return format_value(self.tags[item], self.values[item])
+
+    def poke(self, conversation: "SimulatedConversation", item: str, text: str) -> None:
+        self._delay(self.latency)
+        with self._lock:
+            self.counters["pokes"] += 1
+            self._inject_fault(conversation, item)
+            if item not in self.tags:
+                raise SimulatedDDEError(f"Poke failed for {item}")
+            try:
+                value = parse_value(self.tags[item], text)
+            except ValueError:
+                raise SimulatedDDEError(f"Poke failed for {item}: invalid {self.tags[item]} value '{text}'")
+            self.values[item] = value
+            self._react(item, value)
+
+    def _react(self, item: str, value: Any) -> None:
+        """PLC logic for the checkout handshake."""
+        if not self.encoder:
+            return
+        if item == self.step_number_tag and value == PULL_START_STEP:
+            self.encoder.start(self)
+        elif item == self.complete_ack_tag and value and self.values[self.complete_request_tag]:
+            self.values[self.complete_request_tag] = False
+
+
+class SimulatedServer:
+    def __init__(self, plc: SimulatedPLC):
+        self.plc = plc
+        self.name = None
+
+    def Create(self, name: str, flags: int = 0) -> None:
+        self.name = name
+
+    def Destroy(self) -> None:
+        self.name = None
+
+
+class SimulatedConversation:
+    def __init__(self, plc: SimulatedPLC):
+        self.plc = plc
+        self.connected = False
+
+    def ConnectTo(self, server_name: str, topic: str) -> None:
+        self.plc.connect(server_name, topic)
+        self.connected = True
+
+    def Connected(self) -> bool:
+        return self.connected
+
+    def _check(self) -> None:
+        if not self.connected or not self.plc.available:
+            self.connected = False
+            raise SimulatedDDEError("Conversation is not connected")
+
+    def Request(self, item: str) -> str:
+        self._check()
+        return self.plc.request(self, item)
+
+    def Poke(self, item: str, value: str) -> None:
+        self._check()
+        self.plc.poke(self, item, value)
+
+
+class SimulatedTransport(DDETransport):
+    """DDE transport backed by a SimulatedPLC in this process."""
+
+    name = "sim"
+    error = SimulatedDDEError
+
+    def __init__(self, plc: SimulatedPLC = None):
+        self.plc = plc or SimulatedPLC(encoder=EncoderModel())
+
+    @classmethod
+    def from_env(cls) -> "SimulatedTransport":
+        """
+        Build a simulator from $DDE_SIM_CONFIG, a JSON file (or inline JSON) such as
+        {"latency": 0.005, "fail_rate": 0.01, "encoder": {"rate": 3.0, "pull_length": 120}}
+
+        The simulated RSLinx accepts $DDE_TOPIC (default "ExcelLink"). A "stations"
+        entry overrides settings for one topic's process, e.g.
+        {"stations": {"Station2": {"latency": 0.5, "available": false}}}
+        """
+        config = {}
+        source = os.environ.get("DDE_SIM_CONFIG")
+        if source:
+            if source.lstrip().startswith("{"):
+                config = json.loads(source)
+            else:
+                with open(source) as f:
+                    config = json.load(f)
+        topic = os.environ.get("DDE_TOPIC", "ExcelLink")
+        config.update(config.pop("stations", {}).get(topic, {}))
+        config.setdefault("topics", [topic])
+        encoder = config.pop("encoder", {})
+        plc = SimulatedPLC(encoder=EncoderModel(**encoder) if encoder is not None else None, **config)
+        return cls(plc)
+
+    def CreateServer(self) -> SimulatedServer:
+        return SimulatedServer(self.plc)
+
+    def CreateConversation(self, server: SimulatedServer) -> SimulatedConversation:
+        return SimulatedConversation(self.plc)
@@ -0,0 +1,129 @@
+import os
+import importlib
+from abc import ABC, abstractmethod
+
+
+class DDETransport(ABC):
+    """
+    Interface over the DDE calls the bridge makes.
+
+    Method and attribute names follow pywin32's dde module so call sites read
+    the same whichever backend is active:
+
+        server = transport.CreateServer()
+        server.Create("DDEClient", transport.CBF_FAIL_EXECUTES | transport.CBF_FAIL_ADVISES)
+        conversation = transport.CreateConversation(server)
+        conversation.ConnectTo("RSLinx", "ExcelLink")
+        conversation.Request(item) / conversation.Poke(item, value)
+        server.Destroy()
+
+    Errors raised by a backend are instances of transport.error.
+    """
+
+    name = "base"
+    error = Exception
+    CBF_FAIL_EXECUTES = 0x00008000
+    CBF_FAIL_ADVISES = 0x00004000
+
+    def GetApp(self) -> object:
+        """Initialize the host application object (win32ui.GetApp for pywin32)."""
+        return None
+
+    @abstractmethod
+    def CreateServer(self) -> object:
+        """Create an uninitialized DDE server object."""
+
+    @abstractmethod
+    def CreateConversation(self, server: object) -> object:
+        """Create an unconnected conversation on server."""
+
+
+class Win32Transport(DDETransport):
+    """pywin32 backend. win32ui and dde are only imported on first use, so the
+    bridge modules can be imported on hosts without pywin32."""
+
+    name = "win32"
+
+    def __init__(self):
+        self._dde = None
+        self._win32ui = None
+
+    def _load(self):
+        if self._dde is None:
+            self._win32ui = importlib.import_module("win32ui")
+            self._dde = importlib.import_module("dde")
+        return self._dde
+
+    @property
+    def error(self):
+        return self._load().error
+
+    @property
+    def CBF_FAIL_EXECUTES(self):
+        return self._load().CBF_FAIL_EXECUTES
+
+    @property
+    def CBF_FAIL_ADVISES(self):
+        return self._load().CBF_FAIL_ADVISES
+
+    def GetApp(self):
+        self._load()
+        return self._win32ui.GetApp()
+
+    def CreateServer(self):
+        return self._load().CreateServer()
+
+    def CreateConversation(self, server):
+        return self._load().CreateConversation(server)
+
+
+_active = None
+
+
+def create_transport(name: str) -> DDETransport:
+    """
+    Build a transport by name.
+
+    Args:
+        name (str): "win32" for RSLinx via pywin32, "sim" for the in-process simulator
+
+    Returns:
+        DDETransport: The new transport
+    """
+    if name == "win32":
+        return Win32Transport()
+    if name == "sim":
+        from dde_simulator import SimulatedTransport
+        return SimulatedTransport.from_env()
+    raise ValueError(f"Unknown DDE transport: {name}")
+
+
+def get_transport() -> DDETransport:
+    """Return the active transport, defaulting to $DDE_TRANSPORT (or "win32")."""
+    global _active
+    if _active is None:
+        _active = create_transport(os.environ.get("DDE_TRANSPORT", "win32"))
+    return _active
+
+
+def use_transport(transport) -> DDETransport:
+    """
+    Switch the active transport.
+
+    Args:
+        transport (DDETransport | str): A transport instance or a name for create_transport
+    """
+    global _active
+    _active = create_transport(transport) if isinstance(transport, str) else transport
+    return _active
+
+
+class _TransportProxy:
+    """Forwards attribute access to whichever transport is active at call time."""
+
+    def __getattr__(self, name):
+        return getattr(get_transport(), name)
+
+
+# Modules use `from dde_transport import transport as dde` in place of `import dde`
+transport = _TransportProxy()
@@ -0,0 +1,234 @@
+import math
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from tag_registry import get_registry
+
+
+class RingBuffer:
+    """
+    Fixed-capacity (timestamp, value) buffer backed by two float arrays.
+
+    Timestamps are time.monotonic() seconds. Once full, each append
+    overwrites the oldest sample, so memory never grows.
+
+    Args:
+        capacity (int): Number of samples kept
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, timestamp: float, value: float) -> None:
+        index = (self.start + self.count) % self.capacity
+        self.times[index] = timestamp
+        self.values[index] = value
+        if self.count < self.capacity:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        if not self.count:
+            return None
+        index = (self.start + self.count - 1) % self.capacity
+        return self.times[index], self.values[index]
+
+    def since(self, timestamp: float) -> Tuple[List[float], List[float]]:
+        """Samples taken at or after timestamp, oldest first."""
+        times, values = [], []
+        # Walk backwards from the newest sample; stop at the first older one
+        for offset in range(self.count - 1, -1, -1):
+            index = (self.start + offset) % self.capacity
+            if self.times[index] < timestamp:
+                break
+            times.append(self.times[index])
+            values.append(self.values[index])
+        times.reverse()
+        values.reverse()
+        return times, values
+
+
+def slope(times: List[float], values: List[float]) -> Optional[float]:
+    """Least-squares slope of values over times, or None with fewer than two samples."""
+    n = len(times)
+    if n < 2:
+        return None
+    mean_t = sum(times) / n
+    mean_v = sum(values) / n
+    var_t = sum((t - mean_t) ** 2 for t in times)
+    if var_t == 0:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / var_t
+
+
+class EncoderSampler:
+    """
+    Samples the pulled-cable quantity at a fixed rate into a RingBuffer and
+    derives pull analytics from it.
+
+    Sampling runs on the DDE thread through sample_due(), like the scan poller.
+    A drop in quantity (the PLC resetting it for the next pull) marks the
+    start of a new pull; analytics only look at samples since then.
+
+    Args:
+        item (str): DDE item holding the quantity (default: the quantity tag of the
+            shared tag table)
+        rate (float): Samples per second
+        window (float): Seconds of history kept in the ring buffer
+        velocity_window (float): Seconds of samples fitted for velocity
+        stall_time (float): Seconds without movement after which a moving pull counts as stalled
+        stall_velocity (float): Speed (units/s) below which the reel counts as stopped
+        server_name (str): Name of the DDE server (e.g., "RSLinx")
+        topic (str): Topic name (e.g., "ExcelLink")
+    """
+
+    def __init__(self, item: str = None, rate: float = 20.0, window: float = 600.0,
+                 velocity_window: float = 1.0, stall_time: float = 2.0, stall_velocity: float = 0.05,
+                 server_name: str = "RSLinx", topic: str = "ExcelLink"):
+        self.item = item or get_registry().item("quantity")
+        self.interval = 1.0 / rate
+        self.buffer = RingBuffer(max(int(rate * window), 2))
+        self.velocity_window = velocity_window
+        self.stall_time = stall_time
+        self.stall_velocity = stall_velocity
+        self.server_name = server_name
+        self.topic = topic
+        self.next_due = time.monotonic()
+        self.pull_started = time.monotonic()
+        self.last_moved = None
+        self.errors = 0
+        self.last_error = None
+        # Converts monotonic sample times to wall clock for reporting
+        self._wall_offset = time.time() - time.monotonic()
+
+    def record(self, timestamp: float, value: float) -> None:
+        latest = self.buffer.latest()
+        if latest is not None and value < latest[1]:
+            self.pull_started = timestamp
+            self.last_moved = None
+        elif latest is not None and value > latest[1]:
+            self.last_moved = timestamp
+        self.buffer.append(timestamp, value)
+
+    def sample_due(self, pool) -> None:
+        """Take one sample if the sampling period has elapsed."""
+        now = time.monotonic()
+        if now < self.next_due:
+            return
+        # Keep a fixed cadence; skip missed slots instead of bursting to catch up
+        self.next_due += self.interval
+        if self.next_due <= now:
+            self.next_due = now + self.interval
+
+        try:
+            with pool.connection(self.server_name, self.topic) as conversation:
+                raw = conversation.Request(self.item)
+            self.record(time.monotonic(), float(raw))
+            self.last_error = None
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+
+    def _velocity(self, end: float) -> Optional[float]:
+        times, values = self.buffer.since(max(end - self.velocity_window, self.pull_started))
+        pairs = [(t, v) for t, v in zip(times, values) if t <= end]
+        if len(pairs) < 2:
+            return None
+        return slope([t for t, _ in pairs], [v for _, v in pairs])
+
+    def stats(self) -> Dict[str, Any]:
+        """Current quantity, velocity (units/s), acceleration (units/s^2) and stall state."""
+        latest = self.buffer.latest()
+        if latest is None:
+            return {
+                "quantity": None,
+                "velocity": None,
+                "acceleration": None,
+                "average_velocity": None,
+                "moving": False,
+                "stalled": False,
+                "pull_duration": 0.0,
+                "samples": 0,
+                "errors": self.errors,
+                "last_error": self.last_error,
+            }
+
+        now, quantity = latest
+        velocity = self._velocity(now)
+        previous = self._velocity(now - self.velocity_window)
+        acceleration = None
+        if velocity is not None and previous is not None:
+            acceleration = (velocity - previous) / self.velocity_window
+
+        moving = velocity is not None and abs(velocity) >= self.stall_velocity
+        stalled = (
+            not moving
+            and self.last_moved is not None
+            and now - self.last_moved >= self.stall_time
+        )
+
+        pull_times, pull_values = self.buffer.since(self.pull_started)
+        duration = pull_times[-1] - pull_times[0] if pull_times else 0.0
+        return {
+            "quantity": quantity,
+            "velocity": velocity,
+            "acceleration": acceleration,
+            "average_velocity": (pull_values[-1] - pull_values[0]) / duration if duration > 0 else None,
+            "moving": moving,
+            "stalled": stalled,
+            "pull_duration": duration,
+            "samples": len(self.buffer),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def history(self, seconds: float = 60.0, points: int = 200) -> List[List[float]]:
+        """
+        Downsampled trace of the last `seconds`: at most `points` rows of
+        [epoch milliseconds, mean, min, max], one per equal time bucket.
+
+        Raises:
+            ValueError: If seconds is not a positive number or points is not a positive integer
+        """
+        if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) \
+                or not math.isfinite(seconds) or seconds <= 0:
+            raise ValueError(f"seconds must be a positive number, got {seconds!r}")
+        if isinstance(points, bool) or not isinstance(points, int) or points < 1:
+            raise ValueError(f"points must be a positive integer, got {points!r}")
+        latest = self.buffer.latest()
+        if latest is None:
+            return []
+        start = latest[0] - seconds
+        times, values = self.buffer.since(start)
+        width = seconds / points
+
+        rows = []
+        bucket = None
+        for t, v in zip(times, values):
+            index = min(int((t - start) / width), points - 1)
+            if bucket is None or bucket[0] != index:
+                if bucket is not None:
+                    rows.append(self._row(bucket))
+                bucket = [index, t, v, v, v, 1]
+            else:
+                bucket[1] = t
+                bucket[2] += v
+                bucket[3] = min(bucket[3], v)
+                bucket[4] = max(bucket[4], v)
+                bucket[5] += 1
+        if bucket is not None:
+            rows.append(self._row(bucket))
+        return rows
+
+    def _row(self, bucket: list) -> List[float]:
+        _, last_time, total, low, high, count = bucket
+        return [round((last_time + self._wall_offset) * 1000), total / count, low, high]
@@ -0,0 +1,158 @@
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from tag_cache import utc_timestamp
+from tag_registry import get_registry
+
+
+class HandshakeEngine:
+    """
+    Drives the end-of-pull handshake from inside the resident bridge.
+
+    Every interval it reads completeRequest. On a rising edge it reads the
+    final quantity straight away on the same conversation and, once that
+    quantity reaches the watchers' threshold, writes completeAck and records
+    one completed checkout; when completeRequest falls again it clears
+    completeAck. A completion below the threshold is held (not acknowledged)
+    and its quantity re-read on every poll, as monitorQuantity did. Values are
+    read and written through the tag registry, so the quantity is reported as
+    a number. Because it only polls while someone is watching, a completion
+    is never acknowledged without a consumer: the PLC keeps completeRequest
+    raised until a watcher attaches. Recent completions are kept so a watcher
+    that reconnects can catch up.
+
+    completeAck itself records what was acknowledged, so a restarted bridge
+    picks up where the last one stopped: its first poll adopts a completion
+    whose completeAck is already set instead of reporting it again, and
+    clears a completeAck left behind after completeRequest fell.
+
+    Args:
+        complete_request (str): Item the PLC raises at the end of a pull (default: the
+            completeRequest tag of the shared tag table)
+        quantity (str): Item holding the pulled quantity (default: the quantity tag)
+        complete_ack (str): Item written to acknowledge the completion (default: the
+            completeAck tag)
+        interval (float): Seconds between completeRequest reads
+        history (int): Completions kept for watchers that reconnect
+        server_name (str): Name of the DDE server (e.g., "RSLinx")
+        topic (str): Topic name (e.g., "ExcelLink")
+    """
+
+    IDLE = "idle"
+    ACK_PENDING = "ack_pending"
+    ACKNOWLEDGED = "acknowledged"
+
+    def __init__(self, complete_request: str = None, quantity: str = None, complete_ack: str = None,
+                 interval: float = 0.05, history: int = 20, server_name: str = "RSLinx", topic: str = "ExcelLink"):
+        self.registry = get_registry()
+        self.complete_request = complete_request or self.registry.item("completeRequest")
+        self.quantity = quantity or self.registry.item("quantity")
+        self.complete_ack = complete_ack or self.registry.item("completeAck")
+        self.interval = interval
+        self.server_name = server_name
+        self.topic = topic
+        self.state = self.IDLE
+        self.synced = False
+        self.sequence = 0
+        self.pending: Optional[Dict[str, Any]] = None
+        self.held = None
+        self.completions = deque(maxlen=history)
+        self.next_due = time.monotonic()
+        self.last_error = None
+
+    @staticmethod
+    def is_set(raw: str) -> bool:
+        return raw.strip().lower() in ("1", "true", "-1")
+
+    def _read_flag(self, conversation, item: str) -> bool:
+        value = self.registry.decode(item, conversation.Request(item))
+        return value if isinstance(value, bool) else self.is_set(str(value))
+
+    def _write_flag(self, conversation, item: str, value: bool) -> None:
+        conversation.Poke(item, self.registry.encode(item, value))
+
+    @staticmethod
+    def reaches(quantity: Any, threshold: float) -> bool:
+        """Whether a completion's quantity satisfies threshold (0 accepts anything)."""
+        if threshold <= 0:
+            return True
+        try:
+            return float(quantity) >= threshold
+        except (TypeError, ValueError):
+            return False
+
+    def poll_due(self, pool, threshold: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Advance the handshake if its interval has elapsed.
+
+        Args:
+            pool: Conversation pool of the bridge
+            threshold (float): Quantity a completion must reach to be acknowledged
+
+        Returns:
+            List[Dict[str, Any]]: Completed checkouts to hand to watchers
+        """
+        now = time.monotonic()
+        if now < self.next_due:
+            return []
+        self.next_due = now + self.interval
+
+        events = []
+        try:
+            with pool.connection(self.server_name, self.topic) as conversation:
+                requested = self._read_flag(conversation, self.complete_request)
+
+                if not self.synced:
+                    # Pick up the handshake where a previous bridge left it
+                    if self._read_flag(conversation, self.complete_ack):
+                        if requested:
+                            self.state = self.ACKNOWLEDGED
+                        else:
+                            self._write_flag(conversation, self.complete_ack, False)
+                    self.synced = True
+
+                if requested and self.state == self.IDLE:
+                    # Capture the quantity before anything else touches the PLC
+                    quantity = self.registry.decode(self.quantity, conversation.Request(self.quantity))
+                    if self.reaches(quantity, threshold):
+                        self.held = None
+                        self.sequence += 1
+                        self.pending = {
+                            "event": "checkout_complete",
+                            "sequence": self.sequence,
+                            "quantity": quantity,
+                            "timestamp": utc_timestamp(),
+                        }
+                        self.state = self.ACK_PENDING
+                    else:
+                        self.held = quantity
+
+                if self.state == self.ACK_PENDING:
+                    self._write_flag(conversation, self.complete_ack, True)
+                    self.state = self.ACKNOWLEDGED
+                    self.pending["acknowledged_at"] = utc_timestamp()
+                    self.completions.append(self.pending)
+                    events.append(self.pending)
+                    self.pending = None
+
+                elif not requested:
+                    self.held = None
+                    if self.state == self.ACKNOWLEDGED:
+                        self._write_flag(conversation, self.complete_ack, False)
+                        self.state = self.IDLE
+            self.last_error = None
+        except Exception as e:
+            # An ack that failed is retried on the next poll; the captured
+            # quantity is kept so the completion is reported exactly once
+            self.last_error = str(e)
+        return events
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "sequence": self.sequence,
+            "held_quantity": self.held,
+            "completions": list(self.completions),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,276 @@
+import time
+import queue
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from bridge_metrics import metrics
+from tag_cache import utc_timestamp
+from tag_registry import get_registry
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pull_samples (
+    sample_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    user_name VARCHAR(100),
+    project_number VARCHAR(50),
+    item_sku VARCHAR(50),
+    elapsed REAL NOT NULL,
+    quantity REAL NOT NULL,
+    timestamp DATETIME NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pull_samples_session
+    ON pull_samples (user_name, project_number, item_sku, session_id);
+"""
+
+INSERT = """
+INSERT INTO pull_samples (session_id, user_name, project_number, item_sku, elapsed, quantity, timestamp)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Tells the writer thread to commit now (a session ended) or to exit
+_COMMIT = "commit"
+_CLOSE = "close"
+
+
+class SampleWriter:
+    """
+    Background writer that stores pull samples in SQLite.
+
+    Rows are handed over through an unbounded queue, so put() never waits on
+    the disk. The writer thread opens its own connection in WAL mode (the
+    Node server keeps reading and writing the same file), inserts rows with
+    executemany in batches and commits every commit_interval seconds or
+    batch_size rows. If the database stays locked the rows are kept and
+    retried; beyond max_backlog the oldest are dropped.
+
+    Args:
+        path (str): SQLite database file (the application database)
+        batch_size (int): Rows per executemany/commit
+        commit_interval (float): Seconds between commits while rows arrive
+        max_backlog (int): Unwritten rows kept before the oldest are dropped
+    """
+
+    def __init__(self, path: str, batch_size: int = 200, commit_interval: float = 1.0, max_backlog: int = 100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.max_backlog = max_backlog
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self._rows: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="pull-sample-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, row: Tuple) -> None:
+        """Queue one row (never blocks)."""
+        self._rows.put(row)
+
+    def commit(self) -> None:
+        """Ask the writer to flush and commit what it has."""
+        self._rows.put(_COMMIT)
+
+    def backlog(self) -> int:
+        return self._rows.qsize()
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._rows.put(_CLOSE)
+        self._thread.join(timeout)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=5.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        return db
+
+    def _flush(self, db: sqlite3.Connection, pending: List[Tuple]) -> bool:
+        if not pending:
+            return True
+        try:
+            with metrics.timed("record_commit"):
+                db.executemany(INSERT, pending)
+                db.commit()
+        except sqlite3.Error as e:
+            # Usually the Node side holding a write lock; keep the rows for the next flush
+            db.rollback()
+            self.errors += 1
+            self.last_error = str(e)
+            return False
+        self.written += len(pending)
+        metrics.count("recorded_samples", len(pending))
+        pending.clear()
+        return True
+
+    def _run(self) -> None:
+        db = None
+        pending: List[Tuple] = []
+        last_commit = time.monotonic()
+        while True:
+            try:
+                row = self._rows.get(timeout=self.commit_interval)
+            except queue.Empty:
+                row = None
+
+            if isinstance(row, tuple):
+                pending.append(row)
+                if len(pending) > self.max_backlog:
+                    overflow = len(pending) - self.max_backlog
+                    del pending[:overflow]
+                    self.dropped += overflow
+                    metrics.count("recorded_dropped", overflow)
+
+            due = (row in (_COMMIT, _CLOSE) or len(pending) >= self.batch_size
+                   or time.monotonic() - last_commit >= self.commit_interval)
+            if due and pending:
+                try:
+                    if db is None:
+                        db = self._connect()
+                    self._flush(db, pending)
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    self.last_error = str(e)
+                last_commit = time.monotonic()
+
+            if row == _CLOSE:
+                break
+        if db is not None:
+            db.close()
+
+
+class PullRecorder:
+    """
+    Records the quantity of the current pull as a time series.
+
+    A session starts with start() (the Node side does so once a checkout's
+    user, project and item have been written to the PLC) and ends with
+    stop(), when the bridge's handshake reports the checkout complete, or
+    after max_duration. While a session is active sample_due() reads the
+    quantity at rate on the DDE thread and hands each row to a SampleWriter,
+    so a slow disk never delays control traffic.
+
+    Rows go to pull_samples: session_id (start time in Unix milliseconds),
+    user_name, project_number, item_sku, elapsed seconds, quantity and an
+    ISO timestamp.
+
+    Args:
+        writer (SampleWriter): Stores the rows
+        item (str): DDE item holding the quantity (default: the quantity tag of the
+            shared tag table)
+        rate (float): Samples per second while recording
+        max_duration (float): Seconds after which a session that was never stopped ends
+        server_name (str): Name of the DDE server (e.g., "RSLinx")
+        topic (str): Topic name (e.g., "ExcelLink")
+    """
+
+    def __init__(self, writer: SampleWriter, item: str = None, rate: float = 10.0,
+                 max_duration: float = 1800.0, server_name: str = "RSLinx", topic: str = "ExcelLink"):
+        self.writer = writer
+        self.item = item or get_registry().item("quantity")
+        self.interval = 1.0 / rate
+        self.max_duration = max_duration
+        self.server_name = server_name
+        self.topic = topic
+        self.session: Optional[Dict[str, Any]] = None
+        self.next_due = time.monotonic()
+        self.last_error = None
+
+    @property
+    def active(self) -> bool:
+        return self.session is not None
+
+    def start(self, user: str = None, project: str = None, item: str = None) -> Dict[str, Any]:
+        """Begin a session (ending any session still open) and return it."""
+        replaced = self.stop() if self.session is not None else None
+        self.session = {
+            "session_id": int(time.time() * 1000),
+            "user": user,
+            "project": project,
+            "item": item,
+            "started": time.monotonic(),
+            "started_at": utc_timestamp(),
+            "samples": 0,
+            "errors": 0,
+        }
+        self.next_due = time.monotonic()
+        session = self._describe(self.session)
+        if replaced is not None:
+            session["replaced"] = replaced["session_id"]
+        return session
+
+    def stop(self, final_quantity: Any = None) -> Optional[Dict[str, Any]]:
+        """End the current session; returns it, or None if none was open."""
+        session = self.session
+        if session is None:
+            return None
+        if final_quantity is not None:
+            # The handshake captured the final quantity; keep it as the last sample
+            try:
+                self._store(session, float(final_quantity))
+            except (TypeError, ValueError):
+                pass
+        self.session = None
+        self.writer.commit()
+        return self._describe(session)
+
+    def _store(self, session: Dict[str, Any], quantity: float) -> None:
+        self.writer.put((
+            session["session_id"], session["user"], session["project"], session["item"],
+            round(time.monotonic() - session["started"], 4), quantity, utc_timestamp()
+        ))
+        session["samples"] += 1
+
+    def sample_due(self, pool) -> None:
+        """Take one sample if a session is active and its period has elapsed."""
+        session = self.session
+        now = time.monotonic()
+        if session is None or now < self.next_due:
+            return
+        if now - session["started"] > self.max_duration:
+            self.stop()
+            return
+        # Keep a fixed cadence; skip missed slots instead of bursting to catch up
+        self.next_due += self.interval
+        if self.next_due <= now:
+            self.next_due = now + self.interval
+
+        try:
+            with pool.connection(self.server_name, self.topic) as conversation:
+                raw = conversation.Request(self.item)
+            self._store(session, float(raw))
+            self.last_error = None
+        except Exception as e:
+            session["errors"] += 1
+            self.last_error = str(e)
+
+    def _describe(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "session_id": session["session_id"],
+            "user": session["user"],
+            "project": session["project"],
+            "item": session["item"],
+            "started_at": session["started_at"],
+            "duration": round(time.monotonic() - session["started"], 3),
+            "samples": session["samples"],
+            "errors": session["errors"],
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "session": self._describe(self.session) if self.session is not None else None,
+            "database": self.writer.path,
+            "written": self.writer.written,
+            "backlog": self.writer.backlog(),
+            "dropped": self.writer.dropped,
+            "write_errors": self.writer.errors,
+            "last_write_error": self.writer.last_error,
+            "last_error": self.last_error,
+        }
+
+    def close(self) -> None:
+        self.stop()
+        self.writer.close()
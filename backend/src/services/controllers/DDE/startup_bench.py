@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+
+
+# Timings reported for every run, in milliseconds
+BENCH_METRICS = ("process_ms", "import_ms", "first_request_ms")
+
+
+def report_child(started: float, ready: float, done: float, result: dict) -> None:
+    """
+    Print the timings of a --bench-child run as one JSON line.
+
+    Args:
+        started (float): perf_counter() at the top of the script
+        ready (float): perf_counter() once imports and argument handling were done
+        done (float): perf_counter() after the first request returned
+        result (dict): The request's result
+    """
+    print(json.dumps({
+        "import_ms": (ready - started) * 1000,
+        "first_request_ms": (done - ready) * 1000,
+        "error": result.get("error"),
+    }))
+
+
+def run_startup_benchmark(script: str, command: dict, runs: int = 10, warmup: int = 1,
+                          baseline: str = None, tolerance: float = 0.25) -> dict:
+    """
+    Spawn script the way the Node side does, once per run, and time it.
+
+    Each child is started as `python <script> --bench-child <command>` and
+    reports its own import and first-request times; the remainder of the
+    process wall time is interpreter start-up and teardown.
+
+    With a baseline file, medians are compared against the medians stored
+    for this script and any metric slower by more than tolerance is listed
+    under 'regressions'. A script without stored medians has them saved.
+
+    Args:
+        script (str): Path of the script to benchmark
+        command (dict): Command passed to every child
+        runs (int): Measured runs
+        warmup (int): Unmeasured runs first (fills the OS file cache)
+        baseline (str): Optional JSON file of stored medians, keyed by script name
+        tolerance (float): Allowed fractional slowdown before a regression is reported
+
+    Returns:
+        dict: {script, transport, runs, errors, process_ms, import_ms, first_request_ms,
+               interpreter_ms, regressions?}; each timing is {min, median, max}
+
+    Raises:
+        RuntimeError: If a child does not report its timings
+    """
+    samples = {name: [] for name in BENCH_METRICS}
+    errors = 0
+    for index in range(warmup + runs):
+        begin = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, script, "--bench-child", json.dumps(command)],
+            capture_output=True, text=True
+        )
+        elapsed = (time.perf_counter() - begin) * 1000
+        try:
+            child = json.loads(completed.stdout.strip().splitlines()[-1])
+        except (ValueError, IndexError):
+            raise RuntimeError(f"Benchmark run failed: {completed.stderr.strip() or completed.stdout.strip()}")
+        if index < warmup:
+            continue
+        samples["process_ms"].append(elapsed)
+        samples["import_ms"].append(child["import_ms"])
+        samples["first_request_ms"].append(child["first_request_ms"])
+        if child["error"]:
+            errors += 1
+
+    name = os.path.basename(script)
+    report = {
+        "script": name,
+        "transport": os.environ.get("DDE_TRANSPORT", "win32"),
+        "runs": runs,
+        "errors": errors,
+    }
+    for metric, values in samples.items():
+        report[metric] = {
+            "min": round(min(values), 2),
+            "median": round(statistics.median(values), 2),
+            "max": round(max(values), 2),
+        }
+    report["interpreter_ms"] = round(
+        report["process_ms"]["median"] - report["import_ms"]["median"] - report["first_request_ms"]["median"], 2
+    )
+
+    if baseline:
+        compare_with_baseline(report, baseline, tolerance)
+    return report
+
+
+def compare_with_baseline(report: dict, baseline: str, tolerance: float) -> None:
+    """Add 'regressions' to report from the stored medians, or store them if there are none yet."""
+    try:
+        with open(baseline) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = {}
+
+    key = f"{report['script']}|{report['transport']}"
+    medians = {metric: report[metric]["median"] for metric in BENCH_METRICS}
+    if key not in stored:
+        stored[key] = medians
+        with open(baseline, "w") as f:
+            json.dump(stored, f, indent=2)
+        report["baseline_saved"] = True
+        report["regressions"] = []
+        return
+
+    report["baseline"] = stored[key]
+    report["regressions"] = [
+        {"metric": metric, "baseline": stored[key][metric], "median": medians[metric]}
+        for metric in BENCH_METRICS
+        if metric in stored[key] and medians[metric] > stored[key][metric] * (1 + tolerance)
+    ]
@@ -0,0 +1,238 @@
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from tag_registry import get_registry
+
+
+def default_scan_classes() -> Dict[str, Dict]:
+    """
+    Default scan classes for the shared tag table, mirroring RSLinx scan groups.
+
+    The encoder quantity is scanned fast only while a pull is in progress
+    (its "pull_rate") and at the cache update rate otherwise, handshake/status
+    tags at the cache update rate and the diagnostic tag slowly. Rates are in
+    milliseconds.
+    """
+    registry = get_registry()
+    return {
+        "quantity": {"rate": 1000, "pull_rate": 100, "items": [registry.item("quantity")]},
+        "status": {"rate": 1000, "items": [registry.item("completeRequest")]},
+        "diagnostics": {"rate": 10000, "items": [registry.item("ddeTest")]},
+    }
+
+# A cached value is stale once it is older than this many scan periods
+STALE_AFTER_SCANS = 3
+
+# max_age for TagCache.get() that accepts a value of any age
+ANY_AGE = float("inf")
+
+
+def utc_timestamp(epoch: float = None) -> str:
+    """ISO-8601 UTC timestamp matching JavaScript's Date.toISOString()"""
+    moment = datetime.fromtimestamp(epoch, timezone.utc) if epoch is not None else datetime.now(timezone.utc)
+    return moment.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class ScanClass:
+    """
+    A group of items scanned together at one rate.
+
+    Args:
+        name (str): Scan class name (e.g., "quantity")
+        rate (float): Scan period in seconds
+        items (List[str]): DDE items in this class
+        pull_rate (float): Scan period in seconds while a pull is in progress (None = rate)
+    """
+
+    def __init__(self, name: str, rate: float, items: List[str], pull_rate: float = None):
+        self.name = name
+        self.idle_rate = rate
+        self.pull_rate = pull_rate
+        self.rate = rate
+        self.items = list(items)
+        self.next_due = time.monotonic()
+
+    def use_rate(self, pulling: bool) -> None:
+        """Scan at the pull rate while pulling and at the idle rate otherwise."""
+        rate = self.pull_rate if pulling and self.pull_rate is not None else self.idle_rate
+        if rate != self.rate:
+            self.rate = rate
+            self.next_due = min(self.next_due, time.monotonic() + rate)
+
+
+class TagCache:
+    """Last-known-value table with update timestamps.
+
+    Values are kept decoded through the tag registry (as read replies carry
+    them), whether they came from a scan or from a read.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def update(self, item: str, value: Any) -> None:
+        self._entries[item] = {
+            "value": value,
+            "error": None,
+            "updated": time.monotonic(),
+            "timestamp": time.time(),
+        }
+
+    def fail(self, item: str, error: str) -> None:
+        """Record a failed scan, keeping the last known value."""
+        entry = self._entries.setdefault(item, {"value": None, "updated": None, "timestamp": None})
+        entry["error"] = error
+
+    def invalidate(self, item: str) -> None:
+        """Force the next read of item to go to the PLC (e.g. after a write)."""
+        entry = self._entries.get(item)
+        if entry:
+            entry["updated"] = None
+
+    def get(self, item: str, max_age: float) -> Optional[Dict[str, Any]]:
+        """
+        Look up the last known value of item.
+
+        Returns:
+            Optional[Dict[str, Any]]: {value, error, timestamp, age, stale}, or None if never read
+        """
+        entry = self._entries.get(item)
+        if entry is None or entry["timestamp"] is None:
+            return None
+        age = time.monotonic() - entry["updated"] if entry["updated"] is not None else None
+        return {
+            "value": entry["value"],
+            "error": entry["error"],
+            "timestamp": utc_timestamp(entry["timestamp"]),
+            "age": age,
+            "stale": age is None or age > max_age or entry["error"] is not None,
+        }
+
+
+class ScanPoller:
+    """
+    Scans tag groups at per-class rates into a TagCache and answers reads from it.
+
+    Polling runs on the caller's thread (the DDE thread in serve mode) through
+    poll_due(), so every scan class shares the pooled conversation. A class
+    with a "pull_rate" switches to it while set_pulling(True) is in effect.
+
+    Args:
+        scan_classes (Dict[str, Dict]): name -> {"rate": milliseconds, "items": [...],
+            optional "pull_rate": milliseconds} (default: default_scan_classes())
+        server_name (str): Name of the DDE server (e.g., "RSLinx")
+        topic (str): Topic name (e.g., "ExcelLink")
+    """
+
+    def __init__(self, scan_classes: Dict[str, Dict] = None, server_name: str = "RSLinx", topic: str = "ExcelLink"):
+        self.server_name = server_name
+        self.topic = topic
+        self.cache = TagCache()
+        self.registry = get_registry()
+        self.pulling = False
+        self.classes: Dict[str, ScanClass] = {}
+        for name, spec in (scan_classes or default_scan_classes()).items():
+            self.set_scan_class(name, spec["rate"], spec.get("items"), spec.get("pull_rate"))
+
+    def set_scan_class(self, name: str, rate: float, items: List[str] = None, pull_rate: float = None) -> ScanClass:
+        """Add a scan class or change its rate (milliseconds) and, optionally, its items and pull rate."""
+        scan_class = self.classes.get(name)
+        if scan_class is None:
+            scan_class = self.classes[name] = ScanClass(name, rate / 1000.0, items or [])
+        else:
+            scan_class.idle_rate = rate / 1000.0
+            if items is not None:
+                scan_class.items = list(items)
+        if pull_rate is not None:
+            scan_class.pull_rate = pull_rate / 1000.0
+        scan_class.use_rate(self.pulling)
+        return scan_class
+
+    def set_pulling(self, pulling: bool) -> None:
+        """Switch classes with a pull rate to it while a pull is in progress, and back afterwards."""
+        if pulling != self.pulling:
+            self.pulling = pulling
+            for scan_class in self.classes.values():
+                scan_class.use_rate(pulling)
+
+    def max_age(self, item: str) -> Optional[float]:
+        """Age in seconds after which a cached item counts as stale, or None if it is not scanned."""
+        rates = [c.rate for c in self.classes.values() if item in c.items]
+        return min(rates) * STALE_AFTER_SCANS if rates else None
+
+    def next_due(self) -> Optional[float]:
+        """Monotonic time at which the next scan class is due."""
+        due = [c.next_due for c in self.classes.values() if c.items]
+        return min(due) if due else None
+
+    def poll_due(self, pool) -> None:
+        """Scan every class that is due, over one pooled conversation."""
+        now = time.monotonic()
+        due = [c for c in self.classes.values() if c.items and c.next_due <= now]
+        if not due:
+            return
+
+        for scan_class in due:
+            scan_class.next_due = now + scan_class.rate
+
+        try:
+            with pool.connection(self.server_name, self.topic) as conversation:
+                for scan_class in due:
+                    for item in scan_class.items:
+                        try:
+                            self.cache.update(item, self.registry.decode(item, conversation.Request(item)))
+                        except Exception as e:
+                            self.cache.fail(item, str(e))
+        except Exception as e:
+            for scan_class in due:
+                for item in scan_class.items:
+                    self.cache.fail(item, str(e))
+
+    def lookup(self, item: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer a read from the cache.
+
+        Returns:
+            Optional[Dict[str, Any]]: A read reply, or None if the item is not
+            scanned or its cached value is stale and must be read from the PLC
+        """
+        max_age = self.max_age(item)
+        if max_age is None:
+            return None
+        entry = self.cache.get(item, max_age)
+        if entry is None or entry["stale"]:
+            return None
+        return {
+            "value": entry["value"],
+            "error": None,
+            "cached": True,
+            "timestamp": entry["timestamp"],
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every scanned item with its last known value, timestamp and staleness flag."""
+        items = {}
+        for scan_class in self.classes.values():
+            for item in scan_class.items:
+                entry = self.cache.get(item, scan_class.rate * STALE_AFTER_SCANS)
+                items[item] = dict(entry, scan_class=scan_class.name) if entry else {
+                    "value": None,
+                    "error": None,
+                    "timestamp": None,
+                    "age": None,
+                    "stale": True,
+                    "scan_class": scan_class.name,
+                }
+        return {
+            "classes": {c.name: self._describe(c) for c in self.classes.values()},
+            "items": items,
+        }
+
+    @staticmethod
+    def _describe(scan_class: ScanClass) -> Dict[str, Any]:
+        described = {"rate": int(scan_class.rate * 1000), "items": scan_class.items}
+        if scan_class.pull_rate is not None:
+            described["idle_rate"] = int(scan_class.idle_rate * 1000)
+            described["pull_rate"] = int(scan_class.pull_rate * 1000)
+        return described
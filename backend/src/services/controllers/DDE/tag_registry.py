@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# The tag table shared with rslinx.config.js
+DEFAULT_TAG_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                  "config", "rslinx.tags.json")
+
+# Excel-style DDE link: [ExcelLink]_200_GLB.DintData[2],L1,C1
+DDE_LINK = re.compile(r"\[([^\]]+)\]([^,]+),([^,]+),([^,]+)")
+
+DINT_MIN = -2 ** 31
+DINT_MAX = 2 ** 31 - 1
+# Characters in a Logix STRING (its LEN limit)
+STRING_MAX = 82
+
+
+class TagCodec:
+    """Converts between Python values and the text RSLinx exchanges for one data type."""
+
+    data_type = "STRING"
+
+    def decode(self, text: str) -> Any:
+        return text
+
+    def encode(self, value: Any) -> str:
+        return str(value)
+
+
+class RealCodec(TagCodec):
+    data_type = "REAL"
+
+    def decode(self, text: str) -> float:
+        return float(text)
+
+    def encode(self, value: Any) -> str:
+        if isinstance(value, bool):
+            raise ValueError("expected a number, got a boolean")
+        number = float(value)
+        if not math.isfinite(number):
+            raise ValueError(f"{value!r} is not a finite number")
+        return repr(number)
+
+
+class DintCodec(TagCodec):
+    data_type = "DINT"
+
+    def decode(self, text: str) -> int:
+        return int(float(text))
+
+    def encode(self, value: Any) -> str:
+        if isinstance(value, bool):
+            raise ValueError("expected an integer, got a boolean")
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError(f"{value!r} is not an integer")
+        if not DINT_MIN <= number <= DINT_MAX:
+            raise ValueError(f"{value!r} is outside the DINT range")
+        return str(int(number))
+
+
+class BoolCodec(TagCodec):
+    data_type = "BOOL"
+
+    TRUE = ("1", "-1", "true", "on")
+    FALSE = ("0", "false", "off")
+
+    def decode(self, text: str) -> bool:
+        return text.strip().lower() in self.TRUE
+
+    def encode(self, value: Any) -> str:
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        if isinstance(value, (int, float)) and value in (0, 1):
+            return "1" if value else "0"
+        text = str(value).strip().lower()
+        if text in self.TRUE:
+            return "1"
+        if text in self.FALSE:
+            return "0"
+        raise ValueError(f"{value!r} is not a boolean")
+
+
+class StringCodec(TagCodec):
+    data_type = "STRING"
+
+    def decode(self, text: str) -> str:
+        # RSLinx terminates DDE text with CR/LF (and may pad with NULs)
+        return text.rstrip("\r\n\x00")
+
+    def encode(self, value: Any) -> str:
+        if value is None:
+            raise ValueError("expected a string, got null")
+        text = str(value)
+        if len(text) > STRING_MAX:
+            raise ValueError(f"{len(text)} characters is longer than a STRING ({STRING_MAX})")
+        return text
+
+
+CODECS = {codec.data_type: codec for codec in (RealCodec(), DintCodec(), BoolCodec(), StringCodec())}
+
+
+class TagDefinition:
+    """One configured tag with its DDE item, link and codec."""
+
+    __slots__ = ("name", "group", "item", "data_type", "codec", "link")
+
+    def __init__(self, name: str, group: str, item: str, data_type: str, row: str, column: str, topic: str):
+        if data_type not in CODECS:
+            raise ValueError(f"Tag {name}: unknown data type {data_type} (expected one of {', '.join(CODECS)})")
+        self.name = name
+        self.group = group
+        self.item = item
+        self.data_type = data_type
+        self.codec = CODECS[data_type]
+        self.link = f"[{topic}]{item},{row},{column}"
+
+
+class TagRegistry:
+    """
+    Tag table compiled once from the shared rslinx.tags.json.
+
+    Names ("stepNumber"), DDE items ("_200_GLB.DintData[2]") and DDE links
+    ("[ExcelLink]_200_GLB.DintData[2],L1,C1") are resolved through
+    dictionaries built at load time, so commands do no per-call parsing
+    beyond a dictionary lookup (links that are not configured are parsed
+    once and remembered). Each tag's codec decodes Request results to a
+    typed value and validates and encodes Poke values; items that are not
+    configured pass through as raw strings.
+
+    Args:
+        config (Dict): Parsed tag config ({application, row, column, tags: {group: {name: {item, type}}}})
+        topic (str): Topic used in the links of configured tags
+    """
+
+    def __init__(self, config: Dict[str, Any], topic: str = "ExcelLink"):
+        self.application = config.get("application", "RSLinx")
+        row = config.get("row", "L1")
+        column = config.get("column", "C1")
+        self.tags: Dict[str, TagDefinition] = {}
+        self.by_item: Dict[str, TagDefinition] = {}
+        for group, tags in config.get("tags", {}).items():
+            for name, tag in tags.items():
+                definition = TagDefinition(name, group, tag["item"], tag.get("type", "STRING"), row, column, topic)
+                self.tags[name] = definition
+                self.by_item[definition.item] = definition
+        self._links: Dict[str, Tuple[Optional[str], str]] = {
+            definition.link: (topic, definition.item) for definition in self.tags.values()
+        }
+
+    @classmethod
+    def load(cls, path: str = None, topic: str = "ExcelLink") -> "TagRegistry":
+        with open(path or DEFAULT_TAG_CONFIG) as f:
+            return cls(json.load(f), topic)
+
+    def resolve(self, reference: str) -> Tuple[Optional[str], str]:
+        """
+        Turn a tag name, DDE link or item into (topic or None, item).
+
+        Raises:
+            ValueError: If reference looks like a DDE link but is malformed
+        """
+        definition = self.tags.get(reference)
+        if definition is not None:
+            return None, definition.item
+        resolved = self._links.get(reference)
+        if resolved is not None:
+            return resolved
+        if reference.startswith("["):
+            match = DDE_LINK.fullmatch(reference)
+            if not match:
+                raise ValueError(f"Invalid DDE link format: {reference}")
+            resolved = self._links[reference] = (match.group(1), match.group(2))
+            return resolved
+        return None, reference
+
+    def decode(self, item: str, raw: Any) -> Any:
+        """Typed value of a Request result (already-decoded values pass through)."""
+        definition = self.by_item.get(item)
+        if definition is None or not isinstance(raw, str):
+            return raw
+        try:
+            return definition.codec.decode(raw)
+        except (ValueError, OverflowError):
+            # e.g. "inf" or "1e999" for a DINT
+            return raw
+
+    def decode_many(self, results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Decode a read_many results map ({item: {value, error, ...}}) in one pass."""
+        by_item = self.by_item
+        for item, result in results.items():
+            definition = by_item.get(item)
+            if definition is not None and result.get("error") is None and isinstance(result.get("value"), str):
+                try:
+                    result["value"] = definition.codec.decode(result["value"])
+                except (ValueError, OverflowError):
+                    pass
+        return results
+
+    def encode(self, item: str, value: Any) -> str:
+        """
+        Poke text for value, validated against the tag's declared type.
+
+        Raises:
+            ValueError: If value is not valid for the tag
+        """
+        definition = self.by_item.get(item)
+        if definition is None:
+            return str(value)
+        try:
+            return definition.codec.encode(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid value for {definition.name} ({definition.item}, {definition.data_type}): {e}")
+
+    def item(self, name: str) -> str:
+        """
+        DDE item of a configured tag (e.g., "quantity" -> "Reel.RealData[0]").
+
+        Raises:
+            KeyError: If the tag table has no tag of that name
+        """
+        definition = self.tags.get(name)
+        if definition is None:
+            raise KeyError(f"Tag {name} is not in the tag table")
+        return definition.item
+
+    def data_type(self, item: str) -> Optional[str]:
+        definition = self.by_item.get(item)
+        return definition.data_type if definition is not None else None
+
+    def describe(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": d.name, "group": d.group, "item": d.item, "type": d.data_type, "link": d.link}
+            for d in self.tags.values()
+        ]
+
+
+_registry: Optional[TagRegistry] = None
+
+
+def get_registry() -> TagRegistry:
+    """The process-wide registry, loaded from $DDE_TAG_CONFIG (or rslinx.tags.json) on first use."""
+    global _registry
+    if _registry is None:
+        path = os.environ.get("DDE_TAG_CONFIG", DEFAULT_TAG_CONFIG)
+        try:
+            _registry = TagRegistry.load(path, os.environ.get("DDE_TOPIC", "ExcelLink"))
+        except OSError:
+            # No shared config: every item passes through untyped
+            _registry = TagRegistry({})
+    return _registry
+
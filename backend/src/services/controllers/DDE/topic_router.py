@@ -0,0 +1,373 @@
+import os
+import sys
+import json
+import time
+import queue
+import itertools
+import threading
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Actions whose request id keeps receiving events after the reply
+STREAMING_ACTIONS = ("subscribe", "handshake")
+
+
+class TopicWorker:
+    """
+    One shard: a resident `dde_manager.py --serve` child that owns the
+    conversation pool (and scan cache, sampler, handshake) for one topic.
+
+    Commands are written by a dedicated thread from an unbounded queue, so a
+    station that stops reading its stdin never blocks the router. Replies
+    and events are read on another thread and handed to the router.
+
+    Args:
+        topic (str): DDE topic served by this worker (e.g., "ExcelLink")
+        application (str): DDE server name (e.g., "RSLinx")
+        script (str): Path of dde_manager.py
+        worker_args (List[str]): Extra command-line arguments for the child ('{topic}' is
+            replaced with this worker's topic)
+        router (TopicRouter): Receives the child's messages and its exit
+    """
+
+    def __init__(self, topic: str, application: str, script: str, worker_args: List[str], router: "TopicRouter"):
+        self.topic = topic
+        self.application = application
+        self.script = script
+        self.worker_args = list(worker_args)
+        self.router = router
+        self.process: Optional[subprocess.Popen] = None
+        self.outbox: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self.restarts = 0
+        self.started_at = None
+        self.restart_at = None
+        self.last_exit = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    @property
+    def accepting(self) -> bool:
+        """Not started yet (commands wait in the outbox) or running."""
+        return self.process is None or (self.restart_at is None and self.alive)
+
+    def start(self) -> None:
+        env = dict(os.environ, DDE_TOPIC=self.topic, DDE_APPLICATION=self.application)
+        env.pop("DDE_TOPICS", None)  # a worker must serve its topic, not shard again
+        process = subprocess.Popen(
+            [sys.executable, self.script, "--serve"] + [arg.replace("{topic}", self.topic) for arg in self.worker_args],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+            text=True, encoding="utf-8", bufsize=1
+        )
+        self.process = process
+        if self.restart_at is not None:
+            # Commands queued for the previous process were already failed
+            self.outbox = queue.Queue()
+        self.started_at = time.monotonic()
+        self.restart_at = None
+        outbox = self.outbox
+        threading.Thread(target=self._write_loop, args=(process, outbox), daemon=True).start()
+        threading.Thread(target=self._read_loop, args=(process,), daemon=True).start()
+
+    def send(self, command: Dict[str, Any]) -> None:
+        self.outbox.put(command)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Close the child's stdin (it drains and exits), killing it if it does not."""
+        process = self.process
+        if process is None:
+            return
+        self.outbox.put(None)
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def _write_loop(self, process: subprocess.Popen, outbox: queue.Queue) -> None:
+        try:
+            while True:
+                command = outbox.get()
+                if command is None:
+                    break
+                process.stdin.write(json.dumps(command) + "\n")
+                process.stdin.flush()
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except (OSError, ValueError):
+                pass
+
+    def _read_loop(self, process: subprocess.Popen) -> None:
+        try:
+            for line in process.stdout:
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                self.router.deliver(self, message)
+        except (OSError, ValueError):
+            pass
+        process.wait()
+        self.router.worker_exited(self, process)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "topic": self.topic,
+            "application": self.application,
+            "pid": self.process.pid if self.process is not None else None,
+            "alive": self.alive,
+            "restarts": self.restarts,
+            "uptime": round(time.monotonic() - self.started_at, 3) if self.alive else 0.0,
+            "last_exit": self.last_exit,
+        }
+
+
+class Route:
+    """Where the reply to a forwarded command goes."""
+
+    def __init__(self, client, request_id, worker: TopicWorker, action: str, timeout: Optional[float]):
+        self.client = client
+        self.request_id = request_id
+        self.worker = worker
+        self.action = action
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.streaming = False
+
+
+class TopicRouter:
+    """
+    Shards bridge commands by topic across one worker process per topic.
+
+    Offers the same front-end interface as BridgeServer (submit, disconnect,
+    stop, run), so stdin and socket clients are served unchanged. Each
+    command goes to the worker for its 'topic' (the first configured topic
+    when it has none) under a router-unique id, and replies and events are
+    mapped back to the client's own ids, including the 'subscription' and
+    'watching' ids later passed to unsubscribe. A request id that already
+    names an open stream of the client is refused for another one.
+
+    Stations are isolated: a slow or disconnected one only delays its own
+    commands, each worker keeps its own conversations, and work for different
+    stations runs in parallel. A reply that takes longer than route_timeout
+    is answered with an error (the late reply is dropped). A worker that
+    exits fails its pending commands and streams and is restarted after
+    restart_delay.
+
+    The 'topics' action reports every worker. With a TraceWriter the
+    front-end traffic is captured here (the workers do not capture).
+
+    Args:
+        topics (List[str]): Topics to shard, one worker each
+        application (str): DDE server name passed to the workers
+        worker_args (List[str]): Extra dde_manager.py arguments for every worker
+        script (str): Path of dde_manager.py (defaults to the one next to DDE/)
+        route_timeout (float): Seconds before a pending command is failed (0 = never)
+        restart_delay (float): Seconds before an exited worker is restarted
+        trace (TraceWriter): Optional capture of every command and reply
+    """
+
+    def __init__(self, topics: List[str], application: str = "RSLinx", worker_args: List[str] = (),
+                 script: str = None, route_timeout: float = 30.0, restart_delay: float = 1.0, trace=None):
+        if not topics:
+            raise ValueError("At least one topic is required")
+        script = script or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dde_manager.py")
+        self.default_topic = topics[0]
+        self.workers: Dict[str, TopicWorker] = {
+            topic: TopicWorker(topic, application, script, list(worker_args), self) for topic in topics
+        }
+        self.route_timeout = route_timeout
+        self.restart_delay = restart_delay
+        self.trace = trace
+        self._ids = itertools.count(1)
+        self._routes: Dict[int, Route] = {}
+        self._streams: Dict[Tuple[Any, Any], int] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def send(self, client, message: Dict[str, Any]) -> None:
+        if self.trace is not None:
+            self.trace.reply(client, message)
+        try:
+            client.send(message)
+        except Exception:
+            self.disconnect(client)
+
+    def submit(self, client, text) -> None:
+        """Forward one command (JSON text or dict) from client to its topic's worker (thread-safe)"""
+        try:
+            command = json.loads(text) if isinstance(text, (str, bytes)) else dict(text)
+        except ValueError as e:
+            self.send(client, {
+                'error': str(e),
+                'id': None
+            })
+            return
+        if not isinstance(command, dict):
+            self.send(client, {
+                'error': 'Command must be a JSON object',
+                'id': None
+            })
+            return
+        if self.trace is not None:
+            self.trace.command(client, command)
+
+        action = command.get('action')
+        request_id = command.get('id')
+
+        if action == 'topics':
+            self.send(client, {
+                'topics': [worker.status() for worker in self.workers.values()],
+                'error': None,
+                'id': request_id
+            })
+            return
+
+        if action == 'unsubscribe':
+            with self._lock:
+                stream_id = self._streams.pop((client, command.get('subscription')), None)
+                stream = self._routes.pop(stream_id, None)
+            if stream is None:
+                self.send(client, {
+                    'success': False,
+                    'error': f"Unknown subscription: {command.get('subscription')}",
+                    'id': request_id
+                })
+                return
+            self._forward(client, stream.worker, dict(command, subscription=stream_id), request_id)
+            return
+
+        topic = command.get('topic', self.default_topic)
+        worker = self.workers.get(topic)
+        if worker is None:
+            self.send(client, {
+                'error': f'Unknown topic: {topic}',
+                'id': request_id
+            })
+            return
+        self._forward(client, worker, dict(command, topic=topic, application=worker.application), request_id)
+
+    def _forward(self, client, worker: TopicWorker, command: Dict[str, Any], request_id) -> None:
+        if not worker.accepting:
+            self.send(client, {
+                'error': f'Worker for topic {worker.topic} is not running',
+                'id': request_id
+            })
+            return
+        route_id = next(self._ids)
+        streaming = command.get('action') in STREAMING_ACTIONS
+        timeout = None if streaming else self.route_timeout
+        with self._lock:
+            # A stream is known by the client's request id until it is
+            # unsubscribed, so that id cannot open a second one meanwhile
+            duplicate = streaming and any(
+                route.client is client and route.request_id == request_id and route.action in STREAMING_ACTIONS
+                for route in self._routes.values()
+            )
+            if not duplicate:
+                self._routes[route_id] = Route(client, request_id, worker, command.get('action'), timeout)
+        if duplicate:
+            self.send(client, {
+                'error': f'Stream {request_id} is already open (unsubscribe it first)',
+                'invalid': True,
+                'id': request_id
+            })
+            return
+        worker.send(dict(command, id=route_id))
+
+    def deliver(self, worker: TopicWorker, message: Dict[str, Any]) -> None:
+        """Called on a worker's reader thread with one reply or event"""
+        route_id = message.get('id')
+        with self._lock:
+            route = self._routes.get(route_id)
+            if route is None or route.worker is not worker:
+                return
+            is_event = 'event' in message
+            if not is_event:
+                if route.action in STREAMING_ACTIONS and not message.get('error'):
+                    # The stream stays routed until the client unsubscribes
+                    route.streaming = True
+                    route.deadline = None
+                    self._streams[(route.client, route.request_id)] = route_id
+                else:
+                    del self._routes[route_id]
+
+        reply = dict(message, id=route.request_id)
+        for field in ('subscription', 'watching'):
+            if reply.get(field) == route_id:
+                reply[field] = route.request_id
+        self.send(route.client, reply)
+
+    def worker_exited(self, worker: TopicWorker, process: subprocess.Popen) -> None:
+        """Fail everything routed to a worker that exited and schedule its restart"""
+        with self._lock:
+            if worker.process is not process:
+                return
+            failed = [(route_id, route) for route_id, route in self._routes.items() if route.worker is worker]
+            for route_id, route in failed:
+                del self._routes[route_id]
+                self._streams.pop((route.client, route.request_id), None)
+            worker.last_exit = process.returncode
+            if not self._stopped.is_set():
+                worker.restart_at = time.monotonic() + self.restart_delay
+
+        error = f'Worker for topic {worker.topic} exited with code {process.returncode}'
+        for _, route in failed:
+            if route.streaming:
+                self.send(route.client, {'id': route.request_id, 'event': 'error', 'error': error})
+            else:
+                self.send(route.client, {'error': error, 'id': route.request_id})
+
+    def disconnect(self, client) -> None:
+        """Close a departed client's streams on their workers (thread-safe)"""
+        with self._lock:
+            keys = [key for key in self._streams if key[0] is client]
+            closing = []
+            for key in keys:
+                route_id = self._streams.pop(key)
+                route = self._routes.pop(route_id, None)
+                if route is not None:
+                    closing.append((route.worker, route_id))
+        for worker, route_id in closing:
+            worker.send({'action': 'unsubscribe', 'subscription': route_id, 'id': None})
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [(route_id, route) for route_id, route in self._routes.items()
+                       if route.deadline is not None and route.deadline <= now]
+            for route_id, _ in expired:
+                del self._routes[route_id]
+        for _, route in expired:
+            self.send(route.client, {
+                'error': f'Timed out after {self.route_timeout}s waiting for topic {route.worker.topic}',
+                'id': route.request_id
+            })
+
+    def run(self) -> None:
+        """Start the workers and keep them running until stop()"""
+        for worker in self.workers.values():
+            worker.start()
+        try:
+            while not self._stopped.wait(0.1):
+                self._expire()
+                now = time.monotonic()
+                for worker in self.workers.values():
+                    if worker.restart_at is not None and worker.restart_at <= now:
+                        worker.restarts += 1
+                        worker.start()
+                if self.trace is not None:
+                    self.trace.flush()
+        finally:
+            for worker in self.workers.values():
+                worker.stop()
+            if self.trace is not None:
+                self.trace.close()
@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import time
+import struct
+import threading
+import subprocess
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# File header: magic, format version, capture start (Unix time)
+MAGIC = b"DDETRACE"
+VERSION = 1
+HEADER = struct.Struct("<8sBd")
+
+# Record header: kind, client number, seconds since capture start, payload length.
+# The payload is the message as compact JSON.
+RECORD = struct.Struct("<BIdI")
+COMMAND = 1
+REPLY = 2
+
+# Commands left out of a replay: their events depend on PLC state, not on the trace
+STREAMING_ACTIONS = ("subscribe", "unsubscribe", "handshake")
+
+
+class TraceWriter:
+    """
+    Records bridge traffic to a compact binary trace.
+
+    Every command a client submits and every message sent back to a client
+    (replies and events) is appended as one record stamped with the time
+    since capture started, so a replay can reproduce the original pacing and
+    compare its latencies with the recorded ones. Clients are numbered in
+    order of appearance. Records may come from any thread.
+
+    Args:
+        path (str): Trace file (overwritten)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started = time.perf_counter()
+        self.records = 0
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, time.time()))
+        self._clients: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, kind: int, client, message: Dict[str, Any]) -> None:
+        offset = time.perf_counter() - self.started
+        payload = json.dumps(message, separators=(",", ":"), default=str).encode("utf-8")
+        with self._lock:
+            if self._file.closed:
+                return
+            number = self._clients.setdefault(client, len(self._clients))
+            self._file.write(RECORD.pack(kind, number, offset, len(payload)))
+            self._file.write(payload)
+            self.records += 1
+
+    def command(self, client, command: Dict[str, Any]) -> None:
+        self._record(COMMAND, client, command)
+
+    def reply(self, client, message: Dict[str, Any]) -> None:
+        self._record(REPLY, client, message)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def _read_header(f, path: str) -> float:
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"Not a DDE trace: {path}")
+    magic, version, started = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a DDE trace (version {VERSION}): {path}")
+    return started
+
+
+def trace_started(path: str) -> float:
+    """
+    Unix time at which a trace's capture started.
+
+    Raises:
+        ValueError: If the file is not a trace this version can read
+    """
+    with open(path, "rb") as f:
+        return _read_header(f, path)
+
+
+def read_trace(path: str) -> Iterator[Tuple[int, int, float, Dict[str, Any]]]:
+    """
+    Iterate over a trace's records as (kind, client, offset, message).
+
+    A record cut short (e.g. the bridge was killed mid-write) ends the trace.
+
+    Raises:
+        ValueError: If the file is not a trace this version can read
+    """
+    with open(path, "rb") as f:
+        _read_header(f, path)
+        while True:
+            record = f.read(RECORD.size)
+            if len(record) < RECORD.size:
+                return
+            kind, client, offset, length = RECORD.unpack(record)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield kind, client, offset, json.loads(payload)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of values (q in 0..1)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Any]:
+    """Count, mean and p50/p95/p99/max of latencies, in milliseconds."""
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "count": len(seconds),
+        "mean_ms": ms(sum(seconds) / len(seconds)) if seconds else None,
+        "p50_ms": ms(percentile(seconds, 0.5)),
+        "p95_ms": ms(percentile(seconds, 0.95)),
+        "p99_ms": ms(percentile(seconds, 0.99)),
+        "max_ms": ms(max(seconds)) if seconds else None,
+    }
+
+
+def load_trace(path: str) -> Tuple[List[Tuple[float, Dict[str, Any], Optional[float]]], int, Dict[str, List[float]]]:
+    """
+    Read the replayable commands of a trace.
+
+    A command's absolute 'deadline' only made sense at capture time, so it is
+    taken off the command and kept as the seconds it had left when it was
+    captured; the replay sets a new deadline that far from when it sends it.
+
+    Returns:
+        Tuple: ([(offset, command, seconds left before its deadline or None)] in
+                capture order, streaming commands skipped,
+                {action: [recorded latency in seconds]})
+    """
+    started = trace_started(path)
+    commands = []
+    skipped = 0
+    sent: Dict[Tuple[int, Any], Tuple[float, str]] = {}
+    recorded: Dict[str, List[float]] = {}
+    for kind, client, offset, message in read_trace(path):
+        if kind == COMMAND:
+            action = message.get("action")
+            if action in STREAMING_ACTIONS:
+                skipped += 1
+                continue
+            budget = None
+            if isinstance(message.get("deadline"), (int, float)):
+                message = dict(message)
+                budget = message.pop("deadline") - (started + offset)
+            commands.append((offset, message, budget))
+            if message.get("id") is not None:
+                sent[(client, message["id"])] = (offset, action)
+        elif "event" not in message:
+            # The first reply under a command's id answers it
+            request = sent.pop((client, message.get("id")), None)
+            if request is not None:
+                recorded.setdefault(request[1], []).append(offset - request[0])
+    return commands, skipped, recorded
+
+
+def replay_trace(path: str, script: str, bridge_args: List[str] = (), speed: float = 1.0,
+                 window: int = 64, timeout: float = 30.0) -> Dict[str, Any]:
+    """
+    Drive a resident bridge with the commands of a trace and measure it.
+
+    A fresh `python <script> --serve <bridge_args>` is started and fed the
+    trace's commands over stdin under new ids. With speed > 0 each command
+    is sent at its captured offset divided by speed (1 = real time); with
+    speed 0 commands are sent as fast as the bridge answers. Either way no
+    more than window commands are outstanding at once. Streaming commands
+    (subscribe, handshake) are skipped. A command captured with a deadline
+    gets one as far from its replay as it was from its capture.
+
+    Args:
+        path (str): Trace written by TraceWriter
+        script (str): Path of dde_manager.py
+        bridge_args (List[str]): Extra arguments for the bridge (e.g. its transport)
+        speed (float): Replay speed factor (0 = as fast as possible)
+        window (int): Maximum outstanding commands
+        timeout (float): Seconds to wait for outstanding replies after the last command
+
+    Returns:
+        dict: {trace, speed, commands, skipped, replies, errors, missing, duration_s,
+               throughput, latency, actions, recorded}; latencies are latency_summary()s
+    """
+    commands, skipped, recorded = load_trace(path)
+    process = subprocess.Popen(
+        [sys.executable, script, "--serve"] + list(bridge_args),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        text=True, encoding="utf-8", bufsize=1
+    )
+
+    outstanding = threading.Semaphore(window)
+    done = threading.Event()
+    lock = threading.Lock()
+    pending: Dict[int, Tuple[float, str]] = {}
+    latencies: Dict[str, List[float]] = {}
+    totals = {"replies": 0, "errors": 0}
+
+    def read_replies():
+        for line in process.stdout:
+            received = time.perf_counter()
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            with lock:
+                request = pending.pop(message.get("id"), None)
+                if request is None:
+                    continue
+                latencies.setdefault(request[1], []).append(received - request[0])
+                totals["replies"] += 1
+                if message.get("error"):
+                    totals["errors"] += 1
+                finished = totals["replies"] == len(commands)
+            outstanding.release()
+            if finished:
+                done.set()
+
+    reader = threading.Thread(target=read_replies, daemon=True)
+    reader.start()
+
+    started = time.perf_counter()
+    try:
+        for replay_id, (offset, command, budget) in enumerate(commands, 1):
+            if speed > 0:
+                delay = started + offset / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            outstanding.acquire()
+            with lock:
+                pending[replay_id] = (time.perf_counter(), command.get("action"))
+            message = dict(command, id=replay_id)
+            if budget is not None:
+                message["deadline"] = time.time() + budget
+            process.stdin.write(json.dumps(message) + "\n")
+            process.stdin.flush()
+        if commands:
+            done.wait(timeout)
+        elapsed = time.perf_counter() - started
+    finally:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    with lock:
+        every = [seconds for values in latencies.values() for seconds in values]
+        return {
+            "trace": os.path.basename(path),
+            "speed": speed,
+            "commands": len(commands),
+            "skipped": skipped,
+            "replies": totals["replies"],
+            "errors": totals["errors"],
+            "missing": len(pending),
+            "duration_s": round(elapsed, 3),
+            "throughput": round(totals["replies"] / elapsed, 1) if elapsed > 0 else None,
+            "latency": latency_summary(every),
+            "actions": {action: latency_summary(values) for action, values in sorted(latencies.items())},
+            "recorded": {action: latency_summary(values) for action, values in sorted(recorded.items())},
+        }
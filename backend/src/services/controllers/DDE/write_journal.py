@@ -0,0 +1,183 @@
+import time
+import sqlite3
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from bridge_metrics import metrics
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dde_write_journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    application TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    item TEXT NOT NULL,
+    value TEXT NOT NULL,
+    queued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dde_write_journal_item
+    ON dde_write_journal (application, topic, item, seq);
+"""
+
+# The newest pending write per item, oldest item first. SQLite takes the bare
+# columns of a MAX() aggregate from the row holding the maximum.
+COLLAPSED_QUERY = """
+SELECT MAX(seq), application, topic, item, value, COUNT(*)
+FROM dde_write_journal
+GROUP BY application, topic, item
+ORDER BY MAX(seq)
+LIMIT ?
+"""
+
+
+class WriteJournal:
+    """
+    Write-ahead journal for single-item writes, kept in a SQLite table.
+
+    A journaled write is committed here and acknowledged at once; the DDE
+    thread then applies the journal through replay_due(). Pending writes are
+    collapsed per item (only the newest value is poked, in the order each
+    item was last written), so an outage leaves one write per tag to replay
+    rather than every intermediate value. Rows are deleted once applied, so
+    writes acknowledged before a bridge restart are still replayed after it.
+
+    While the conversation cannot be opened, replay is retried every
+    retry_interval; the pool's availability breaker already fails those
+    attempts fast and paces the real ConnectTo calls. A write the PLC rejects
+    on a live conversation backs off exponentially up to max_retry_interval
+    and is dropped after max_attempts so it cannot block the rest.
+
+    Args:
+        path (str): SQLite database file (created if missing)
+        retry_interval (float): Seconds between retries while the conversation is down
+        max_retry_interval (float): Upper bound for the replay backoff
+        max_attempts (int): Pokes of one write on a live conversation before it is dropped
+        batch (int): Writes applied per replay_due() call
+    """
+
+    def __init__(self, path: str, retry_interval: float = 1.0, max_retry_interval: float = 30.0,
+                 max_attempts: int = 5, batch: int = 100):
+        self.path = path
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.max_attempts = max_attempts
+        self.batch = batch
+        # Only the DDE thread uses the connection, but it is created elsewhere
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.next_due = time.monotonic()
+        self.failures = 0
+        self.last_error = None
+        self.applied = 0
+        self.collapsed = 0
+        self.dropped: deque = deque(maxlen=20)
+        self._attempts: Dict[int, int] = {}
+
+    def append(self, server_name: str, topic: str, item: str, value: Any) -> int:
+        """Journal one write and return its sequence number."""
+        cursor = self.db.execute(
+            "INSERT INTO dde_write_journal (application, topic, item, value, queued_at) VALUES (?, ?, ?, ?, ?)",
+            (server_name, topic, item, str(value), time.time())
+        )
+        self.db.commit()
+        metrics.count("journal_appended")
+        if not self.failures:
+            self.next_due = time.monotonic()  # apply it on this bridge tick
+        return cursor.lastrowid
+
+    def pending_count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM dde_write_journal").fetchone()[0]
+
+    def pending_value(self, server_name: str, topic: str, item: str) -> Optional[str]:
+        """Newest journaled value of item on server/topic that has not been applied yet."""
+        row = self.db.execute(
+            "SELECT value FROM dde_write_journal WHERE application = ? AND topic = ? AND item = ? "
+            "ORDER BY seq DESC LIMIT 1",
+            (server_name, topic, item)
+        ).fetchone()
+        return row[0] if row else None
+
+    def collapsed_writes(self, limit: int = None) -> List[Tuple[int, str, str, str, str, int]]:
+        """Rows of (seq, application, topic, item, value, journaled writes) to apply, in order."""
+        return self.db.execute(COLLAPSED_QUERY, (limit or self.batch,)).fetchall()
+
+    def _discard(self, server_name: str, topic: str, item: str, seq: int) -> None:
+        self.db.execute(
+            "DELETE FROM dde_write_journal WHERE application = ? AND topic = ? AND item = ? AND seq <= ?",
+            (server_name, topic, item, seq)
+        )
+        self.db.commit()
+
+    def replay_due(self, pool) -> List[str]:
+        """
+        Apply pending writes if the journal is due.
+
+        Returns:
+            List[str]: Items written to the PLC by this call
+        """
+        now = time.monotonic()
+        if now < self.next_due:
+            return []
+        self.next_due = now + self.retry_interval
+
+        written = []
+        for seq, server_name, topic, item, value, count in self.collapsed_writes():
+            poked = False
+            try:
+                with pool.connection(server_name, topic) as conversation:
+                    poked = True
+                    conversation.Poke(item, value)
+            except Exception as e:
+                self.last_error = str(e)
+                if not poked:
+                    # Outage: the breaker paces reconnects, so just try again soon
+                    self.failures = max(self.failures, 1)
+                    return written
+
+                # Rejected write: keep the rest queued and back off
+                attempts = self._attempts.get(seq, 0) + 1
+                self._attempts[seq] = attempts
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(seq, None)
+                    self._discard(server_name, topic, item, seq)
+                    self.dropped.append({"item": item, "value": value, "error": str(e)})
+                    metrics.count("journal_dropped")
+                self.failures += 1
+                backoff = min(self.retry_interval * (2 ** (self.failures - 1)), self.max_retry_interval)
+                self.next_due = time.monotonic() + backoff
+                return written
+
+            self._attempts.pop(seq, None)
+            self._discard(server_name, topic, item, seq)
+            self.applied += 1
+            self.collapsed += count - 1
+            metrics.count("journal_replayed")
+            if count > 1:
+                metrics.count("journal_collapsed", count - 1)
+            written.append(item)
+
+        self.failures = 0
+        self.last_error = None
+        return written
+
+    def has_pending(self) -> bool:
+        return self.db.execute("SELECT 1 FROM dde_write_journal LIMIT 1").fetchone() is not None
+
+    def status(self) -> Dict[str, Any]:
+        oldest = self.db.execute("SELECT MIN(queued_at) FROM dde_write_journal").fetchone()[0]
+        return {
+            "path": self.path,
+            "pending": self.pending_count(),
+            "pending_items": len(self.collapsed_writes(limit=-1)),
+            "oldest_age": round(time.time() - oldest, 3) if oldest is not None else None,
+            "applied": self.applied,
+            "collapsed": self.collapsed,
+            "dropped": list(self.dropped),
+            "retry_in": max(self.next_due - time.monotonic(), 0.0) if self.failures else 0.0,
+            "last_error": self.last_error,
+        }
+
+    def close(self) -> None:
+        self.db.close()
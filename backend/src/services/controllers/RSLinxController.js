@@ -2,6 +2,8 @@
 import { spawn } from "node:child_process";
 import { fileURLToPath } from "node:url";
 import { dirname, join } from "node:path";
+import config from "../config/rslinx.config.js";
+import dbConfig from "../config/db.config.js";
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
@@ -9,62 +11,261 @@ const __dirname = dirname(__filename);
 class DDEClient {
   constructor() {
     this.pythonScript = join(__dirname, "dde_manager.py");
+    this.bridge = null;
+    this.pending = new Map(); // request id -> { resolve, reject }
+    this.listeners = new Map(); // subscription id -> event callback
+    this.nextId = 1;
   }
 
-  async executeDDECommand(command) {
-    return new Promise((resolve, reject) => {
-      const python = spawn("python", [
-        this.pythonScript,
-        JSON.stringify(command),
-      ]);
+  // Start (or reuse) the resident bridge process. It keeps its DDE
+  // conversations open, so only the first command pays for startup/connect.
+  getBridge() {
+    if (this.bridge) {
+      return this.bridge;
+    }
 
-      let dataString = "";
+    // With several stations each topic gets its own worker process
+    const args = [this.pythonScript, "--serve"];
+    if (config.topics.length > 1) {
+      args.push("--topics", config.topics.join(","));
+    }
+    if (config.recorder.enabled && dbConfig?.filename) {
+      args.push(
+        "--record-db",
+        dbConfig.filename,
+        "--record-rate",
+        String(config.recorder.rate)
+      );
+    }
+    const python = spawn("python", args, {
+      // DDE_SPAWNED_AT lets the bridge time its own startup from spawn
+      env: { ...process.env, DDE_SPAWNED_AT: String(Date.now()) },
+    });
+    let buffer = "";
 
-      python.stdout.on("data", (data) => {
-        dataString += data.toString();
-      });
+    python.stdout.on("data", (data) => {
+      buffer += data.toString();
+      let newline;
+      while ((newline = buffer.indexOf("\n")) !== -1) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (!line) continue;
 
-      python.stderr.on("data", (data) => {
-        console.error(`Python Error: ${data}`);
-      });
-
-      python.on("close", (code) => {
+        let result;
         try {
-          const result = JSON.parse(dataString);
-          resolve(result);
+          result = JSON.parse(line);
         } catch (e) {
-          reject(new Error("Failed to parse Python output"));
+          console.error(`Unparseable bridge output: ${line}`);
+          continue;
         }
-      });
+
+        const { id, ...reply } = result;
+        if (reply.event) {
+          const listener = this.listeners.get(id);
+          if (listener) listener(reply);
+          continue;
+        }
+
+        const request = this.pending.get(id);
+        if (request) {
+          this.pending.delete(id);
+          // A refused subscribe/handshake never streams under its request id
+          if (reply.error) this.listeners.delete(id);
+          request.resolve(reply);
+        }
+      }
+    });
+
+    python.stderr.on("data", (data) => {
+      console.error(`Python Error: ${data}`);
+    });
+
+    const onExit = (error) => {
+      if (this.bridge !== python) return;
+      this.bridge = null;
+      for (const request of this.pending.values()) {
+        request.reject(error || new Error("DDE bridge process exited"));
+      }
+      this.pending.clear();
+      for (const listener of this.listeners.values()) {
+        listener({ event: "error", error: "DDE bridge process exited" });
+      }
+      this.listeners.clear();
+    };
+    python.on("close", () => onExit());
+    python.on("error", (error) => onExit(error));
+    // A write to a bridge that died (EPIPE) is reported here, not thrown by
+    // write(); without a handler it would take the whole backend down
+    python.stdin.on("error", (error) => {
+      onExit(error);
+      python.kill();
     });
+
+    this.bridge = python;
+    return python;
   }
 
-  async readTag(tag) {
+  // onEvent is registered for commands that keep streaming events under
+  // their id (subscribe, handshake) and dropped again if the command fails.
+  // Other commands get an absolute deadline (Unix seconds) of
+  // config.connection.requestTimeout from now.
+  async executeDDECommand(command, onEvent = null) {
+    return new Promise((resolve, reject) => {
+      const id = this.nextId++;
+      this.pending.set(id, { resolve, reject });
+      if (onEvent) {
+        this.listeners.set(id, onEvent);
+      }
+      const timeout = config.connection.requestTimeout;
+      if (!onEvent && command.deadline === undefined && timeout > 0) {
+        command = { ...command, deadline: (Date.now() + timeout) / 1000 };
+      }
+      try {
+        this.getBridge().stdin.write(JSON.stringify({ ...command, id }) + "\n");
+      } catch (e) {
+        this.pending.delete(id);
+        this.listeners.delete(id);
+        reject(e);
+      }
+    });
+  }
+
+  // Every tag method takes the station's topic; it defaults to config.topic
+  async readTag(tag, topic = config.topic) {
     const command = {
       action: "read",
-      application: "RSLinx",
-      topic: "ExcelLink",
+      application: config.application,
+      topic,
       item: tag,
     };
     return this.executeDDECommand(command);
   }
 
-  async writeTag(tag, value) {
+  async writeTag(tag, value, topic = config.topic) {
     const command = {
       action: "write",
-      application: "RSLinx",
-      topic: "ExcelLink",
+      application: config.application,
+      topic,
       item: tag,
       value: value,
     };
     return this.executeDDECommand(command);
   }
 
-  async checkConnection() {
+  async readTags(tags, topic = config.topic) {
+    const command = {
+      action: "read_many",
+      application: config.application,
+      topic,
+      items: tags,
+    };
+    return this.executeDDECommand(command);
+  }
+
+  // items: { tagName: value } or an ordered [{ item, value }] list
+  async writeTags(items, stopOnError = false, topic = config.topic) {
+    const command = {
+      action: "write_many",
+      application: config.application,
+      topic,
+      items: items,
+      stop_on_error: stopOnError,
+    };
+    return this.executeDDECommand(command);
+  }
+
+  // Open a hot link on tags. onEvent receives { event: "change", item, value,
+  // timestamp } whenever a value changes, or { event: "error", error }.
+  async subscribe(tags, onEvent, interval = 100, topic = config.topic) {
+    const command = {
+      action: "subscribe",
+      application: config.application,
+      topic,
+      items: tags,
+      interval: interval,
+    };
+    const reply = await this.executeDDECommand(command, onEvent);
+    if (reply.error) {
+      throw new Error(reply.error);
+    }
+
+    const id = reply.subscription;
+    return {
+      id,
+      unsubscribe: () => {
+        this.listeners.delete(id);
+        return this.executeDDECommand({
+          action: "unsubscribe",
+          subscription: id,
+        });
+      },
+    };
+  }
+
+  // Watch the end-of-pull handshake run by the bridge. onEvent receives
+  // { event: "checkout_complete", sequence, quantity, timestamp } once per
+  // completed pull, after the bridge has written completeAck. The bridge
+  // holds back the ack until the quantity reaches quantityThreshold.
+  async watchCheckout(onEvent, topic = config.topic, quantityThreshold = 0) {
+    const reply = await this.executeDDECommand(
+      {
+        action: "handshake",
+        application: config.application,
+        topic,
+        threshold: quantityThreshold,
+      },
+      onEvent
+    );
+    if (reply.error) {
+      throw new Error(reply.error);
+    }
+
+    const id = reply.watching;
+    return {
+      id,
+      sequence: reply.sequence,
+      unsubscribe: () => {
+        this.listeners.delete(id);
+        return this.executeDDECommand({
+          action: "unsubscribe",
+          subscription: id,
+        });
+      },
+    };
+  }
+
+  // Start recording the quantity of the pull for this checkout; the bridge
+  // ends the session itself when the checkout handshake completes
+  async startRecording(user, project, item, topic = config.topic) {
+    return this.executeDDECommand({
+      action: "record_start",
+      application: config.application,
+      topic,
+      user,
+      project,
+      item,
+    });
+  }
+
+  async stopRecording(topic = config.topic) {
+    return this.executeDDECommand({
+      action: "record_stop",
+      application: config.application,
+      topic,
+    });
+  }
+
+  // Latency histograms and counters of the bridge; format "prometheus"
+  // returns { text } in the Prometheus exposition format instead
+  async getStats(format = "json", topic = config.topic) {
+    return this.executeDDECommand({ action: "stats", format, topic });
+  }
+
+  async checkConnection(topic = config.topic) {
     const command = {
       action: "check",
-      application: "RSLinx",
-      topic: "ExcelLink",
+      application: config.application,
+      topic,
     };
     return this.executeDDECommand(command);
   }
@@ -73,11 +274,14 @@ class DDEClient {
 // Create singleton instance
 const ddeClient = new DDEClient();
 
+// Station a request is for: ?topic= or a "topic" body field, else the default
+const topicOf = (req) => req.query?.topic || req.body?.topic || config.topic;
+
 // Controller methods
 export const getTagValue = async (req, res) => {
   try {
     const { tagName } = req.params;
-    const result = await ddeClient.readTag(tagName);
+    const result = await ddeClient.readTag(tagName, topicOf(req));
     res.json({
       tag: tagName,
       ...result,
@@ -97,7 +301,7 @@ export const writeTagValue = async (req, res) => {
       return res.status(400).json({ error: "Value is required" });
     }
 
-    const result = await ddeClient.writeTag(tagName, value);
+    const result = await ddeClient.writeTag(tagName, value, topicOf(req));
     res.json(result);
   } catch (error) {
     res.status(500).json({ error: error.message });
@@ -112,13 +316,13 @@ export const getBatchTagValues = async (req, res) => {
       return res.status(400).json({ error: "Tags must be an array" });
     }
 
-    const results = {};
-    for (const tag of tags) {
-      results[tag] = await ddeClient.readTag(tag);
+    const batch = await ddeClient.readTags(tags, topicOf(req));
+    if (batch.error) {
+      return res.status(500).json({ error: batch.error });
     }
 
     res.json({
-      results,
+      results: batch.results,
       timestamp: new Date().toISOString(),
     });
   } catch (error) {
@@ -136,9 +340,14 @@ export const writeBatchTags = async (req, res) => {
         .json({ error: "Tags must be an object mapping tagNames to values" });
     }
 
+    const batch = await ddeClient.writeTags(tags, false, topicOf(req));
+    if (batch.error) {
+      return res.status(500).json({ error: batch.error });
+    }
+
     const results = {};
-    for (const [tagName, value] of Object.entries(tags)) {
-      results[tagName] = await ddeClient.writeTag(tagName, value);
+    for (const { item, ...result } of batch.results) {
+      results[item] = result;
     }
 
     res.json({
@@ -152,7 +361,7 @@ export const writeBatchTags = async (req, res) => {
 
 export const getConnectionStatus = async (req, res) => {
   try {
-    const status = await ddeClient.checkConnection();
+    const status = await ddeClient.checkConnection(topicOf(req));
     res.json(status);
   } catch (error) {
     res.status(500).json({ error: error.message });
@@ -161,7 +370,7 @@ export const getConnectionStatus = async (req, res) => {
 
 export const reconnectRSLinx = async (req, res) => {
   try {
-    const status = await ddeClient.checkConnection();
+    const status = await ddeClient.checkConnection(topicOf(req));
     res.json(status);
   } catch (error) {
     res.status(500).json({ error: error.message });
@@ -171,7 +380,7 @@ export const reconnectRSLinx = async (req, res) => {
 export const validateTagConnection = async (req, res) => {
   try {
     const { tagName } = req.params;
-    const result = await ddeClient.readTag(tagName);
+    const result = await ddeClient.readTag(tagName, topicOf(req));
     res.json({
       valid: !result.error,
       error: result.error,
@@ -183,12 +392,14 @@ export const validateTagConnection = async (req, res) => {
 
 export const runDiagnostics = async (req, res) => {
   try {
-    const connectionStatus = await ddeClient.checkConnection();
+    const topic = topicOf(req);
+    const connectionStatus = await ddeClient.checkConnection(topic);
 
     const diagnosticResults = {
       configuration: {
-        server: "RSLinx",
-        topic: "ExcelLink",
+        server: config.application,
+        topic,
+        topics: config.topics,
         connectionType: "DDE",
       },
       connection: {
@@ -207,6 +418,22 @@ export const runDiagnostics = async (req, res) => {
   }
 };
 
+export const getBridgeStats = async (req, res) => {
+  try {
+    const { format = "json" } = req.query;
+    const stats = await ddeClient.getStats(format, topicOf(req));
+    if (stats.error) {
+      return res.status(500).json({ error: stats.error });
+    }
+    if (format === "prometheus") {
+      return res.type("text/plain; version=0.0.4").send(stats.text);
+    }
+    res.json(stats);
+  } catch (error) {
+    res.status(500).json({ error: error.message });
+  }
+};
+
 export const writeSequence = async (req, res) => {
   try {
     const { name, moNumber, itemNumber } = req.body;
@@ -226,21 +453,43 @@ export const writeSequence = async (req, res) => {
 
     let currentStep = 1;
 
-    // Step 1: Write userName
-    await ddeClient.writeTag(userName, name);
-    await ddeClient.writeTag(stepNumber, currentStep++);
-
-    // Step 2: Write moNumber
-    await ddeClient.writeTag(moNumberTag, moNumber);
-    await ddeClient.writeTag(stepNumber, currentStep++);
-
-    // Step 3: Write itemNumber
-    await ddeClient.writeTag(itemNumberTag, itemNumber);
-    await ddeClient.writeTag(stepNumber, currentStep++);
+    // All steps go to the bridge as one ordered batch that stops at the
+    // first failed write
+    const batch = await ddeClient.writeTags(
+      [
+        // Step 1: Write userName
+        { item: userName, value: name },
+        { item: stepNumber, value: currentStep++ },
+
+        // Step 2: Write moNumber
+        { item: moNumberTag, value: moNumber },
+        { item: stepNumber, value: currentStep++ },
+
+        // Step 3: Write itemNumber
+        { item: itemNumberTag, value: itemNumber },
+        { item: stepNumber, value: currentStep++ },
+
+        // Step 4: Write completeAck
+        { item: completeAck, value: true },
+        { item: stepNumber, value: currentStep },
+      ],
+      true,
+      topicOf(req)
+    );
+
+    const failed = batch.error
+      ? [{ error: batch.error }]
+      : batch.results.filter((result) => !result.success);
+    if (failed.length > 0) {
+      throw new Error(failed[0].error);
+    }
 
-    // Step 4: Write completeAck
-    await ddeClient.writeTag(completeAck, true);
-    await ddeClient.writeTag(stepNumber, currentStep);
+    // Recording is best effort and must not hold up the checkout
+    if (config.recorder.enabled) {
+      ddeClient
+        .startRecording(name, moNumber, itemNumber, topicOf(req))
+        .catch((error) => console.error("Pull recording failed:", error.message));
+    }
 
     res.json({
       success: true,
@@ -267,60 +516,73 @@ export const monitorQuantity = async (req, res) => {
   monitoringSessions.set(sessionId, abortController);
 
   try {
-    const {
-      pollInterval = 500,
-      timeout = 600000,
-      quantityThreshold = 0,
-    } = req.query;
-
-    const quantityTag = "Reel.RealData[0]";
-    const completeRequestTag = "_200_GLB.BoolData[0].0";
+    const { timeout = 600000, quantityThreshold = 0 } = req.query;
 
     const startTime = Date.now();
     let quantity = null;
-    let lastCompleteRequest = "0";
-
-    while (Date.now() - startTime < Number(timeout)) {
-      if (abortController.signal.aborted) {
-        console.log(`Monitoring session ${sessionId} was aborted.`);
-        return res.status(200).json({ success: false, aborted: true });
-      }
-
-      const completeRequestResult = await ddeClient.readTag(completeRequestTag);
-      const completeRequest = completeRequestResult.value;
-
-      if (completeRequest === "1") {
-        const quantityResult = await ddeClient.readTag(quantityTag);
-        quantity = quantityResult.value;
-      }
-
-      const numericQuantity = quantity !== null ? Number(quantity) : 0;
-      const numericThreshold = Number(quantityThreshold);
-
-      const thresholdCheck =
-        numericThreshold === 0 || numericQuantity >= numericThreshold;
-
-      if (completeRequest === "1" && quantity !== null && thresholdCheck) {
-        monitoringSessions.delete(sessionId);
-        return res.json({
-          success: true,
-          finalQuantity: quantity,
-          finalCompleteRequest: completeRequest,
-          timeElapsed: Date.now() - startTime,
-          timestamp: new Date().toISOString(),
+    let completeRequest = "0";
+
+    // The bridge watches completeRequest, captures the final quantity and
+    // writes completeAck itself once the quantity reaches the threshold; we
+    // just wait for its completion event
+    const outcome = await new Promise((resolve, reject) => {
+      let watch = null;
+      let finished = false;
+
+      const finish = (result) => {
+        if (finished) return;
+        finished = true;
+        clearTimeout(timer);
+        abortController.signal.removeEventListener("abort", onAbort);
+        if (watch) watch.unsubscribe().catch(() => {});
+        resolve(result);
+      };
+
+      const timer = setTimeout(
+        () => finish({ completed: false }),
+        Number(timeout)
+      );
+      const onAbort = () => finish({ aborted: true });
+      abortController.signal.addEventListener("abort", onAbort);
+
+      const onEvent = (event) => {
+        if (event.event !== "checkout_complete") return;
+        if (watch && event.sequence <= watch.sequence) return;
+
+        quantity = event.quantity;
+        completeRequest = "1";
+        finish({ completed: true });
+      };
+
+      ddeClient
+        .watchCheckout(onEvent, topicOf(req), Number(quantityThreshold) || 0)
+        .then((opened) => {
+          watch = opened;
+          if (finished) watch.unsubscribe().catch(() => {});
+        })
+        .catch((error) => {
+          finished = true;
+          clearTimeout(timer);
+          abortController.signal.removeEventListener("abort", onAbort);
+          reject(error);
         });
-      }
+    });
 
-      lastCompleteRequest = completeRequest;
+    monitoringSessions.delete(sessionId);
 
-      await new Promise((resolve) => setTimeout(resolve, Number(pollInterval)));
+    if (!outcome.completed && config.recorder.enabled) {
+      ddeClient.stopRecording(topicOf(req)).catch(() => {});
+    }
+
+    if (outcome.aborted) {
+      console.log(`Monitoring session ${sessionId} was aborted.`);
+      return res.status(200).json({ success: false, aborted: true });
     }
 
-    monitoringSessions.delete(sessionId);
     res.json({
-      success: false,
-      finalQuantity: quantity || "0",
-      finalCompleteRequest: lastCompleteRequest,
+      success: outcome.completed,
+      finalQuantity: outcome.completed ? quantity : quantity || "0",
+      finalCompleteRequest: completeRequest,
       timeElapsed: Date.now() - startTime,
       timestamp: new Date().toISOString(),
     });
@@ -1,9 +1,38 @@
 # simplified_dde_bridge.py
+import time
+
+STARTED = time.perf_counter()
+
 import sys
+import os
 import json
-import win32ui
-import dde
-import time
+import queue
+import itertools
+import threading
+
+DDE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DDE')
+sys.path.insert(0, DDE_DIR)
+
+# Serve-mode modules (tag_cache, encoder_buffer, handshake, bridge_socket) are
+# imported where they are used, so a one-shot command does not pay for them
+import dde_transport
+from dde_transport import transport as dde
+from bridge_metrics import InstrumentedConversation, metrics
+
+# Application/topic used when a command names none; a topic worker started by
+# TopicRouter gets its own topic here
+DEFAULT_APPLICATION = os.environ.get('DDE_APPLICATION', 'RSLinx')
+DEFAULT_TOPIC = os.environ.get('DDE_TOPIC', 'ExcelLink')
+
+RSLINX_INIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'init', 'rslinx.init.py')
+
+def load_rslinx_init():
+    """Load init/rslinx.init.py (its file name is not importable as a module)"""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location('rslinx_init', RSLINX_INIT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
 def check_dde_server(server_name, topic):
     """Quick check if DDE server is available"""
@@ -34,68 +63,1123 @@ def create_dde_connection(server_name, topic):
     conversation.ConnectTo(server_name, topic)
     return server, conversation
 
-def handle_dde_command(command):
-    """Handle different DDE commands"""
+REQUIRED_FIELDS = {
+    'read': 'item',
+    'write': 'item',
+    'read_many': 'items',
+    'write_many': 'items',
+    'subscribe': 'items',
+    'unsubscribe': 'subscription'
+}
+
+# Scheduling lanes of the resident bridge, most urgent first. Writes
+# (stepNumber, CompleteAck) default to control, everything else to interactive
+PRIORITIES = ('control', 'interactive', 'background')
+
+def command_priority(command):
+    """The command's lane: its 'priority', or the default for its action"""
+    priority = command.get('priority')
+    if priority is None:
+        return 'control' if command.get('action') in ('write', 'write_many') else 'interactive'
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority} (expected one of {', '.join(PRIORITIES)})")
+    return priority
+
+def command_deadline(command):
+    """The command's absolute 'deadline' as Unix time in seconds, or None"""
+    deadline = command.get('deadline')
+    if deadline is None:
+        return None
+    try:
+        return float(deadline)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid deadline: {deadline!r} (expected Unix time in seconds)')
+
+def expired_reply(action):
+    """Reply for a command whose deadline passed before it reached the PLC"""
+    metrics.count('expired', action=action)
+    return {
+        'error': 'Deadline expired before the command ran',
+        'expired': True
+    }
+
+def write_pairs(items):
+    """Normalize write_many items (item->value map or list of {item, value}) to ordered pairs"""
+    if isinstance(items, dict):
+        return list(items.items())
+    return [(entry['item'], entry['value']) for entry in items]
+
+def prepare_command(command):
+    """Resolve tag names and DDE links to items and encode write values through the tag registry
+
+    Raises ValueError for a malformed link or a value the tag's declared type
+    rejects, so an invalid write never reaches the PLC. Preparing a prepared
+    command changes nothing.
+    """
+    action = command.get('action')
+    if action not in ('read', 'write', 'read_many', 'write_many', 'subscribe'):
+        return command
+    from tag_registry import get_registry
+    registry = get_registry()
+    prepared = dict(command)
+
+    if action in ('read', 'write') and 'item' in command:
+        topic, item = registry.resolve(str(command['item']))
+        prepared['item'] = item
+        if topic is not None and 'topic' not in command:
+            prepared['topic'] = topic
+        if action == 'write' and 'value' in command:
+            prepared['value'] = registry.encode(item, command['value'])
+    elif action in ('read_many', 'subscribe') and 'items' in command:
+        prepared['items'] = [registry.resolve(str(reference))[1] for reference in command['items']]
+    elif action == 'write_many' and 'items' in command:
+        # Every value is checked before the first one is poked
+        prepared['items'] = []
+        for reference, value in write_pairs(command['items']):
+            item = registry.resolve(str(reference))[1]
+            prepared['items'].append({
+                'item': item,
+                'value': registry.encode(item, value)
+            })
+    return prepared
+
+def decode_result(command, result):
+    """Typed read/read_many values (REAL, DINT, BOOL, STRING) from the tag registry"""
+    action = command.get('action')
+    if action not in ('read', 'read_many') or not isinstance(result, dict):
+        return result
+    from tag_registry import get_registry
+    registry = get_registry()
+    if action == 'read' and result.get('error') is None and 'value' in result:
+        result['value'] = registry.decode(command['item'], result['value'])
+        data_type = registry.data_type(command['item'])
+        if data_type is not None:
+            result['type'] = data_type
+    elif action == 'read_many' and isinstance(result.get('results'), dict):
+        registry.decode_many(result['results'])
+    return result
+
+def conversation_lost(conversation, error):
+    """True when a failed Request/Poke took the conversation down with it
+    (e.g. RSLinx closed it), rather than failing just that one item"""
+    if not isinstance(error, dde.error):
+        return False
+    try:
+        return not conversation.Connected()
+    except Exception:
+        return True
+
+def run_action(conversation, action, command):
+    """Run a read/write action on an open conversation
+
+    read_many/write_many report item errors per item, but a lost
+    conversation is raised so the pool drops it instead of keeping it
+    as healthy.
+    """
+    if action == 'read':
+        value = conversation.Request(command['item'])
+        return {
+            'value': value,
+            'error': None
+        }
+
+    elif action == 'write':
+        conversation.Poke(command['item'], str(command['value']))
+        return {
+            'success': True,
+            'error': None
+        }
+
+    elif action == 'read_many':
+        results = {}
+        for item in command['items']:
+            try:
+                results[item] = {
+                    'value': conversation.Request(item),
+                    'error': None
+                }
+            except Exception as e:
+                if conversation_lost(conversation, e):
+                    raise
+                results[item] = {
+                    'value': None,
+                    'error': str(e)
+                }
+        return {
+            'results': results,
+            'error': None
+        }
+
+    elif action == 'write_many':
+        # Writes run in the given order (a list may repeat an item, e.g. a step counter);
+        # with stop_on_error the remaining writes are skipped after the first failure
+        results = []
+        for item, value in write_pairs(command['items']):
+            try:
+                conversation.Poke(item, str(value))
+                results.append({
+                    'item': item,
+                    'success': True,
+                    'error': None
+                })
+            except Exception as e:
+                if conversation_lost(conversation, e):
+                    raise
+                results.append({
+                    'item': item,
+                    'success': False,
+                    'error': str(e)
+                })
+                if command.get('stop_on_error'):
+                    break
+        return {
+            'results': results,
+            'error': None
+        }
+
+    else:
+        return {
+            'error': f'Unknown action: {action}'
+        }
+
+def handle_dde_command(command, pool=None):
+    """Handle different DDE commands
+
+    When a DDEConnectionPool is given the conversation is borrowed from it
+    instead of being created and destroyed for this one command. A command
+    whose 'deadline' has passed fails without touching the PLC, and the
+    deadline bounds the connection retries. A pooled conversation lost
+    during the command (also part-way through read_many/write_many) is
+    replaced and the whole command run once more on the new one.
+    """
     try:
-        server_name = command.get('application', 'RSLinx')
-        topic = command.get('topic', 'ExcelLink')
+        server_name = command.get('application', DEFAULT_APPLICATION)
+        topic = command.get('topic', DEFAULT_TOPIC)
         action = command.get('action')
+        deadline = command_deadline(command)
+
+        if action == 'stats':
+            if command.get('format') == 'prometheus':
+                return {
+                    'text': metrics.prometheus(),
+                    'error': None
+                }
+            return dict(metrics.snapshot(), error=None)
 
         if action == 'check':
-            available, message = check_dde_server(server_name, topic)
+            with metrics.timed('probe'):
+                available, message = check_dde_server(server_name, topic)
             return {
                 'available': available,
                 'message': message
             }
 
+        required = REQUIRED_FIELDS.get(action)
+        if required and required not in command:
+            return {
+                'error': f'Missing required field: {required}'
+            }
+
+        try:
+            command = prepare_command(command)
+        except ValueError as e:
+            metrics.count('invalid', action=action)
+            return {
+                'error': str(e),
+                'invalid': True
+            }
+        server_name = command.get('application', DEFAULT_APPLICATION)
+        topic = command.get('topic', DEFAULT_TOPIC)
+
+        if action in ('subscribe', 'unsubscribe') and pool is None:
+            return {
+                'error': f'{action} is only available in --serve mode'
+            }
+
+        if deadline is not None and time.time() >= deadline:
+            return expired_reply(action)
+
+        if pool is not None:
+            try:
+                with pool.connection(server_name, topic, deadline) as conversation:
+                    return decode_result(command, run_action(conversation, action, command))
+            except dde.error:
+                # The pooled conversation went stale and was dropped; retry once.
+                # A batch runs again from its first item (write_many re-sends
+                # writes in order, so the final values are the same)
+                if deadline is not None and time.time() >= deadline:
+                    return expired_reply(action)
+                metrics.count('retries', action=action)
+                with pool.connection(server_name, topic, deadline) as conversation:
+                    return decode_result(command, run_action(conversation, action, command))
+
         # For read and write actions, create a connection
         server = None
         conversation = None
         try:
-            server, conversation = create_dde_connection(server_name, topic)
+            with metrics.timed('connect'):
+                server, conversation = create_dde_connection(server_name, topic)
+            return decode_result(command, run_action(InstrumentedConversation(conversation), action, command))
 
-            if action == 'read':
-                value = conversation.Request(command['item'])
-                return {
-                    'value': value,
-                    'error': None
-                }
+        finally:
+            try:
+                with metrics.timed('cleanup'):
+                    if conversation:
+                        del conversation
+                    if server:
+                        server.Destroy()
+            except:
+                pass
 
-            elif action == 'write':
-                conversation.Poke(command['item'], str(command['value']))
-                return {
+    except Exception as e:
+        return {
+            'error': str(e)
+        }
+
+class Subscription:
+    """Hot link on a set of items.
+
+    pywin32's DDE conversation has no client-side advise (XTYP_ADVSTART), so
+    the link is kept by re-reading the items over one pooled conversation every
+    interval and emitting an event only when a value actually changes.
+    """
+
+    def __init__(self, client, subscription_id, server_name, topic, items, interval):
+        self.client = client
+        self.id = subscription_id
+        self.server_name = server_name
+        self.topic = topic
+        self.items = list(items)
+        self.interval = interval
+        self.values = {}
+        self.error = None
+        self.next_due = time.monotonic()
+
+    def poll(self, pool):
+        """Read every item once and return change/error events since the last poll"""
+        from tag_cache import utc_timestamp
+        from tag_registry import get_registry
+        registry = get_registry()
+        self.next_due = time.monotonic() + self.interval
+        events = []
+        try:
+            with pool.connection(self.server_name, self.topic) as conversation:
+                for item in self.items:
+                    value = conversation.Request(item)
+                    if item in self.values and self.values[item] == value:
+                        continue
+                    self.values[item] = value
+                    events.append({
+                        'id': self.id,
+                        'event': 'change',
+                        'item': item,
+                        'value': registry.decode(item, value),
+                        'timestamp': utc_timestamp()
+                    })
+            self.error = None
+        except Exception as e:
+            # Report a failing link once, not on every poll
+            if self.error != str(e):
+                self.error = str(e)
+                events.append({
+                    'id': self.id,
+                    'event': 'error',
+                    'error': self.error,
+                    'timestamp': utc_timestamp()
+                })
+        return events
+
+def handle_subscription_command(command, subscriptions, client=None):
+    """Open or close a hot link in serve mode
+
+    Subscriptions are keyed by (client, id) so clients can reuse request ids.
+    """
+    required = REQUIRED_FIELDS[command['action']]
+    if required not in command:
+        return {
+            'error': f'Missing required field: {required}'
+        }
+
+    if command['action'] == 'unsubscribe':
+        removed = subscriptions.pop((client, command['subscription']), None)
+        return {
+            'success': removed is not None,
+            'error': None if removed else f"Unknown subscription: {command['subscription']}"
+        }
+
+    subscription = Subscription(
+        client,
+        command.get('id'),
+        command.get('application', DEFAULT_APPLICATION),
+        command.get('topic', DEFAULT_TOPIC),
+        command['items'],
+        command.get('interval', 100) / 1000.0
+    )
+    subscriptions[(client, subscription.id)] = subscription
+    return {
+        'subscription': subscription.id,
+        'items': subscription.items,
+        'error': None
+    }
+
+def handle_cached_command(command, pool, poller):
+    """Answer reads from the scan cache where possible, falling through to the PLC otherwise"""
+    action = command.get('action')
+
+    if action == 'cache':
+        return dict(poller.snapshot(), error=None)
+
+    if action == 'set_scan_class':
+        if 'name' not in command or 'rate' not in command:
+            return {
+                'error': 'Missing required field: name and rate'
+            }
+        poller.set_scan_class(command['name'], command['rate'], command.get('items'), command.get('pull_rate'))
+        return dict(poller.snapshot(), error=None)
+
+    if action == 'read' and 'item' in command:
+        item = command['item']
+        cached = poller.lookup(item)
+        if cached:
+            return cached
+        result = handle_dde_command(command, pool)
+        if result.get('error') is None and poller.max_age(item) is not None:
+            poller.cache.update(item, result['value'])
+        return result
+
+    if action == 'read_many' and 'items' in command:
+        results = {}
+        missing = []
+        for item in command['items']:
+            cached = poller.lookup(item)
+            if cached:
+                results[item] = cached
+            else:
+                missing.append(item)
+
+        if missing:
+            result = handle_dde_command(dict(command, items=missing), pool)
+            if result.get('error') is not None:
+                return result
+            for item, item_result in result['results'].items():
+                if item_result['error'] is None and poller.max_age(item) is not None:
+                    poller.cache.update(item, item_result['value'])
+            results.update(result['results'])
+
+        return {
+            'results': {item: results[item] for item in command['items']},
+            'error': None
+        }
+
+    result = handle_dde_command(command, pool)
+    if action == 'write' and 'item' in command:
+        poller.cache.invalidate(command['item'])
+    elif action == 'write_many' and 'items' in command:
+        for item_result in result.get('results', []):
+            poller.cache.invalidate(item_result['item'])
+    return result
+
+class StreamClient:
+    """A JSON-lines client on a pair of text streams (stdin/stdout)"""
+
+    def __init__(self, stream_out):
+        self.stream_out = stream_out
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        with self.lock:
+            self.stream_out.write(json.dumps(message) + '\n')
+            self.stream_out.flush()
+
+def handle_encoder_command(command, sampler):
+    """Answer history/pull_stats from the encoder ring buffer"""
+    if sampler is None:
+        return {
+            'error': 'Encoder sampling is not enabled (start the bridge with --encoder-rate)'
+        }
+
+    if command['action'] == 'history':
+        try:
+            samples = sampler.history(command.get('seconds', 60), command.get('points', 200))
+        except ValueError as e:
+            return {
+                'error': str(e),
+                'invalid': True
+            }
+        return {
+            'item': sampler.item,
+            'columns': ['timestamp', 'mean', 'min', 'max'],
+            'samples': samples,
+            'stats': sampler.stats(),
+            'error': None
+        }
+
+    return dict(sampler.stats(), item=sampler.item, error=None)
+
+def handle_handshake_command(command, handshake, watchers, client=None):
+    """Attach a watcher to the checkout handshake with the quantity its completion must reach"""
+    threshold = command.get('threshold', 0)
+    if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not 0 <= threshold < float('inf'):
+        return {
+            'error': f'Invalid threshold: {threshold!r} (expected a quantity of 0 or more)',
+            'invalid': True
+        }
+    watchers[(client, command.get('id'))] = float(threshold)
+    return dict(handshake.status(), watching=command.get('id'), error=None)
+
+RECORDER_ACTIONS = ('record_start', 'record_stop', 'recorder')
+
+def handle_recorder_command(command, recorder):
+    """Start/stop a pull-session recording or report on the recorder"""
+    if recorder is None:
+        return {
+            'error': 'Pull recording is not enabled (start the bridge with --record-db)'
+        }
+
+    if command['action'] == 'record_start':
+        session = recorder.start(command.get('user'), command.get('project'), command.get('item'))
+        return dict(session, error=None)
+
+    if command['action'] == 'record_stop':
+        return {
+            'session': recorder.stop(),
+            'error': None
+        }
+
+    return dict(recorder.status(), error=None)
+
+def handle_journaled_write(command, journal):
+    """Journal a write and acknowledge it before it reaches the PLC"""
+    if 'value' not in command:
+        return {
+            'error': 'Missing required field: value'
+        }
+    sequence = journal.append(
+        command.get('application', DEFAULT_APPLICATION),
+        command.get('topic', DEFAULT_TOPIC),
+        command['item'],
+        command['value']
+    )
+    return {
+        'success': True,
+        'queued': True,
+        'sequence': sequence,
+        'error': None
+    }
+
+def last_known_reply(item, error, last_known, journal=None, server_name=DEFAULT_APPLICATION, topic=DEFAULT_TOPIC):
+    """The last value read from item, marked stale, or None if it was never read
+
+    A write to item still waiting in the journal for this server/topic is
+    reported alongside it.
+    """
+    from tag_cache import ANY_AGE
+    entry = last_known.get(item, max_age=ANY_AGE)
+    if entry is None:
+        return None
+    reply = {
+        'value': entry['value'],
+        'error': None,
+        'stale': True,
+        'timestamp': entry['timestamp'],
+        'last_error': error
+    }
+    if journal is not None:
+        pending = journal.pending_value(server_name, topic, item)
+        if pending is not None:
+            reply['pending_write'] = pending
+    return reply
+
+def fall_back_to_last_known(command, result, last_known, journal=None):
+    """Remember values from successful reads; answer failed reads from them, marked stale"""
+    action = command.get('action')
+    station = (command.get('application', DEFAULT_APPLICATION), command.get('topic', DEFAULT_TOPIC))
+
+    if action == 'read' and 'item' in command:
+        item = command['item']
+        if result.get('error') is None:
+            if not result.get('cached'):
+                last_known.update(item, result['value'])
+            return result
+        return last_known_reply(item, result['error'], last_known, journal, *station) or result
+
+    if action == 'read_many' and 'items' in command:
+        if result.get('error') is not None:
+            # The whole batch failed (e.g. no conversation): answer item by item
+            results = {item: {'value': None, 'error': result['error']} for item in command['items']}
+        else:
+            results = dict(result['results'])
+        for item, item_result in results.items():
+            if item_result['error'] is None:
+                if not item_result.get('cached'):
+                    last_known.update(item, item_result['value'])
+            else:
+                results[item] = last_known_reply(item, item_result['error'], last_known, journal, *station) or item_result
+        if result.get('error') is not None and not any(r.get('stale') for r in results.values()):
+            return result
+        return {
+            'results': results,
+            'error': None
+        }
+
+    return result
+
+def coalesce_key(command):
+    """Identity of a read for in-flight coalescing, or None for commands that must each run"""
+    action = command.get('action')
+    server_name = command.get('application', DEFAULT_APPLICATION)
+    topic = command.get('topic', DEFAULT_TOPIC)
+    try:
+        # A read only joins one queued in the same lane, so it never waits behind a lower one
+        # (an explicit 'priority' naming the default lane is the same lane)
+        priority = command_priority(command)
+        if action == 'read' and 'item' in command:
+            return (action, server_name, topic, command['item'], priority)
+        if action == 'read_many' and 'items' in command:
+            return (action, server_name, topic, tuple(command['items']), priority)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+class BridgeServer:
+    """Runs every DDE command on one thread on behalf of any number of clients.
+
+    Front ends (the asyncio scheduler behind stdin, sockets) call submit()
+    from their own threads; run() executes the commands in arrival order over
+    one shared pool, sends each reply back to the client that asked, and
+    between commands polls subscriptions and scan classes and maintains the
+    pool.
+    While any client watches the checkout handshake ('handshake' action)
+    the HandshakeEngine runs here too and every completed checkout is pushed
+    to each watcher; a completion is only acknowledged once its quantity
+    reaches the highest 'threshold' among the watchers.
+    A read that is identical to one already queued or running is not queued
+    again: it waits for that read and gets the same reply.
+    With a WriteJournal, 'write' commands are journaled and acknowledged at
+    once, the journal is replayed here in order, and reads that fail are
+    answered from the last known value marked stale. 'write_many' is not
+    journaled: its steps must reach the PLC in order and uncollapsed, so a
+    failure is still reported to the caller.
+    Commands are run by lane ('priority': control, interactive, background;
+    writes default to control, the rest to interactive) and in arrival
+    order within a lane, so a control write overtakes queued monitoring
+    reads. A command carrying an absolute 'deadline' (Unix time) that has
+    passed by the time it comes up fails without touching the PLC, and the
+    time left bounds its connection retries.
+    Queue wait and run time of every command are recorded per action in
+    bridge_metrics ('stats' action); with metrics_file the Prometheus text
+    dump is rewritten there on every maintenance tick.
+    With a PullRecorder, the quantity of the current pull is sampled here
+    while a session is open and the session ends on the checkout handshake.
+    With a TraceWriter, every command and every message sent to a client is
+    captured for replay (see traffic_trace).
+
+    A client is any object with a send(message) method.
+    """
+
+    def __init__(self, pool, poller=None, idle_interval=1.0, sampler=None, handshake=None, metrics_file=None, journal=None, trace=None, recorder=None):
+        self.pool = pool
+        self.poller = poller
+        self.sampler = sampler
+        if handshake is None:
+            from handshake import HandshakeEngine
+            handshake = HandshakeEngine(server_name=DEFAULT_APPLICATION, topic=DEFAULT_TOPIC)
+        self.handshake = handshake
+        self.journal = journal
+        self.last_known = None
+        if journal is not None:
+            if poller is not None:
+                self.last_known = poller.cache
+            else:
+                from tag_cache import TagCache
+                self.last_known = TagCache()
+        self.handshake_watchers = {}
+        self.idle_interval = idle_interval
+        self.metrics_file = metrics_file
+        self.trace = trace
+        self.recorder = recorder
+        self.commands = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self.subscriptions = {}
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def submit(self, client, text):
+        """Queue one command (JSON text or dict) from client (thread-safe)"""
+        try:
+            command = json.loads(text) if isinstance(text, (str, bytes)) else dict(text)
+        except ValueError as e:
+            self.send(client, {
+                'error': str(e),
+                'id': None
+            })
+            return
+        if not isinstance(command, dict):
+            self.send(client, {
+                'error': 'Command must be a JSON object',
+                'id': None
+            })
+            return
+        if self.trace is not None:
+            self.trace.command(client, command)
+        try:
+            lane = PRIORITIES.index(command_priority(command))
+            deadline = command_deadline(command)
+        except ValueError as e:
+            self.send(client, {
+                'error': str(e),
+                'id': command.get('id')
+            })
+            return
+
+        key = coalesce_key(command)
+        if key is not None:
+            with self._inflight_lock:
+                waiters = self._inflight.get(key)
+                if waiters is not None:
+                    waiters.append((client, command.get('id'), deadline))
+                    metrics.count('coalesced')
+                    return
+                self._inflight[key] = [(client, command.get('id'), deadline)]
+
+        self._put(lane, client, command, time.perf_counter())
+
+    def _put(self, lane, client, command, queued_at):
+        # The sequence keeps arrival order within a lane (and is never tied)
+        self.commands.put((lane, next(self._sequence), client, command, queued_at))
+
+    def disconnect(self, client):
+        """Drop a client's subscriptions once it goes away (thread-safe)"""
+        self._put(0, client, None, None)
+
+    def stop(self):
+        # Behind every queued command
+        self._put(len(PRIORITIES), None, None, None)
+
+    def dispatch(self, client, command, queued_at=None):
+        action = command.get('action')
+        started = time.perf_counter()
+        if queued_at is not None:
+            metrics.observe('queue', started - queued_at, action)
+
+        key = coalesce_key(command)
+        if key is not None:
+            # A coalesced read runs while any caller still wants it
+            with self._inflight_lock:
+                deadlines = [deadline for _, _, deadline in self._inflight.get(key, [])]
+            if deadlines:
+                command = dict(command, deadline=None if None in deadlines else max(deadlines))
+
+        try:
+            # Names and links become items and write values are checked
+            # before anything is journaled or poked
+            command = prepare_command(command)
+            invalid = None
+        except ValueError as e:
+            metrics.count('invalid', action=action)
+            invalid = {
+                'error': str(e),
+                'invalid': True
+            }
+
+        try:
+            deadline = command_deadline(command)
+            if invalid is not None:
+                result = invalid
+            elif deadline is not None and time.time() >= deadline:
+                result = expired_reply(action)
+            elif command.get('action') == 'handshake':
+                result = handle_handshake_command(command, self.handshake, self.handshake_watchers, client)
+            elif command.get('action') == 'unsubscribe' and (client, command.get('subscription')) in self.handshake_watchers:
+                del self.handshake_watchers[(client, command['subscription'])]
+                result = {
                     'success': True,
                     'error': None
                 }
-
+            elif command.get('action') in ('subscribe', 'unsubscribe'):
+                result = handle_subscription_command(command, self.subscriptions, client)
+            elif command.get('action') in ('history', 'pull_stats'):
+                result = handle_encoder_command(command, self.sampler)
+            elif action in RECORDER_ACTIONS:
+                result = handle_recorder_command(command, self.recorder)
+            elif action == 'journal':
+                if self.journal is None:
+                    result = {
+                        'error': 'The write journal is not enabled (start the bridge with --journal)'
+                    }
+                else:
+                    result = dict(self.journal.status(), error=None)
+            elif self.journal is not None and action == 'write' and 'item' in command and command.get('journal', True):
+                result = handle_journaled_write(command, self.journal)
+            elif self.poller is not None:
+                result = handle_cached_command(command, self.pool, self.poller)
             else:
-                return {
-                    'error': f'Unknown action: {action}'
-                }
+                result = handle_dde_command(command, self.pool)
+            if self.journal is not None and not result.get('expired'):
+                result = fall_back_to_last_known(command, result, self.last_known, self.journal)
+            result = decode_result(command, result)
+        except Exception as e:
+            result = {
+                'error': str(e)
+            }
+        metrics.observe('command', time.perf_counter() - started, action)
+        if result.get('error'):
+            metrics.count('errors', action=action)
+        if action == 'stats' and 'text' not in result:
+            result['bridge'] = {
+                'queue_depth': self.commands.qsize(),
+                'subscriptions': len(self.subscriptions),
+                'handshake_watchers': len(self.handshake_watchers),
+                'inflight_reads': len(self._inflight)
+            }
+
+        if key is None:
+            result['id'] = command.get('id')
+            self.send(client, result)
+            return
+
+        with self._inflight_lock:
+            waiters = self._inflight.pop(key, [])
+        for waiter, request_id, _ in waiters:
+            self.send(waiter, dict(result, id=request_id))
+
+    def send(self, client, message):
+        if self.trace is not None:
+            self.trace.reply(client, message)
+        try:
+            client.send(message)
+        except Exception:
+            self.disconnect(client)
+
+    def run(self):
+        last_maintained = time.monotonic()
+        try:
+            while True:
+                wake_at = last_maintained + self.idle_interval
+                for subscription in self.subscriptions.values():
+                    wake_at = min(wake_at, subscription.next_due)
+                if self.poller is not None and self.poller.next_due() is not None:
+                    wake_at = min(wake_at, self.poller.next_due())
+                if self.sampler is not None:
+                    wake_at = min(wake_at, self.sampler.next_due)
+                if self.handshake_watchers:
+                    wake_at = min(wake_at, self.handshake.next_due)
+                if self.journal is not None and self.journal.has_pending():
+                    wake_at = min(wake_at, self.journal.next_due)
+                if self.recorder is not None and self.recorder.active:
+                    wake_at = min(wake_at, self.recorder.next_due)
+
+                try:
+                    _, _, client, command, queued_at = self.commands.get(timeout=max(0.0, wake_at - time.monotonic()))
+                except queue.Empty:
+                    client, command, queued_at = None, {}, None
+
+                if client is None and command is None:
+                    break
+
+                if command is None:
+                    for key in [key for key in self.subscriptions if key[0] is client]:
+                        del self.subscriptions[key]
+                    for key in [key for key in self.handshake_watchers if key[0] is client]:
+                        del self.handshake_watchers[key]
+                elif command:
+                    self.dispatch(client, command, queued_at)
+
+                now = time.monotonic()
+                for subscription in list(self.subscriptions.values()):
+                    if subscription.next_due <= now:
+                        for event in subscription.poll(self.pool):
+                            self.send(subscription.client, event)
 
+                if self.handshake_watchers:
+                    # A completion is acknowledged once it satisfies every watcher
+                    threshold = max(self.handshake_watchers.values())
+                    for event in self.handshake.poll_due(self.pool, threshold):
+                        if self.recorder is not None:
+                            self.recorder.stop(event['quantity'])
+                        for (watcher, watch_id) in list(self.handshake_watchers):
+                            self.send(watcher, dict(event, id=watch_id))
+
+                if self.journal is not None and self.journal.has_pending():
+                    for item in self.journal.replay_due(self.pool):
+                        self.last_known.invalidate(item)
+
+                if self.sampler is not None:
+                    self.sampler.sample_due(self.pool)
+
+                if self.recorder is not None:
+                    self.recorder.sample_due(self.pool)
+
+                if self.poller is not None:
+                    # A pull is in progress while its checkout is watched or recorded
+                    self.poller.set_pulling(bool(self.handshake_watchers) or (self.recorder is not None and self.recorder.active))
+                    self.poller.poll_due(self.pool)
+
+                if now - last_maintained >= self.idle_interval:
+                    self.pool.maintain()
+                    if self.metrics_file:
+                        self.write_metrics()
+                    if self.trace is not None:
+                        self.trace.flush()
+                    last_maintained = time.monotonic()
         finally:
-            try:
-                if conversation:
-                    del conversation
-                if server:
-                    server.Destroy()
-            except:
-                pass
+            self.pool.close_all()
+            if self.journal is not None:
+                self.journal.close()
+            if self.recorder is not None:
+                self.recorder.close()
+            if self.metrics_file:
+                self.write_metrics()
+            if self.trace is not None:
+                self.trace.close()
+
+    def write_metrics(self):
+        """Replace metrics_file with the current Prometheus text dump"""
+        temp_path = self.metrics_file + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                f.write(metrics.prometheus())
+            os.replace(temp_path, self.metrics_file)
+        except OSError:
+            pass
+
+def record_startup():
+    """Record the startup phase: from process spawn ($DDE_SPAWNED_AT, epoch ms,
+    set by the Node client) or else module import, until ready to serve"""
+    spawned_at = os.environ.get('DDE_SPAWNED_AT')
+    if spawned_at:
+        metrics.observe('startup', max(time.time() - float(spawned_at) / 1000.0, 0.0))
+    else:
+        metrics.observe('startup', time.perf_counter() - STARTED)
+
+def serve(pool, poller=None, stream_in=sys.stdin, stream_out=sys.stdout, idle_interval=1.0, listen=None, sampler=None, handshake=None, metrics_file=None, bridge=None, journal=None, trace=None, recorder=None, request_timeout=30.0, allow_remote=False):
+    """Resident mode: one JSON command per line in, one JSON reply per line out.
 
+    Each command may carry an 'id' which is echoed back on its reply so the
+    caller can correlate responses. A 'subscribe' command keeps emitting
+    {'id', 'event', ...} lines under its own id until it is unsubscribed.
+    With a ScanPoller, scan classes are polled into its last-known-value
+    cache and reads are answered from it while fresh. With an EncoderSampler,
+    the quantity is sampled into its ring buffer for 'history'/'pull_stats'.
+    A 'stats' command returns the bridge's latency histograms and counters
+    (format='prometheus' for the text dump); metrics_file keeps that dump
+    on disk.
+    The bridge runs on the AsyncDDEScheduler's worker thread, where all DDE
+    work stays; the pool is maintained every idle_interval seconds between
+    commands. Stdin lines are fed to it by the scheduler's asyncio front end,
+    and a command not answered within request_timeout seconds is answered
+    with an error.
+
+    With listen (e.g. 'tcp:127.0.0.1:8765' or 'unix:/tmp/dde.sock') the same
+    bridge also accepts framed clients on a local socket; a TCP listener
+    binds to a loopback address only, unless allow_remote is set. Passing
+    stream_in=None serves the socket only, until interrupted.
+
+    Passing bridge (e.g. a TopicRouter) serves these front ends from it
+    instead of a BridgeServer built from the other arguments.
+    """
+    import asyncio
+    from dde_scheduler import AsyncDDEScheduler, serve_lines
+
+    if bridge is None:
+        bridge = BridgeServer(pool, poller, idle_interval, sampler, handshake, metrics_file, journal, trace, recorder)
+    scheduler = AsyncDDEScheduler(bridge, default_timeout=request_timeout)
+
+    listener = None
+    if listen:
+        from bridge_socket import BridgeSocketServer
+        listener = BridgeSocketServer(listen, bridge, allow_remote)
+        listener.start()
+
+    scheduler.start()
+    record_startup()
+    try:
+        if stream_in is not None:
+            # Stdin closing shuts the bridge down once every command is answered
+            asyncio.run(serve_lines(scheduler, stream_in, StreamClient(stream_out)))
+        else:
+            scheduler.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if listener is not None:
+            listener.close()
+        scheduler.stop(timeout=None)
+
+def worker_arguments(args):
+    """dde_manager.py arguments a topic worker inherits from the router's command line"""
+    worker_args = [
+        '--transport', args.transport,
+        '--probe-tag', args.probe_tag,
+        '--max-idle', str(args.max_idle),
+        '--handshake-interval', str(args.handshake_interval),
+        '--encoder-rate', str(args.encoder_rate),
+        '--encoder-window', str(args.encoder_window)
+    ]
+    if args.cache:
+        worker_args += ['--cache', '--cache-rate', str(args.cache_rate)]
+    if args.scan_config:
+        worker_args += ['--scan-config', args.scan_config]
+    if args.journal:
+        # One journal per station; TopicWorker fills in {topic}
+        root, ext = os.path.splitext(args.journal)
+        worker_args += ['--journal', root + '.{topic}' + ext]
+    if args.record_db:
+        # Every station records into the application database
+        worker_args += ['--record-db', args.record_db, '--record-rate', str(args.record_rate)]
+    return worker_args
+
+def run_once(text):
+    """Run one JSON command and print its result (the per-call spawn path)"""
+    try:
+        command = json.loads(text)
+        result = handle_dde_command(command)
+        print(json.dumps(result))
     except Exception as e:
-        return {
+        print(json.dumps({
             'error': str(e)
-        }
+        }))
+        sys.exit(1)
 
 def main():
     """Main entry point for the DDE bridge"""
+    # Fast path: a bare JSON argument skips argparse and the serve-mode imports
+    if len(sys.argv) == 2 and sys.argv[1].lstrip().startswith('{'):
+        run_once(sys.argv[1])
+        return
+    if sys.argv[1:2] == ['--bench-child']:
+        ready = time.perf_counter()
+        result = handle_dde_command(json.loads(sys.argv[2]))
+        done = time.perf_counter()
+        from startup_bench import report_child
+        report_child(STARTED, ready, done, result)
+        return
+
+    import argparse
+    parser = argparse.ArgumentParser(description='DDE bridge for RSLinx')
+    parser.add_argument('command', nargs='?', help='JSON command to run once')
+    parser.add_argument('--serve', action='store_true', help='Stay resident and read JSON-lines commands from stdin')
+    parser.add_argument('--listen', metavar='<address>', help='Stay resident and accept framed clients on tcp:HOST:PORT or unix:PATH')
+    parser.add_argument('--allow-remote', action='store_true', help='Let --listen bind to a TCP host other than 127.0.0.1/::1 (clients are not authenticated)')
+    parser.add_argument('--probe-tag', default=os.environ.get('DDE_PROBE_TAG', 'DDETest'), help='Tag used to validate idle pooled conversations')
+    parser.add_argument('--max-idle', type=float, default=300.0, help='Seconds before an idle pooled conversation is closed')
+    parser.add_argument('--transport', choices=['win32', 'sim'], default=os.environ.get('DDE_TRANSPORT', 'win32'), help='DDE backend: RSLinx via pywin32, or the in-process simulator')
+    parser.add_argument('--cache', action='store_true', default=os.environ.get('DDE_CACHE_ENABLED') == 'true', help='Scan tags in the background and answer reads from the last-known-value cache')
+    parser.add_argument('--cache-rate', type=int, default=int(os.environ.get('DDE_CACHE_UPDATE_RATE', '1000')), help='Scan rate in milliseconds of the status class, and of the quantity between pulls')
+    parser.add_argument('--encoder-rate', type=float, default=float(os.environ.get('DDE_ENCODER_RATE', '0')), help='Samples per second of the quantity tag into the encoder ring buffer (0 = off)')
+    parser.add_argument('--encoder-window', type=float, default=600.0, help='Seconds of encoder history kept in memory')
+    parser.add_argument('--handshake-interval', type=int, default=50, help='Milliseconds between completeRequest reads while the handshake is watched')
+    parser.add_argument('--metrics-file', default=os.environ.get('DDE_METRICS_FILE'), metavar='<filepath>', help='Rewrite a Prometheus text dump of the bridge metrics here every maintenance tick')
+    parser.add_argument('--journal', default=os.environ.get('DDE_JOURNAL'), metavar='<filepath>', help='SQLite write journal: acknowledge writes at once, replay them when RSLinx is reachable and answer failed reads with the last known value')
+    parser.add_argument('--record-db', default=os.environ.get('DDE_RECORD_DB'), metavar='<filepath>', help='Application SQLite database: record the quantity of each pull session into pull_samples')
+    parser.add_argument('--record-rate', type=float, default=float(os.environ.get('DDE_RECORD_RATE', '10')), help='Samples per second while a pull session is recorded')
+    parser.add_argument('--capture', default=os.environ.get('DDE_CAPTURE'), metavar='<filepath>', help='Record every command, reply and its timing to a binary trace for --replay')
+    parser.add_argument('--replay', metavar='<filepath>', help='Replay a captured trace against a fresh resident bridge and print throughput and latency percentiles')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='Replay speed factor: 1 = as captured, N = N times faster, 0 = as fast as possible')
+    parser.add_argument('--replay-window', type=int, default=64, help='Commands outstanding at once during --replay')
+    parser.add_argument('--topics', default=os.environ.get('DDE_TOPICS'), metavar='<topic,...>', help='Shard commands by topic across one worker process per listed topic')
+    parser.add_argument('--request-timeout', type=float, default=30.0, help='Seconds a --serve command may wait for the bridge before it is answered with an error')
+    parser.add_argument('--route-timeout', type=float, default=30.0, help='Seconds a sharded command may wait for its topic worker')
+    parser.add_argument('--scan-config', metavar='<filepath>', help='JSON file of scan classes: {name: {rate, items}}')
+    parser.add_argument('--bench-startup', action='store_true', help='Time cold starts of one-shot commands (import and first request) and print a JSON report')
+    parser.add_argument('--bench-runs', type=int, default=10, help='Spawns measured by --bench-startup')
+    parser.add_argument('--bench-baseline', metavar='<filepath>', help='JSON file of stored startup medians to compare against (created on first use)')
+    parser.add_argument('--bench-tolerance', type=float, default=0.25, help='Fractional slowdown over the baseline reported as a regression')
+
     try:
-        if len(sys.argv) != 2:
+        args = parser.parse_args()
+        dde_transport.use_transport(args.transport)
+
+        if args.bench_startup:
+            from startup_bench import run_startup_benchmark
+            os.environ['DDE_TRANSPORT'] = args.transport
+            report = run_startup_benchmark(
+                os.path.abspath(__file__),
+                {'action': 'read', 'item': args.probe_tag},
+                runs=args.bench_runs,
+                baseline=args.bench_baseline,
+                tolerance=args.bench_tolerance
+            )
+            print(json.dumps(report, indent=2))
+            if report.get('regressions'):
+                sys.exit(1)
+            return
+
+        if args.replay:
+            from traffic_trace import replay_trace
+            # The replayed bridge gets this command line's options, but runs on
+            # the simulator unless a transport is named: a trace replayed onto
+            # the line would repeat its writes
+            if not any(arg.startswith('--transport') for arg in sys.argv) and 'DDE_TRANSPORT' not in os.environ:
+                args.transport = 'sim'
+            bridge_args = [arg.replace('{topic}', DEFAULT_TOPIC) for arg in worker_arguments(args)]
+            if args.topics:
+                bridge_args += ['--topics', args.topics, '--route-timeout', str(args.route_timeout)]
+            report = replay_trace(
+                args.replay,
+                os.path.abspath(__file__),
+                bridge_args,
+                speed=args.replay_speed,
+                window=args.replay_window
+            )
+            print(json.dumps(report, indent=2))
+            return
+
+        trace = None
+        if args.capture and (args.serve or args.listen):
+            from traffic_trace import TraceWriter
+            trace = TraceWriter(args.capture)
+
+        if (args.serve or args.listen) and args.topics:
+            from topic_router import TopicRouter
+            router = TopicRouter(
+                [topic.strip() for topic in args.topics.split(',') if topic.strip()],
+                application=DEFAULT_APPLICATION,
+                worker_args=worker_arguments(args),
+                route_timeout=args.route_timeout,
+                trace=trace
+            )
+            serve(None, stream_in=sys.stdin if args.serve else None, listen=args.listen, bridge=router, request_timeout=args.request_timeout, allow_remote=args.allow_remote)
+            return
+
+        if args.serve or args.listen:
+            rslinx_init = load_rslinx_init()
+            pool = rslinx_init.DDEConnectionPool(probe_tag=args.probe_tag, max_idle=args.max_idle)
+            from tag_cache import ScanPoller, default_scan_classes
+            from encoder_buffer import EncoderSampler
+            from handshake import HandshakeEngine
+            poller = None
+            if args.cache:
+                if args.scan_config:
+                    with open(args.scan_config) as f:
+                        scan_classes = json.load(f)
+                else:
+                    scan_classes = default_scan_classes()
+                    for name in ('quantity', 'status'):
+                        scan_classes[name]['rate'] = args.cache_rate
+                poller = ScanPoller(scan_classes, server_name=DEFAULT_APPLICATION, topic=DEFAULT_TOPIC)
+            sampler = None
+            if args.encoder_rate > 0:
+                sampler = EncoderSampler(rate=args.encoder_rate, window=args.encoder_window,
+                                         server_name=DEFAULT_APPLICATION, topic=DEFAULT_TOPIC)
+            handshake = HandshakeEngine(interval=args.handshake_interval / 1000.0,
+                                        server_name=DEFAULT_APPLICATION, topic=DEFAULT_TOPIC)
+            journal = None
+            if args.journal:
+                from write_journal import WriteJournal
+                journal = WriteJournal(args.journal)
+            recorder = None
+            if args.record_db:
+                from pull_recorder import PullRecorder, SampleWriter
+                recorder = PullRecorder(SampleWriter(args.record_db), rate=args.record_rate,
+                                        server_name=DEFAULT_APPLICATION, topic=DEFAULT_TOPIC)
+            serve(pool, poller, stream_in=sys.stdin if args.serve else None, listen=args.listen, sampler=sampler, handshake=handshake, metrics_file=args.metrics_file, journal=journal, trace=trace, recorder=recorder, request_timeout=args.request_timeout, allow_remote=args.allow_remote)
+            return
+
+        if args.command is None:
             raise ValueError("Expected exactly one JSON argument")
 
-        command = json.loads(sys.argv[1])
-        result = handle_dde_command(command)
-        print(json.dumps(result))
+        run_once(args.command)
 
     except Exception as e:
         print(json.dumps({
@@ -104,4 +1188,4 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -2,6 +2,7 @@
 import express from "express";
 import {
   runDiagnostics,
+  getBridgeStats,
   getTagValue,
   writeTagValue,
   getBatchTagValues,
@@ -31,6 +32,7 @@ router.get("/validate/:tagName", validateTagConnection);
 
 // Diagnostics
 router.get("/diagnostics", runDiagnostics);
+router.get("/stats", getBridgeStats);
 
 // Production Operations
 router.get("/monitor/:sessionId", monitorQuantity);
@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import sqlite3
+import subprocess
+import importlib.util
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+CONTROLLERS_DIR = os.path.join(SRC, 'services', 'controllers')
+DDE_DIR = os.path.join(CONTROLLERS_DIR, 'DDE')
+DATABASE_DIR = os.path.join(SRC, 'database')
+
+# The bridge modules import each other by file name, as they do when run as scripts
+for path in (DDE_DIR, CONTROLLERS_DIR, DATABASE_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ.setdefault('DDE_TRANSPORT', 'sim')
+
+import dde_transport
+import updateDB
+from dde_simulator import SimulatedPLC, SimulatedTransport
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='session')
+def rslinx_init():
+    """init/rslinx.init.py (its file name is not importable as a module)"""
+    return load_module('rslinx_init', os.path.join(SRC, 'init', 'rslinx.init.py'))
+
+
+@pytest.fixture
+def plc(rslinx_init, monkeypatch, tmp_path):
+    """A fresh simulated RSLinx with a static tag table, active for one test"""
+    # Breaker verdicts must not outlive the test
+    monkeypatch.setenv('DDE_BREAKER_STATE', str(tmp_path / 'breaker.json'))
+    rslinx_init._breakers.clear()
+    simulated = SimulatedPLC()
+    previous = dde_transport._active
+    dde_transport.use_transport(SimulatedTransport(simulated))
+    yield simulated
+    dde_transport._active = previous
+    rslinx_init._breakers.clear()
+
+
+@pytest.fixture
+def pool(rslinx_init, plc):
+    pool = rslinx_init.DDEConnectionPool(validate_interval=0.0, max_retries=1, retry_delay=0.0)
+    yield pool
+    pool.close_all()
+
+
+# updateDB.py: a small application database and a spec that migrates it
+
+UPDATE_DB = os.path.abspath(updateDB.__file__)
+
+SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE);
+CREATE TABLE projects (
+    ProjectID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT NOT NULL UNIQUE,
+    Status TEXT,
+    OwnerID INTEGER REFERENCES users(id)
+);
+CREATE INDEX idx_projects_owner ON projects (OwnerID);
+CREATE TABLE project_log (ProjectID INTEGER, Note TEXT);
+CREATE TRIGGER projects_log AFTER UPDATE OF Status ON projects
+BEGIN INSERT INTO project_log VALUES (NEW.ProjectID, NEW.Status); END;
+CREATE VIEW active_projects AS SELECT Name FROM projects WHERE Status = 'ACTIVE';
+"""
+
+SPEC = {
+    'tables': {
+        'projects': {
+            'columns': {
+                'Status': {
+                    'values': ['ACTIVE', 'INACTIVE'],
+                    'default': 'ACTIVE',
+                    'map': {'Closed': 'INACTIVE'},
+                    'not_null': True
+                }
+            }
+        }
+    }
+}
+
+STATUSES = ['ACTIVE', 'active', 'Closed', None, 'INACTIVE']
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'app.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT INTO users (name) VALUES ('jdoe')")
+    conn.executemany("INSERT INTO projects (Name, Status, OwnerID) VALUES (?, ?, 1)",
+                     [(f"P{i}", STATUSES[i % len(STATUSES)]) for i in range(50)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def spec_file(tmp_path):
+    path = str(tmp_path / 'spec.json')
+    with open(path, 'w') as f:
+        json.dump(SPEC, f)
+    return path
+
+
+def run_update(database, spec_file, *options):
+    return subprocess.run([sys.executable, UPDATE_DB, '-d', database, '--spec', spec_file, '--no-backup', *options],
+                          capture_output=True, text=True)
+
+
+def statuses(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[0] for row in conn.execute("SELECT Status FROM projects ORDER BY ProjectID")]
+    finally:
+        conn.close()
+
+
+def expected_statuses(count=50):
+    mapped = {'ACTIVE': 'ACTIVE', 'active': 'ACTIVE', 'Closed': 'INACTIVE', None: 'ACTIVE', 'INACTIVE': 'INACTIVE'}
+    return [mapped[STATUSES[i % len(STATUSES)]] for i in range(count)]
+
+
+def assert_constrained(path):
+    conn = sqlite3.connect(path)
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO projects (Name, Status) VALUES ('bad', 'Other')")
+        conn.execute("INSERT INTO projects (Name) VALUES ('defaulted')")
+        assert conn.execute("SELECT Status FROM projects WHERE Name = 'defaulted'").fetchone()[0] == 'ACTIVE'
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def open_for_copy(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA foreign_keys=OFF")
+    conn.execute("PRAGMA legacy_alter_table=ON")
+    return conn
+
+
+def plan_projects(conn):
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(projects)")
+    columns = cursor.fetchall()
+    plan = updateDB.plan_column(cursor, 'projects', columns, 'Status', SPEC['tables']['projects']['columns']['Status'])
+    return columns, {'Status': plan}
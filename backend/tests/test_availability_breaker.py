@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import subprocess
+
+from conftest import DDE_DIR, SRC
+
+
+def test_failure_opens_and_backoff_doubles(rslinx_init):
+    breaker = rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink', base_backoff=10.0)
+    assert breaker.allow() == (True, '')
+    breaker.record_failure('ConnectTo failed')
+    assert breaker.state == breaker.OPEN
+    allowed, reason = breaker.allow()
+    assert not allowed and 'ConnectTo failed' in reason
+    first_retry = breaker.retry_at
+    breaker.record_failure('ConnectTo failed')
+    assert breaker.retry_at - first_retry >= 9.0
+
+
+def test_backoff_is_capped(rslinx_init):
+    breaker = rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink', base_backoff=1.0, max_backoff=4.0)
+    for _ in range(10):
+        breaker.record_failure('down')
+    assert breaker.retry_at - time.time() <= 4.0
+
+
+def test_half_open_lets_one_trial_through(rslinx_init):
+    breaker = rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink', base_backoff=5.0)
+    breaker.record_failure('down')
+    breaker.retry_at = time.time() - 1
+    assert breaker.allow() == (True, '')
+    assert breaker.state == breaker.HALF_OPEN
+    assert not breaker.allow()[0]
+
+
+def test_half_open_trial_closes_or_reopens(rslinx_init):
+    breaker = rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink')
+    breaker.record_failure('down')
+    breaker.retry_at = 0.0
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.status()['state'] == breaker.CLOSED
+    assert breaker.failures == 0
+
+    breaker.record_failure('down')
+    breaker.retry_at = 0.0
+    breaker.allow()
+    breaker.record_failure('still down')
+    assert breaker.state == breaker.OPEN
+    assert breaker.failures == 2
+
+
+def test_state_file_is_shared_between_breakers(rslinx_init, tmp_path):
+    path = str(tmp_path / 'breaker.json')
+    writer = rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink', base_backoff=30.0, state_file=path)
+    reader = rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink', state_file=path)
+    other = rslinx_init.AvailabilityBreaker('RSLinx|Station2', state_file=path)
+    writer.record_failure('down')
+    assert not reader.allow()[0]
+    assert other.allow()[0]
+
+
+def test_open_breaker_fails_connections_fast(rslinx_init, plc):
+    plc.available = False
+    server, conversation, error = rslinx_init.initialize_dde_connection('RSLinx', 'ExcelLink', max_retries=1)
+    assert conversation is None and 'ConnectTo failed' in error
+    connects = plc.counters['connects']
+    plc.available = True
+    server, conversation, error = rslinx_init.initialize_dde_connection('RSLinx', 'ExcelLink', max_retries=1)
+    assert conversation is None and error.startswith('DDE Server not available')
+    assert plc.counters['connects'] == connects
+
+
+def test_default_state_file_is_per_server_and_topic(rslinx_init, monkeypatch, tmp_path):
+    monkeypatch.delenv('DDE_BREAKER_STATE', raising=False)
+    monkeypatch.setattr(rslinx_init.tempfile, 'tempdir', str(tmp_path))
+    rslinx_init._breakers.clear()
+    try:
+        breaker = rslinx_init.get_availability_breaker('RSLinx', 'Station 2')
+        assert breaker.state_file == str(tmp_path / 'dde_breaker_RSLinx_Station_2.json')
+        assert rslinx_init.get_availability_breaker('RSLinx', 'ExcelLink').state_file != breaker.state_file
+    finally:
+        rslinx_init._breakers.clear()
+
+
+def test_one_shot_bridge_fails_fast_on_an_open_breaker(rslinx_init, tmp_path):
+    env = dict(os.environ, DDE_TRANSPORT='sim', TMPDIR=str(tmp_path), TEMP=str(tmp_path), TMP=str(tmp_path))
+    env.pop('DDE_BREAKER_STATE', None)
+    state_file = os.path.join(str(tmp_path), 'dde_breaker_RSLinx_ExcelLink.json')
+    rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink', base_backoff=60.0, state_file=state_file).record_failure('down')
+
+    link = {'application': 'RSLinx', 'topic': 'ExcelLink', 'item': 'DDETest'}
+    result = subprocess.run([sys.executable, os.path.join(DDE_DIR, 'dde_bridge.py'), json.dumps(link)],
+                            capture_output=True, text=True, env=env)
+    assert json.loads(result.stdout)['error'].startswith('DDE Server not available')
+
+
+def test_success_recorded_elsewhere_closes_the_shared_breaker(rslinx_init, tmp_path):
+    path = str(tmp_path / 'breaker.json')
+    stale = rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink', state_file=path)
+    rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink', base_backoff=30.0, state_file=path).record_failure('down')
+    # stale still believes the breaker is closed; the shared file says otherwise
+    stale.record_success()
+    assert rslinx_init.AvailabilityBreaker('RSLinx|ExcelLink', state_file=path).allow() == (True, '')
+
+
+RECORD_FAILURES = """
+import sys, importlib.util
+spec = importlib.util.spec_from_file_location('rslinx_init', sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+breaker = module.AvailabilityBreaker(sys.argv[3], state_file=sys.argv[2])
+for _ in range(25):
+    breaker.record_failure('down')
+"""
+
+
+def test_concurrent_processes_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / 'breaker.json')
+    init_path = os.path.join(SRC, 'init', 'rslinx.init.py')
+    env = dict(os.environ, DDE_TRANSPORT='sim')
+    writers = [subprocess.Popen([sys.executable, '-c', RECORD_FAILURES, init_path, path, f'RSLinx|Station{i}'], env=env)
+               for i in range(6)]
+    assert [writer.wait(60) for writer in writers] == [0] * 6
+
+    with open(path) as f:
+        shared = json.load(f)
+    assert {key: entry['failures'] for key, entry in shared.items()} == {f'RSLinx|Station{i}': 25 for i in range(6)}
+    assert [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')] == []
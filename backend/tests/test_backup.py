@@ -0,0 +1,78 @@
+import os
+import gzip
+import shutil
+import sqlite3
+
+import pytest
+
+import updateDB
+
+
+def row_count(path, table='projects'):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def leftovers(path):
+    return [name for name in os.listdir(os.path.dirname(path)) if '.partial' in name]
+
+
+def test_backup_copies_in_steps(database):
+    backup = updateDB.create_backup(database, pages=1, pause=0.0)
+    assert backup == database + '.backup'
+    assert row_count(backup) == 50
+    assert leftovers(database) == []
+
+
+def test_compressed_backup(database, tmp_path):
+    backup = updateDB.create_backup(database, pause=0.0, compress=True)
+    assert backup == database + '.backup.gz'
+    restored = str(tmp_path / 'restored.db')
+    with gzip.open(backup, 'rb') as packed, open(restored, 'wb') as raw:
+        shutil.copyfileobj(packed, raw)
+    assert row_count(restored) == 50
+    assert leftovers(database) == []
+
+
+def test_writes_during_the_backup_restart_it_then_it_finishes_in_one_step(database, monkeypatch, capsys):
+    writer = sqlite3.connect(database)
+
+    def application_writes(seconds):
+        writer.execute("INSERT INTO project_log VALUES (1, 'written during backup')")
+        writer.commit()
+
+    monkeypatch.setattr(updateDB.time, 'sleep', application_writes)
+    backup = updateDB.create_backup(database, pages=1, pause=0.01)
+    writer.close()
+    assert 'restarted 3 times' in capsys.readouterr().out
+    assert row_count(backup, 'project_log') == row_count(database, 'project_log') > 0
+
+
+def test_backup_that_fails_integrity_check_keeps_the_previous_one(tmp_path):
+    path = str(tmp_path / 'corrupt.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (a INTEGER, b INTEGER)")
+    conn.execute("CREATE INDEX t_a ON t (a)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(i, -i) for i in range(100)])
+    conn.commit()
+    conn.close()
+    previous = updateDB.create_backup(path, pause=0.0)
+
+    # Point the index at the other column: its entries no longer match the table
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA writable_schema=ON")
+    conn.execute("UPDATE sqlite_master SET sql = 'CREATE INDEX t_a ON t (b)' WHERE name = 't_a'")
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(sqlite3.DatabaseError, match='integrity_check'):
+        updateDB.create_backup(path, pause=0.0)
+    assert leftovers(path) == []
+    conn = sqlite3.connect(previous)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+    finally:
+        conn.close()
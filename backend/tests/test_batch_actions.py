@@ -0,0 +1,78 @@
+import pytest
+
+import dde_manager
+import dde_simulator
+
+
+def test_read_many_reports_each_item(pool, plc):
+    result = dde_manager.handle_dde_command({
+        'action': 'read_many',
+        'items': ['quantity', 'DDETest', 'Missing.Tag']
+    }, pool)
+    assert result['error'] is None
+    results = result['results']
+    assert results['Reel.RealData[0]'] == {'value': 0.0, 'error': None}
+    assert results['DDETest']['value'] == 0.0
+    assert results['Missing.Tag']['value'] is None
+    assert 'Request failed' in results['Missing.Tag']['error']
+
+
+def test_write_many_runs_in_order(pool, plc):
+    result = dde_manager.handle_dde_command({
+        'action': 'write_many',
+        'items': [
+            {'item': 'stepNumber', 'value': 1},
+            {'item': 'userName', 'value': 'jdoe'},
+            {'item': 'stepNumber', 'value': 2}
+        ]
+    }, pool)
+    assert result['error'] is None
+    assert [r['item'] for r in result['results']] == ['_200_GLB.DintData[2]', '_200_GLB.StringData[0]', '_200_GLB.DintData[2]']
+    assert all(r['success'] for r in result['results'])
+    assert plc.values['_200_GLB.DintData[2]'] == 2
+    assert plc.values['_200_GLB.StringData[0]'] == 'jdoe'
+
+
+def test_write_many_stop_on_error(pool, plc):
+    result = dde_manager.handle_dde_command({
+        'action': 'write_many',
+        'items': {'Missing.Tag': 1, 'stepNumber': 3},
+        'stop_on_error': True
+    }, pool)
+    assert len(result['results']) == 1
+    assert not result['results'][0]['success']
+    assert plc.values['_200_GLB.DintData[2]'] == 0
+
+
+def test_write_many_checks_every_value_first(pool, plc):
+    result = dde_manager.handle_dde_command({
+        'action': 'write_many',
+        'items': {'stepNumber': 1, 'completeAck': 'maybe'}
+    }, pool)
+    assert result['invalid']
+    assert plc.counters['pokes'] == 0
+
+
+def test_missing_items_field(pool, plc):
+    result = dde_manager.handle_dde_command({'action': 'read_many'}, pool)
+    assert result == {'error': 'Missing required field: items'}
+
+
+@pytest.mark.parametrize('command', [
+    {'action': 'read_many', 'items': ['DDETest', 'quantity']},
+    {'action': 'write_many', 'items': {'stepNumber': 1, 'userName': 'jdoe'}}
+])
+def test_batch_is_retried_on_a_new_conversation(pool, plc, monkeypatch, command):
+    # Only the first call into the PLC drops its conversation
+    draws = iter([0.0])
+    monkeypatch.setattr(dde_simulator.random, 'random', lambda: next(draws, 1.0))
+    plc.disconnect_rate = 0.5
+    result = dde_manager.handle_dde_command(command, pool)
+    assert result['error'] is None
+    assert plc.counters['faults'] == 1
+    assert plc.counters['connects'] == 2
+    if command['action'] == 'read_many':
+        assert all(r['error'] is None for r in result['results'].values())
+    else:
+        assert all(r['success'] for r in result['results'])
+        assert plc.values['_200_GLB.StringData[0]'] == 'jdoe'
@@ -0,0 +1,72 @@
+import pytest
+
+import dde_manager
+from bridge_metrics import BridgeMetrics, InstrumentedConversation, LatencyHistogram, metrics
+from test_bridge_server import run_command
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    histogram = LatencyHistogram(buckets=(0.001, 0.01, 0.1))
+    for seconds in (0.0005, 0.002, 0.003, 0.05, 0.5):
+        histogram.observe(seconds)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.quantile(0.5) == 0.01
+    # The +Inf bucket reports the largest observation
+    assert histogram.quantile(0.99) == 0.5
+    assert LatencyHistogram().quantile(0.5) is None
+
+
+def test_snapshot_keeps_phase_action_and_tag_apart():
+    recorder = BridgeMetrics()
+    recorder.observe('request', 0.002, action='read', tag='DDETest')
+    recorder.observe('request', 0.004)
+    recorder.count('retries', phase='connect')
+    recorder.count('retries', phase='connect')
+    snapshot = recorder.snapshot()
+    assert snapshot['phases']['request']['count'] == 2
+    assert snapshot['actions']['read']['request']['count'] == 1
+    assert snapshot['tags']['DDETest']['request']['max_ms'] == 2.0
+    assert snapshot['counters'] == {'retries{phase=connect}': 2}
+
+
+def test_timed_block_counts_its_failure():
+    recorder = BridgeMetrics()
+    with pytest.raises(KeyError):
+        with recorder.timed('connect'):
+            raise KeyError('down')
+    snapshot = recorder.snapshot()
+    assert snapshot['phases']['connect']['count'] == 1
+    assert snapshot['counters'] == {'errors{phase=connect}': 1}
+
+
+def test_prometheus_dump():
+    recorder = BridgeMetrics()
+    recorder.observe('poke', 0.003, tag='Tag "A"')
+    recorder.count('reconnects')
+    text = recorder.prometheus()
+    assert 'dde_bridge_phase_seconds_bucket{phase="poke",le="0.005"} 1' in text
+    assert 'dde_bridge_phase_seconds_count{phase="poke",tag="Tag \\"A\\""} 1' in text
+    assert 'dde_bridge_reconnects_total 1' in text
+
+
+def test_instrumented_conversation_times_each_call(plc, pool):
+    recorder = BridgeMetrics()
+    with pool.connection('RSLinx', 'ExcelLink') as conversation:
+        timed = InstrumentedConversation(conversation, recorder)
+        timed.Request('DDETest')
+        timed.Poke('_200_GLB.DintData[2]', '1')
+        assert timed.Connected()
+    assert set(recorder.snapshot()['tags']) == {'DDETest', '_200_GLB.DintData[2]'}
+
+
+def test_stats_action_reports_the_bridge(pool, plc):
+    metrics.reset()
+    bridge = dde_manager.BridgeServer(pool)
+    run_command(bridge, {'id': 1, 'action': 'read', 'item': 'DDETest'})
+    stats = run_command(bridge, {'id': 2, 'action': 'stats'})[0]
+    assert stats['error'] is None
+    assert stats['actions']['read']['command']['count'] == 1
+    assert stats['bridge'] == {'queue_depth': 0, 'subscriptions': 0, 'handshake_watchers': 0, 'inflight_reads': 0}
+
+    text = run_command(bridge, {'id': 3, 'action': 'stats', 'format': 'prometheus'})[0]['text']
+    assert 'dde_bridge_phase_seconds_count{phase="command",action="read"} 1' in text
@@ -0,0 +1,57 @@
+import pytest
+
+import dde_manager
+
+
+class RecordingClient:
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message):
+        self.messages.append(message)
+
+
+@pytest.fixture
+def bridge(pool):
+    return dde_manager.BridgeServer(pool)
+
+
+def run_command(bridge, command):
+    """Submit one command and run it as BridgeServer.run() would"""
+    client = RecordingClient()
+    bridge.submit(client, command)
+    _, _, queued_client, queued_command, queued_at = bridge.commands.get_nowait()
+    bridge.dispatch(queued_client, queued_command, queued_at)
+    return client.messages
+
+
+def test_dispatch_replies_with_typed_values(bridge, plc):
+    plc.values['_200_GLB.DintData[2]'] = 3
+    assert run_command(bridge, {'id': 1, 'action': 'read', 'item': 'stepNumber'}) == [{'value': 3, 'error': None, 'type': 'DINT', 'id': 1}]
+
+
+def test_decode_failure_is_replied_not_raised(bridge, plc, monkeypatch):
+    def broken(command, result):
+        raise OverflowError('cannot convert float infinity to integer')
+
+    monkeypatch.setattr(dde_manager, 'decode_result', broken)
+    assert run_command(bridge, {'id': 2, 'action': 'read', 'item': 'stepNumber'}) == [{'error': 'cannot convert float infinity to integer', 'id': 2}]
+
+
+def test_reads_coalesce_by_resolved_lane():
+    key = dde_manager.coalesce_key
+    read = {'action': 'read', 'item': 'DDETest'}
+    assert key(read) == key(dict(read, priority='interactive'))
+    assert key(read) != key(dict(read, priority='background'))
+    assert key({'action': 'write', 'item': 'DDETest', 'value': 1}) is None
+
+
+def test_identical_reads_share_one_request(bridge, plc):
+    first, second = RecordingClient(), RecordingClient()
+    bridge.submit(first, {'id': 1, 'action': 'read', 'item': 'DDETest'})
+    bridge.submit(second, {'id': 7, 'action': 'read', 'item': 'DDETest', 'priority': 'interactive'})
+    assert bridge.commands.qsize() == 1
+    _, _, client, command, queued_at = bridge.commands.get_nowait()
+    bridge.dispatch(client, command, queued_at)
+    assert first.messages[0]['id'] == 1 and second.messages[0]['id'] == 7
+    assert plc.counters['requests'] == 1
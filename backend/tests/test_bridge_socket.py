@@ -0,0 +1,68 @@
+import queue
+import socket
+import threading
+
+import pytest
+
+import dde_manager
+from bridge_socket import BridgeClient, BridgeSocketServer, SocketClient, parse_address
+
+
+@pytest.fixture
+def client(pool, plc):
+    bridge = dde_manager.BridgeServer(pool, idle_interval=0.05)
+    worker = threading.Thread(target=bridge.run, daemon=True)
+    worker.start()
+    listener = BridgeSocketServer('tcp:127.0.0.1:0', bridge)
+    listener.start()
+    host, port = listener.address
+    client = BridgeClient(f'tcp:{host}:{port}', timeout=5.0)
+    yield client
+    client.close()
+    listener.close()
+    bridge.stop()
+    worker.join(5.0)
+
+
+def test_request_round_trip(client, plc):
+    assert client.request({'action': 'write', 'item': 'stepNumber', 'value': 3}) == {'success': True, 'error': None}
+    assert plc.values['_200_GLB.DintData[2]'] == 3
+    reply = client.request({'action': 'read', 'item': 'stepNumber'})
+    assert reply == {'value': 3, 'error': None, 'type': 'DINT'}
+
+
+def test_subscription_events(client, plc):
+    events = queue.Queue()
+    subscription = client.subscribe(['DDETest'], events.put, interval=10)
+    assert events.get(timeout=5.0)['value'] == 0.0
+    plc.values['DDETest'] = 1.5
+    assert events.get(timeout=5.0)['value'] == 1.5
+    assert client.unsubscribe(subscription) == {'success': True, 'error': None}
+
+
+def test_error_reply(client):
+    assert client.request({'action': 'subscribe'}) == {'error': 'Missing required field: items'}
+
+
+def test_only_loopback_hosts_are_accepted_by_default():
+    assert parse_address('tcp:127.0.0.1:8765') == (socket.AF_INET, ('127.0.0.1', 8765))
+    assert parse_address('tcp::8765') == (socket.AF_INET, ('127.0.0.1', 8765))
+    assert parse_address('tcp:[::1]:8765') == (socket.AF_INET6, ('::1', 8765))
+    for host in ('0.0.0.0', '192.168.1.20', 'localhost'):
+        with pytest.raises(ValueError):
+            parse_address(f'tcp:{host}:8765')
+    assert parse_address('tcp:0.0.0.0:8765', allow_remote=True) == (socket.AF_INET, ('0.0.0.0', 8765))
+
+
+def test_send_to_a_stalled_client_does_not_block():
+    ours, theirs = socket.socketpair()
+    try:
+        client = SocketClient(ours, max_backlog=100)
+        big = {'value': 'x' * 65536}
+        # Far more than the socket buffers hold; the peer never reads
+        with pytest.raises(ConnectionError):
+            for _ in range(1000):
+                client.send(big)
+    finally:
+        ours.close()
+        theirs.close()
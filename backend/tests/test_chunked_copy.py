@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+
+import updateDB
+from conftest import assert_constrained, expected_statuses, open_for_copy, plan_projects, run_update, statuses
+
+
+def test_chunked_rebuild(database, spec_file):
+    result = run_update(database, spec_file, '--chunk-size', '7')
+    assert result.returncode == 0, result.stdout
+    assert statuses(database) == expected_statuses()
+    assert_constrained(database)
+    conn = sqlite3.connect(database)
+    try:
+        assert not updateDB.table_exists(conn.cursor(), updateDB.CHECKPOINT_TABLE)
+    finally:
+        conn.close()
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_chunked_copy_resumes_after_interruption(database, monkeypatch):
+    conn = open_for_copy(database)
+    columns, plans = plan_projects(conn)
+    chunks = []
+
+    def interrupt(seconds):
+        chunks.append(seconds)
+        if len(chunks) == 3:
+            raise Interrupted()
+
+    monkeypatch.setattr(updateDB.time, 'sleep', interrupt)
+    with pytest.raises(Interrupted):
+        updateDB.copy_in_chunks(conn, 'projects', columns, plans, 5, pause=0.01)
+    last_rowid, rows_copied = conn.execute(
+        f"SELECT last_rowid, rows_copied FROM {updateDB.CHECKPOINT_TABLE}").fetchone()
+    assert (last_rowid, rows_copied) == (15, 15)
+
+    monkeypatch.undo()
+    assert updateDB.copy_in_chunks(conn, 'projects', columns, plans, 5) == 50
+    conn.close()
+    assert statuses(database) == expected_statuses()
+
+
+def interrupt_copy(conn, columns, plans, monkeypatch, chunks=2):
+    calls = []
+
+    def interrupt(seconds):
+        calls.append(seconds)
+        if len(calls) == chunks:
+            raise Interrupted()
+
+    monkeypatch.setattr(updateDB.time, 'sleep', interrupt)
+    with pytest.raises(Interrupted):
+        updateDB.copy_in_chunks(conn, 'projects', columns, plans, 5, pause=0.01)
+    monkeypatch.undo()
+
+
+def test_update_to_a_copied_range_while_interrupted_is_kept(database, monkeypatch):
+    conn = open_for_copy(database)
+    columns, plans = plan_projects(conn)
+    interrupt_copy(conn, columns, plans, monkeypatch)
+
+    writer = sqlite3.connect(database)
+    writer.execute("UPDATE projects SET Status = 'Closed' WHERE ProjectID = 1")
+    writer.commit()
+    writer.close()
+
+    updateDB.copy_in_chunks(conn, 'projects', columns, plans, 5)
+    conn.close()
+    assert statuses(database)[0] == 'INACTIVE'
+
+
+def test_resume_refuses_changed_mappings(database, monkeypatch):
+    conn = open_for_copy(database)
+    columns, plans = plan_projects(conn)
+    interrupt_copy(conn, columns, plans, monkeypatch)
+
+    changed = dict(plans['Status'], null_value='INACTIVE')
+    with pytest.raises(ValueError, match='restart-copy'):
+        updateDB.copy_in_chunks(conn, 'projects', columns, {'Status': changed}, 5)
+    assert updateDB.copy_in_chunks(conn, 'projects', columns, {'Status': changed}, 5, restart=True) == 50
+    conn.close()
+    assert statuses(database)[3] == 'INACTIVE'
+
+
+def test_resume_refuses_without_mirror_triggers(database, monkeypatch):
+    conn = open_for_copy(database)
+    columns, plans = plan_projects(conn)
+    interrupt_copy(conn, columns, plans, monkeypatch)
+
+    conn.execute(f"DROP TRIGGER {updateDB.mirror_trigger_names('projects')[1]}")
+    with pytest.raises(ValueError, match='triggers'):
+        updateDB.copy_in_chunks(conn, 'projects', columns, plans, 5)
+    conn.close()
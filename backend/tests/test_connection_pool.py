@@ -0,0 +1,94 @@
+import pytest
+
+import dde_manager
+from dde_transport import transport as dde
+
+
+def test_idle_conversation_is_reused(pool, plc):
+    with pool.connection('RSLinx', 'ExcelLink') as conversation:
+        conversation.Request('DDETest')
+    with pool.connection('RSLinx', 'ExcelLink') as conversation:
+        conversation.Request('DDETest')
+    assert plc.counters['connects'] == 1
+
+
+def test_failed_block_drops_the_conversation(pool, plc):
+    with pytest.raises(KeyError):
+        with pool.connection('RSLinx', 'ExcelLink'):
+            raise KeyError('boom')
+    assert pool._entries[('RSLinx', 'ExcelLink')] == []
+    assert ('RSLinx', 'ExcelLink') in pool._reconnect
+
+
+def test_dead_idle_conversation_is_evicted_and_replaced(pool, plc):
+    with pool.connection('RSLinx', 'ExcelLink') as conversation:
+        first = conversation._conversation
+    first.connected = False
+    with pool.connection('RSLinx', 'ExcelLink') as conversation:
+        assert conversation._conversation is not first
+        conversation.Request('DDETest')
+    assert plc.counters['connects'] == 2
+
+
+def test_long_idle_conversation_is_evicted(rslinx_init, plc):
+    pool = rslinx_init.DDEConnectionPool(max_idle=0.0, max_retries=1, retry_delay=0.0)
+    with pool.connection('RSLinx', 'ExcelLink'):
+        pass
+    pool.maintain()
+    assert ('RSLinx', 'ExcelLink') not in pool._entries
+
+
+def test_maintain_reconnects_a_dropped_key(pool, plc):
+    with pool.connection('RSLinx', 'ExcelLink') as conversation:
+        conversation._conversation.connected = False
+    pool.maintain()
+    entries = pool._entries[('RSLinx', 'ExcelLink')]
+    assert len(entries) == 1 and entries[0].conversation.Connected()
+    assert not pool._reconnect
+
+
+def test_maintain_keeps_retrying_while_rslinx_is_down(rslinx_init, pool, plc):
+    with pool.connection('RSLinx', 'ExcelLink') as conversation:
+        conversation._conversation.connected = False
+    plc.available = False
+    pool.maintain()
+    assert ('RSLinx', 'ExcelLink') in pool._reconnect
+    plc.available = True
+    # The failed reconnect opened the breaker; let its backoff lapse
+    breaker = rslinx_init.get_availability_breaker('RSLinx', 'ExcelLink')
+    breaker.retry_at = 0.0
+    breaker._save()
+    pool.maintain()
+    assert not pool._reconnect
+
+
+def test_busy_key_is_refused(rslinx_init, plc):
+    pool = rslinx_init.DDEConnectionPool(max_per_key=1, max_retries=1, retry_delay=0.0)
+    with pool.connection('RSLinx', 'ExcelLink'):
+        with pytest.raises(ConnectionError):
+            pool.acquire('RSLinx', 'ExcelLink')
+
+
+def test_lost_conversation_fails_the_batch_and_the_pool_reconnects(pool, plc):
+    plc.disconnect_rate = 1.0
+    with pytest.raises(dde.error):
+        with pool.connection('RSLinx', 'ExcelLink') as conversation:
+            dde_manager.run_action(conversation, 'read_many', {'items': ['DDETest', 'Reel.RealData[0]']})
+    assert plc.counters['faults'] == 1
+    assert ('RSLinx', 'ExcelLink') in pool._reconnect
+
+    plc.disconnect_rate = 0.0
+    pool.maintain()
+    assert not pool._reconnect
+    with pool.connection('RSLinx', 'ExcelLink') as conversation:
+        result = dde_manager.run_action(conversation, 'write_many', {'items': {'_200_GLB.DintData[2]': 2}})
+    assert result['results'][0]['success']
+    assert plc.counters['connects'] == 2
+
+
+def test_item_error_keeps_the_conversation(pool, plc):
+    with pool.connection('RSLinx', 'ExcelLink') as conversation:
+        result = dde_manager.run_action(conversation, 'read_many', {'items': ['Missing.Tag', 'DDETest']})
+    assert result['results']['DDETest']['error'] is None
+    assert not pool._reconnect
+    assert len(pool._entries[('RSLinx', 'ExcelLink')]) == 1
@@ -0,0 +1,115 @@
+import json
+import queue
+import asyncio
+
+import pytest
+
+import dde_manager
+from dde_scheduler import AsyncDDEScheduler, serve_lines
+
+
+class LineFeed:
+    """stdin stand-in: readline() blocks until a line is fed ('' closes it)"""
+
+    def __init__(self):
+        self.lines = queue.Queue()
+
+    def feed(self, command):
+        self.lines.put(json.dumps(command) + '\n')
+
+    def close(self):
+        self.lines.put('')
+
+    def readline(self):
+        return self.lines.get()
+
+
+class RecordingClient:
+    def __init__(self):
+        self.messages = queue.Queue()
+
+    def send(self, message):
+        self.messages.put(message)
+
+    def next(self):
+        return self.messages.get(timeout=5)
+
+
+@pytest.fixture
+def scheduler(pool):
+    scheduler = AsyncDDEScheduler(dde_manager.BridgeServer(pool), default_timeout=5.0)
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+def test_concurrent_reads_share_one_request(scheduler, plc):
+    plc.latency = 0.05
+
+    async def read_all():
+        return await asyncio.gather(*(scheduler.read('Reel.RealData[0]') for _ in range(10)))
+
+    replies = asyncio.run(read_all())
+    assert [reply['error'] for reply in replies] == [None] * 10
+    assert len({reply['id'] for reply in replies}) == 10
+    # One probe of the new conversation and one Request for all ten callers
+    assert plc.counters['requests'] <= 2
+
+
+def test_request_times_out_without_a_worker(pool):
+    scheduler = AsyncDDEScheduler(dde_manager.BridgeServer(pool))
+    reply = asyncio.run(scheduler.read('DDETest', timeout=0.05))
+    assert reply['error'].startswith('Timed out after 0.05s')
+    assert not scheduler._pending
+
+
+def test_subscription_events_reach_the_listener(scheduler, plc):
+    async def watch():
+        events = asyncio.Queue()
+        reply = await scheduler.subscribe(['_200_GLB.DintData[2]'], events.put_nowait, interval=10)
+        plc.values['_200_GLB.DintData[2]'] = 7
+        while True:
+            event = await asyncio.wait_for(events.get(), 5)
+            if event['event'] == 'change' and event['value'] == 7:
+                break
+        return reply, await scheduler.unsubscribe(reply['subscription'])
+
+    reply, unsubscribed = asyncio.run(watch())
+    assert reply['error'] is None
+    assert unsubscribed['success']
+    assert not scheduler._listeners
+
+
+def test_stdin_front_end_answers_under_the_callers_ids(scheduler, plc):
+    stdin, client = LineFeed(), RecordingClient()
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        front_end = asyncio.ensure_future(serve_lines(scheduler, stdin, client))
+        replies = {}
+
+        async def reply_to(request_id):
+            while request_id not in replies:
+                message = await loop.run_in_executor(None, client.next)
+                if 'event' not in message:
+                    replies[message['id']] = message
+            return replies[request_id]
+
+        stdin.feed({'id': 'w', 'action': 'write', 'item': '_200_GLB.DintData[2]', 'value': 3})
+        stdin.feed({'id': 'r', 'action': 'read', 'item': '_200_GLB.DintData[2]', 'priority': 'background'})
+        stdin.feed({'id': 's', 'action': 'subscribe', 'items': ['_200_GLB.DintData[2]'], 'interval': 10})
+        await reply_to('s')
+        stdin.feed({'id': 'u', 'action': 'unsubscribe', 'subscription': 's'})
+        await reply_to('u')
+        stdin.feed('not json')
+        stdin.close()
+        await front_end
+        return replies
+
+    replies = asyncio.run(run())
+    assert replies['w']['success']
+    assert replies['r']['value'] == 3
+    assert replies['s']['subscription'] == 's'
+    assert replies['u']['success']
+    assert client.next() == {'error': 'Command must be a JSON object', 'id': None}
+    assert not scheduler._listeners
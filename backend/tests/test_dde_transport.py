@@ -0,0 +1,24 @@
+import pytest
+
+from dde_transport import DDETransport, Win32Transport, create_transport
+from dde_simulator import SimulatedTransport
+
+
+def test_transport_interface_is_abstract():
+    with pytest.raises(TypeError):
+        DDETransport()
+
+    class ServerOnly(DDETransport):
+        def CreateServer(self):
+            return None
+
+    with pytest.raises(TypeError):
+        ServerOnly()
+
+
+def test_create_transport_by_name():
+    assert isinstance(create_transport('sim'), SimulatedTransport)
+    # pywin32 is only imported on first use
+    assert isinstance(create_transport('win32'), Win32Transport)
+    with pytest.raises(ValueError):
+        create_transport('serial')
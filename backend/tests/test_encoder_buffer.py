@@ -0,0 +1,93 @@
+import pytest
+
+import dde_manager
+from encoder_buffer import EncoderSampler, RingBuffer, slope
+
+
+def test_ring_buffer_overwrites_the_oldest_sample():
+    buffer = RingBuffer(3)
+    assert buffer.latest() is None
+    for i in range(5):
+        buffer.append(float(i), i * 10.0)
+    assert len(buffer) == 3
+    assert buffer.latest() == (4.0, 40.0)
+    assert buffer.since(0.0) == ([2.0, 3.0, 4.0], [20.0, 30.0, 40.0])
+    assert buffer.since(3.0) == ([3.0, 4.0], [30.0, 40.0])
+    assert buffer.since(5.0) == ([], [])
+
+
+def test_slope():
+    assert slope([0.0, 1.0, 2.0, 3.0], [1.0, 3.0, 5.0, 7.0]) == pytest.approx(2.0)
+    assert slope([0.0], [1.0]) is None
+    assert slope([1.0, 1.0], [1.0, 2.0]) is None
+
+
+def pulled(sampler, start=None, seconds=5.0, rate=2.0, step=0.1):
+    """Record a pull at a constant rate (from the sampler's pull start); returns the time of the last sample"""
+    start = sampler.pull_started if start is None else start
+    t = start
+    for i in range(int(seconds / step) + 1):
+        t = start + i * step
+        sampler.record(t, rate * i * step)
+    return t
+
+
+def test_stats_of_a_steady_pull():
+    sampler = EncoderSampler(item='Reel.RealData[0]', rate=10.0)
+    pulled(sampler)
+    stats = sampler.stats()
+    assert stats['quantity'] == pytest.approx(10.0)
+    assert stats['velocity'] == pytest.approx(2.0)
+    assert stats['acceleration'] == pytest.approx(0.0, abs=1e-6)
+    assert stats['average_velocity'] == pytest.approx(2.0)
+    assert stats['moving'] and not stats['stalled']
+    assert stats['pull_duration'] == pytest.approx(5.0)
+
+
+def test_a_drop_starts_a_new_pull_and_a_stop_stalls():
+    sampler = EncoderSampler(item='Reel.RealData[0]', rate=10.0, stall_time=2.0)
+    end = pulled(sampler)
+    sampler.record(end + 0.1, 0.0)
+    assert sampler.pull_started == end + 0.1
+    end = pulled(sampler, start=end + 0.2, seconds=1.0)
+    for i in range(1, 31):
+        sampler.record(end + i * 0.1, 2.0)
+    stats = sampler.stats()
+    assert stats['velocity'] == pytest.approx(0.0)
+    assert not stats['moving'] and stats['stalled']
+    assert stats['pull_duration'] == pytest.approx(4.1)
+
+
+def test_history_downsamples_into_buckets():
+    sampler = EncoderSampler(item='Reel.RealData[0]', rate=10.0)
+    pulled(sampler, seconds=10.0)
+    rows = sampler.history(seconds=4.0, points=4)
+    assert len(rows) == 4
+    for _, mean, low, high in rows:
+        assert low <= mean <= high
+    assert rows[-1][3] == pytest.approx(20.0)
+    assert EncoderSampler(item='Reel.RealData[0]').history() == []
+
+
+@pytest.mark.parametrize('seconds, points', [(0, 200), (-5, 200), (float('nan'), 200), ('60', 200), (60, 0), (60, 2.5)])
+def test_history_rejects_an_empty_window(seconds, points):
+    sampler = EncoderSampler(item='Reel.RealData[0]')
+    sampler.record(1000.0, 1.0)
+    with pytest.raises(ValueError):
+        sampler.history(seconds, points)
+
+
+def test_history_action_reports_an_invalid_window():
+    sampler = EncoderSampler(item='Reel.RealData[0]')
+    sampler.record(1000.0, 1.0)
+    reply = dde_manager.handle_encoder_command({'action': 'history', 'seconds': 0}, sampler)
+    assert reply == {'error': 'seconds must be a positive number, got 0', 'invalid': True}
+    assert dde_manager.handle_encoder_command({'action': 'history', 'seconds': 1}, sampler)['error'] is None
+
+
+def test_sampler_reads_the_quantity_from_the_plc(pool, plc):
+    sampler = EncoderSampler(rate=1000.0)
+    plc.values['Reel.RealData[0]'] = 12.5
+    sampler.sample_due(pool)
+    assert sampler.stats()['quantity'] == 12.5
+    assert sampler.errors == 0
@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+import dde_manager
+import dde_transport
+from dde_simulator import EncoderModel, SimulatedPLC, SimulatedTransport, PULL_START_STEP
+from handshake import HandshakeEngine
+from test_bridge_server import run_command
+
+
+def poll(engine, pool, threshold=0.0):
+    engine.next_due = 0.0
+    return engine.poll_due(pool, threshold)
+
+
+@pytest.fixture
+def engine():
+    return HandshakeEngine(interval=0.0)
+
+
+def test_completion_is_acknowledged_once_with_a_decoded_quantity(engine, pool, plc):
+    plc.values[plc.quantity_tag] = 12.5
+    plc.values[plc.complete_request_tag] = True
+    events = poll(engine, pool)
+    assert [(event['sequence'], event['quantity']) for event in events] == [(1, 12.5)]
+    assert plc.values[plc.complete_ack_tag] is True
+    assert poll(engine, pool) == []
+
+    plc.values[plc.complete_request_tag] = False
+    assert poll(engine, pool) == []
+    assert plc.values[plc.complete_ack_tag] is False
+    assert engine.state == engine.IDLE
+
+
+def test_completion_below_the_threshold_is_not_acknowledged(engine, pool, plc):
+    plc.values[plc.quantity_tag] = 4.0
+    plc.values[plc.complete_request_tag] = True
+    assert poll(engine, pool, threshold=10.0) == []
+    assert plc.values[plc.complete_ack_tag] is False
+    assert engine.status()['held_quantity'] == 4.0
+
+    plc.values[plc.quantity_tag] = 10.0
+    assert [event['quantity'] for event in poll(engine, pool, threshold=10.0)] == [10.0]
+    assert plc.values[plc.complete_ack_tag] is True
+    assert engine.status()['held_quantity'] is None
+
+
+def test_restarted_engine_does_not_report_an_acknowledged_completion_again(engine, pool, plc):
+    plc.values[plc.quantity_tag] = 7.0
+    plc.values[plc.complete_request_tag] = True
+    assert len(poll(engine, pool)) == 1
+
+    restarted = HandshakeEngine(interval=0.0)
+    assert poll(restarted, pool) == []
+    assert restarted.state == restarted.ACKNOWLEDGED
+
+    plc.values[plc.complete_request_tag] = False
+    poll(restarted, pool)
+    assert plc.values[plc.complete_ack_tag] is False
+
+
+def test_restarted_engine_clears_a_leftover_ack(engine, pool, plc):
+    plc.values[plc.complete_ack_tag] = True
+    assert poll(engine, pool) == []
+    assert plc.values[plc.complete_ack_tag] is False
+
+    plc.values[plc.complete_request_tag] = True
+    assert len(poll(engine, pool)) == 1
+
+
+def test_simulated_pull_completes_through_the_handshake(rslinx_init, plc):
+    # The plc fixture restores the transport afterwards
+    simulated = SimulatedPLC(encoder=EncoderModel(rate=200.0, pull_length=5.0))
+    dde_transport.use_transport(SimulatedTransport(simulated))
+    pool = rslinx_init.DDEConnectionPool(validate_interval=0.0, max_retries=1, retry_delay=0.0)
+    try:
+        engine = HandshakeEngine(interval=0.0)
+        with pool.connection('RSLinx', 'ExcelLink') as conversation:
+            conversation.Poke(simulated.step_number_tag, str(PULL_START_STEP))
+
+        events = []
+        deadline = time.monotonic() + 5.0
+        while not events and time.monotonic() < deadline:
+            events = poll(engine, pool, threshold=5.0)
+            time.sleep(0.005)
+        assert [event['quantity'] for event in events] == [5.0]
+        # The PLC drops completeRequest on the ack and the engine clears it
+        poll(engine, pool)
+        assert simulated.values[simulated.complete_request_tag] is False
+        assert simulated.values[simulated.complete_ack_tag] is False
+    finally:
+        pool.close_all()
+
+
+def test_bridge_rejects_an_invalid_threshold(pool):
+    bridge = dde_manager.BridgeServer(pool)
+    for threshold in (-1, 'ten', True, float('nan')):
+        reply = run_command(bridge, {'id': 1, 'action': 'handshake', 'threshold': threshold})[0]
+        assert reply['invalid']
+    assert bridge.handshake_watchers == {}
+
+    assert run_command(bridge, {'id': 2, 'action': 'handshake', 'threshold': 3})[0]['watching'] == 2
+    assert list(bridge.handshake_watchers.values()) == [3.0]
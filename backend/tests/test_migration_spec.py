@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+import updateDB
+from conftest import STATUSES, assert_constrained, expected_statuses, run_update, statuses
+
+
+def test_load_spec_rejects_unknown_settings(tmp_path):
+    path = str(tmp_path / 'bad.json')
+    with open(path, 'w') as f:
+        json.dump({'tables': {'projects': {'columns': {'Status': {'valuse': ['A']}}}}}, f)
+    with pytest.raises(ValueError, match='valuse'):
+        updateDB.load_spec(path)
+
+
+def test_spec_needs_a_decision_for_nonconforming_values(database, tmp_path):
+    path = str(tmp_path / 'strict.json')
+    with open(path, 'w') as f:
+        json.dump({'tables': {'projects': {'columns': {'Status': {'values': ['ACTIVE', 'INACTIVE']}}}}}, f)
+    result = run_update(database, path)
+    assert result.returncode == 1
+    assert "'Closed'" in result.stdout
+    assert statuses(database)[:5] == STATUSES
+
+
+def test_dry_run_changes_nothing(database, spec_file):
+    result = run_update(database, spec_file, '--dry-run')
+    assert result.returncode == 0, result.stdout
+    assert 'CREATE TABLE' in result.stdout
+    assert statuses(database)[:5] == STATUSES
+
+
+def test_spec_rebuild(database, spec_file):
+    result = run_update(database, spec_file)
+    assert result.returncode == 0, result.stdout
+    assert statuses(database) == expected_statuses()
+    assert_constrained(database)
@@ -0,0 +1,52 @@
+import sqlite3
+
+import updateDB
+from conftest import assert_constrained, expected_statuses, open_for_copy, plan_projects, run_update, statuses
+
+
+def test_chunked_copy_keeps_concurrent_changes(database, monkeypatch):
+    conn = open_for_copy(database)
+    columns, plans = plan_projects(conn)
+    writer = sqlite3.connect(database, isolation_level=None)
+    chunks = []
+
+    def application_writes(seconds):
+        chunks.append(seconds)
+        if len(chunks) == 2:
+            # Rows 1-10 are already copied: change, delete and add rows around them
+            writer.execute("UPDATE projects SET Status = 'Closed' WHERE ProjectID = 1")
+            writer.execute("DELETE FROM projects WHERE ProjectID = 2")
+            writer.execute("INSERT INTO projects (Name, Status) VALUES ('late', NULL)")
+            writer.execute("UPDATE projects SET Status = 'INACTIVE' WHERE ProjectID = 40")
+
+    monkeypatch.setattr(updateDB.time, 'sleep', application_writes)
+    assert updateDB.copy_in_chunks(conn, 'projects', columns, plans, 5, pause=0.01) >= 49
+    writer.close()
+    conn.close()
+
+    conn = sqlite3.connect(database)
+    try:
+        rows = dict(conn.execute("SELECT ProjectID, Status FROM projects"))
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    finally:
+        conn.close()
+    assert rows[1] == 'INACTIVE'
+    assert 2 not in rows
+    assert rows[40] == 'INACTIVE'
+    assert rows[51] == 'ACTIVE'
+    assert names == {'projects_log'}
+    assert_constrained(database)
+
+
+def test_online_migration(database, spec_file):
+    result = run_update(database, spec_file, '--online', '--chunk-pause', '0')
+    assert result.returncode == 0, result.stdout
+    assert statuses(database) == expected_statuses()
+    assert_constrained(database)
+    conn = sqlite3.connect(database)
+    try:
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    finally:
+        conn.close()
+    # Only the application's own trigger is left; the mirror triggers went with the swap
+    assert names == {'projects_log'}
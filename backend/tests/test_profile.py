@@ -0,0 +1,48 @@
+import sys
+import sqlite3
+import subprocess
+
+import updateDB
+from conftest import STATUSES, UPDATE_DB, statuses
+
+
+def profile(path, sample_limit=0):
+    conn = sqlite3.connect(path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(projects)")
+        return updateDB.profile_column(cursor, 'projects', cursor.fetchall(), 'Status', sample_limit)
+    finally:
+        conn.close()
+
+
+def test_profile_counts_every_value_including_null(database):
+    values = profile(database)
+    assert {value: entry['count'] for value, entry in values.items()} == {status: 10 for status in STATUSES}
+    assert all(entry['samples'] == [] for entry in values.values())
+
+
+def test_profile_keeps_sample_rows_per_value(database):
+    values = profile(database, sample_limit=2)
+    assert {value: entry['count'] for value, entry in values.items()} == {status: 10 for status in STATUSES}
+    for value, entry in values.items():
+        assert len(entry['samples']) == 2
+        # Full rows: ProjectID, Name, Status, OwnerID
+        assert all(row[2] == value for row in entry['samples'])
+
+
+def test_case_variants_are_grouped():
+    assert updateDB.value_variants(['ACTIVE', 'active', ' Active ', 'Closed', None]) == [['ACTIVE', 'active', ' Active ']]
+
+
+def test_profile_option_reports_and_changes_nothing(database):
+    result = subprocess.run([sys.executable, UPDATE_DB, '-d', database, '-t', 'projects', '-c', 'status', '--profile', '--top', '2'],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout
+    assert 'Rows:        50' in result.stdout
+    assert 'Cardinality: 4 distinct non-NULL values' in result.stdout
+    assert 'NULL:        10 (20.0%)' in result.stdout
+    assert "'ACTIVE' (10), 'active' (10)" in result.stdout
+    assert '(top 2 of 4)' in result.stdout
+    assert 'Profile mode: No changes made' in result.stdout
+    assert statuses(database)[:5] == STATUSES
@@ -0,0 +1,109 @@
+import sqlite3
+
+import pytest
+
+import dde_manager
+from pull_recorder import PullRecorder, SampleWriter
+from test_bridge_server import RecordingClient, run_command
+
+
+def rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT session_id, user_name, project_number, item_sku, quantity FROM pull_samples "
+                            "ORDER BY sample_id").fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def database(tmp_path):
+    return str(tmp_path / 'app.db')
+
+
+@pytest.fixture
+def recorder(database):
+    recorder = PullRecorder(SampleWriter(database, commit_interval=0.05), rate=1000.0)
+    yield recorder
+    recorder.close()
+
+
+def test_writer_stores_rows_in_wal_mode(database):
+    writer = SampleWriter(database, batch_size=2, commit_interval=60.0)
+    for i in range(3):
+        writer.put((1, 'jdoe', 'P1', 'SKU', float(i), float(i), 'now'))
+    writer.close()
+    assert writer.written == 3 and writer.errors == 0
+    assert [row[4] for row in rows(database)] == [0.0, 1.0, 2.0]
+    conn = sqlite3.connect(database)
+    try:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    finally:
+        conn.close()
+
+
+def test_writer_drops_the_oldest_rows_beyond_its_backlog(database):
+    writer = SampleWriter(database, batch_size=100, commit_interval=60.0, max_backlog=2)
+    for i in range(5):
+        writer.put((1, None, None, None, float(i), float(i), 'now'))
+    writer.close()
+    assert (writer.written, writer.dropped) == (2, 3)
+    assert [row[4] for row in rows(database)] == [3.0, 4.0]
+
+
+def test_session_records_samples_and_the_final_quantity(recorder, database, pool, plc):
+    session = recorder.start('jdoe', 'P1', 'SKU-1')
+    assert recorder.active and session['samples'] == 0
+    plc.values['Reel.RealData[0]'] = 2.5
+    recorder.sample_due(pool)
+    recorder.next_due = 0.0
+    recorder.sample_due(pool)
+    stopped = recorder.stop(final_quantity='7.5')
+    assert stopped['samples'] == 3 and not recorder.active
+    assert recorder.stop() is None
+
+    recorder.close()
+    assert rows(database) == [(session['session_id'], 'jdoe', 'P1', 'SKU-1', quantity) for quantity in (2.5, 2.5, 7.5)]
+
+
+def test_failed_sample_is_counted(recorder, pool, plc):
+    recorder.start()
+    plc.available = False
+    pool.close_all()
+    recorder.sample_due(pool)
+    assert recorder.session['errors'] == 1 and recorder.last_error
+
+
+def test_new_session_replaces_an_open_one(recorder):
+    first = recorder.start('jdoe')
+    second = recorder.start('asmith')
+    assert second['replaced'] == first['session_id']
+    assert recorder.session['user'] == 'asmith'
+
+
+def test_session_ends_after_max_duration(database, pool, plc):
+    recorder = PullRecorder(SampleWriter(database), max_duration=0.0)
+    try:
+        recorder.start()
+        recorder.session['started'] -= 1.0
+        recorder.sample_due(pool)
+        assert not recorder.active
+    finally:
+        recorder.close()
+
+
+def test_completed_handshake_ends_the_recording(recorder, pool, plc):
+    bridge = dde_manager.BridgeServer(pool, recorder=recorder)
+    assert run_command(bridge, {'id': 1, 'action': 'record_start', 'user': 'jdoe'})[0]['error'] is None
+    bridge.submit(RecordingClient(), {'id': 2, 'action': 'handshake'})
+    plc.values['Reel.RealData[0]'] = 12.0
+    plc.values['_200_GLB.BoolData[0].0'] = True
+    bridge.stop()
+    bridge.run()
+    assert not recorder.active
+    assert recorder.writer.written >= 1
+
+
+def test_recorder_actions_need_a_record_db(pool, plc):
+    bridge = dde_manager.BridgeServer(pool)
+    assert 'record-db' in run_command(bridge, {'id': 1, 'action': 'record_start'})[0]['error']
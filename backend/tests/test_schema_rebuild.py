@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from conftest import run_update, statuses
+
+
+def test_rebuild_preserves_schema(database, spec_file):
+    assert run_update(database, spec_file).returncode == 0
+    conn = sqlite3.connect(database)
+    try:
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE tbl_name IN ('projects', 'active_projects')")}
+        assert {'projects', 'idx_projects_owner', 'projects_log', 'active_projects'} <= names
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'projects'").fetchone()[0]
+        assert 'AUTOINCREMENT' in sql and 'UNIQUE' in sql and 'REFERENCES users' in sql
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO projects (Name) VALUES ('P1')")
+        # The AUTOINCREMENT counter did not go backwards
+        assert conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'projects'").fetchone()[0] == 50
+        conn.execute("UPDATE projects SET Status = 'INACTIVE' WHERE ProjectID = 1")
+        assert conn.execute("SELECT COUNT(*) FROM project_log").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM active_projects").fetchone()[0] > 0
+    finally:
+        conn.close()
+
+
+def test_rebuild_replaces_only_the_allowed_values_check(tmp_path, spec_file):
+    path = str(tmp_path / 'checks.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE projects (ProjectID INTEGER PRIMARY KEY, Name TEXT, "
+                 "Status TEXT CHECK (length(Status) < 20) "
+                 "CONSTRAINT old_values CHECK (Status IN ('ACTIVE', 'INACTIVE', 'Closed')))")
+    conn.executemany("INSERT INTO projects (Name, Status) VALUES (?, ?)", [('a', 'ACTIVE'), ('b', 'Closed')])
+    conn.commit()
+    conn.close()
+
+    result = run_update(path, spec_file)
+    assert result.returncode == 0, result.stdout
+    conn = sqlite3.connect(path)
+    try:
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'projects'").fetchone()[0]
+    finally:
+        conn.close()
+    assert 'CHECK (length(Status) < 20)' in sql
+    assert 'Closed' not in sql
+    assert """CHECK ("Status" IN ('ACTIVE', 'INACTIVE'))""" in sql
+    assert statuses(path) == ['ACTIVE', 'INACTIVE']
@@ -0,0 +1,43 @@
+import os
+import sys
+import json
+import subprocess
+
+from conftest import CONTROLLERS_DIR
+
+DDE_MANAGER = os.path.join(CONTROLLERS_DIR, 'dde_manager.py')
+
+
+def serve(tmp_path, *commands):
+    """Pipe JSON-lines commands through a resident simulator bridge; replies by id"""
+    lines = ''.join((command if isinstance(command, str) else json.dumps(command)) + '\n' for command in commands)
+    # Breaker verdicts stay in the test's own directory
+    env = dict(os.environ, DDE_TRANSPORT='sim', DDE_BREAKER_STATE=str(tmp_path / 'breaker.json'))
+    env.pop('DDE_SPAWNED_AT', None)
+    result = subprocess.run([sys.executable, DDE_MANAGER, '--serve'], input=lines,
+                            capture_output=True, text=True, env=env, timeout=60)
+    assert result.returncode == 0, result.stderr
+    replies = [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
+    return {reply['id']: reply for reply in replies}
+
+
+def test_serve_answers_every_command_by_id(tmp_path):
+    replies = serve(
+        tmp_path,
+        {'id': 1, 'action': 'write', 'item': '_200_GLB.DintData[2]', 'value': 3},
+        {'id': 2, 'action': 'read', 'item': '_200_GLB.DintData[2]'},
+        {'id': 'text', 'action': 'read', 'item': '_200_GLB.StringData[0]'},
+        {'id': 4, 'action': 'read', 'item': 'Missing.Tag'},
+        {'id': 5, 'action': 'launch'},
+    )
+    assert replies[1]['success'] and replies[1]['error'] is None
+    assert replies[2]['value'] == 3
+    assert replies['text']['error'] is None
+    assert replies[4]['error']
+    assert 'launch' in replies[5]['error']
+
+
+def test_serve_reports_unparseable_lines_and_keeps_going(tmp_path):
+    replies = serve(tmp_path, '{not json', {'id': 1, 'action': 'read', 'item': 'DDETest'})
+    assert replies[None]['error']
+    assert replies[1]['error'] is None
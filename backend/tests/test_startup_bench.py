@@ -0,0 +1,59 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from conftest import CONTROLLERS_DIR, DDE_DIR
+from startup_bench import BENCH_METRICS, compare_with_baseline, run_startup_benchmark
+
+
+def report_with(median):
+    report = {'script': 'dde_bridge.py', 'transport': 'sim'}
+    for metric in BENCH_METRICS:
+        report[metric] = {'min': median, 'median': median, 'max': median}
+    return report
+
+
+def test_first_comparison_saves_the_baseline(tmp_path):
+    baseline = str(tmp_path / 'baseline.json')
+    first = report_with(10.0)
+    compare_with_baseline(first, baseline, 0.25)
+    assert first['baseline_saved'] and first['regressions'] == []
+    with open(baseline) as f:
+        assert json.load(f) == {'dde_bridge.py|sim': {metric: 10.0 for metric in BENCH_METRICS}}
+
+    within = report_with(12.0)
+    compare_with_baseline(within, baseline, 0.25)
+    assert within['regressions'] == [] and 'baseline_saved' not in within
+
+    slower = report_with(13.0)
+    compare_with_baseline(slower, baseline, 0.25)
+    assert [regression['metric'] for regression in slower['regressions']] == list(BENCH_METRICS)
+
+
+def test_benchmark_times_the_one_shot_bridge(monkeypatch, tmp_path):
+    monkeypatch.setenv('DDE_TRANSPORT', 'sim')
+    monkeypatch.setenv('DDE_BREAKER_STATE', str(tmp_path / 'breaker.json'))
+    report = run_startup_benchmark(os.path.join(DDE_DIR, 'dde_bridge.py'),
+                                   {'application': 'RSLinx', 'topic': 'ExcelLink', 'item': 'DDETest'},
+                                   runs=2, warmup=0)
+    assert report['runs'] == 2 and report['errors'] == 0
+    assert report['transport'] == 'sim'
+    assert report['process_ms']['median'] >= report['import_ms']['median']
+
+
+def test_child_that_reports_nothing_fails_the_benchmark(tmp_path):
+    script = tmp_path / 'silent.py'
+    script.write_text('import sys\nsys.exit(3)\n')
+    with pytest.raises(RuntimeError):
+        run_startup_benchmark(str(script), {}, runs=1, warmup=0)
+
+
+def test_one_shot_command_skips_the_serve_mode_modules():
+    code = ('import sys; sys.argv = ["dde_manager.py"]; import dde_manager; '
+            'print(sorted(m for m in ("tag_cache", "encoder_buffer", "handshake", "bridge_socket") if m in sys.modules))')
+    env = dict(os.environ, DDE_TRANSPORT='sim')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, cwd=CONTROLLERS_DIR)
+    assert result.stdout.strip() == '[]', result.stderr
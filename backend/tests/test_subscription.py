@@ -0,0 +1,59 @@
+import dde_manager
+from test_bridge_server import RecordingClient
+
+
+def subscription(items, interval=0.0):
+    return dde_manager.Subscription(None, 's', 'RSLinx', 'ExcelLink', items, interval)
+
+
+def test_poll_emits_only_changes(pool, plc):
+    watched = subscription(['_200_GLB.DintData[2]', 'DDETest'])
+    events = watched.poll(pool)
+    assert [(event['item'], event['value']) for event in events] == [('_200_GLB.DintData[2]', 0), ('DDETest', 0.0)]
+    assert watched.poll(pool) == []
+
+    plc.values['_200_GLB.DintData[2]'] = 5
+    events = watched.poll(pool)
+    assert [(event['id'], event['event'], event['value']) for event in events] == [('s', 'change', 5)]
+
+
+def test_failing_link_is_reported_once(pool, plc):
+    watched = subscription(['Missing.Tag'])
+    assert [event['event'] for event in watched.poll(pool)] == ['error']
+    assert watched.poll(pool) == []
+
+
+def test_subscriptions_are_kept_per_client():
+    subscriptions = {}
+    first, second = object(), object()
+    command = {'id': 1, 'action': 'subscribe', 'items': ['DDETest'], 'interval': 250}
+    assert dde_manager.handle_subscription_command(command, subscriptions, first)['subscription'] == 1
+    dde_manager.handle_subscription_command(command, subscriptions, second)
+    assert len(subscriptions) == 2
+    assert subscriptions[(first, 1)].interval == 0.25
+
+    unsubscribe = {'action': 'unsubscribe', 'subscription': 1}
+    assert dde_manager.handle_subscription_command(unsubscribe, subscriptions, first) == {'success': True, 'error': None}
+    assert list(subscriptions) == [(second, 1)]
+    assert dde_manager.handle_subscription_command(unsubscribe, subscriptions, first) == {
+        'success': False, 'error': 'Unknown subscription: 1'
+    }
+
+
+def test_subscribe_needs_the_resident_bridge():
+    reply = dde_manager.handle_dde_command({'action': 'subscribe', 'items': ['DDETest']})
+    assert reply['error'] == 'subscribe is only available in --serve mode'
+
+
+def test_disconnected_client_loses_its_subscriptions(pool, plc):
+    bridge = dde_manager.BridgeServer(pool)
+    client, other = RecordingClient(), RecordingClient()
+    for subscriber in (client, other):
+        bridge.submit(subscriber, {'id': 1, 'action': 'subscribe', 'items': ['DDETest'], 'interval': 1000})
+        _, _, queued_client, command, queued_at = bridge.commands.get_nowait()
+        bridge.dispatch(queued_client, command, queued_at)
+    bridge.disconnect(client)
+    bridge.stop()
+    bridge.run()
+    assert [key[0] for key in bridge.subscriptions] == [other]
+    assert client.messages[0]['subscription'] == 1
@@ -0,0 +1,84 @@
+import time
+
+import dde_manager
+from tag_cache import ANY_AGE, STALE_AFTER_SCANS, ScanPoller, TagCache, default_scan_classes
+from test_bridge_server import RecordingClient
+
+
+def test_default_scan_classes_come_from_the_tag_table():
+    classes = default_scan_classes()
+    assert classes['quantity']['items'] == ['Reel.RealData[0]']
+    assert classes['status']['items'] == ['_200_GLB.BoolData[0].0']
+    assert classes['quantity']['pull_rate'] < classes['quantity']['rate']
+
+
+def test_cached_value_goes_stale_with_age_or_an_error():
+    cache = TagCache()
+    assert cache.get('DDETest', max_age=1.0) is None
+    cache.update('DDETest', 1.5)
+    assert not cache.get('DDETest', max_age=1.0)['stale']
+
+    cache._entries['DDETest']['updated'] = time.monotonic() - 5.0
+    assert cache.get('DDETest', max_age=1.0)['stale']
+    assert not cache.get('DDETest', max_age=ANY_AGE)['stale']
+
+    cache.fail('DDETest', 'down')
+    entry = cache.get('DDETest', max_age=ANY_AGE)
+    assert entry['stale'] and entry['value'] == 1.5
+
+    cache.invalidate('DDETest')
+    assert cache.get('DDETest', max_age=ANY_AGE)['stale']
+
+
+def test_scan_stores_decoded_values(pool, plc):
+    plc.values['Reel.RealData[0]'] = 3.25
+    plc.values['_200_GLB.BoolData[0].0'] = True
+    poller = ScanPoller()
+    poller.poll_due(pool)
+    assert poller.lookup('Reel.RealData[0]')['value'] == 3.25
+    assert poller.lookup('_200_GLB.BoolData[0].0')['value'] is True
+    assert poller.lookup('_200_GLB.DintData[2]') is None
+
+
+def test_read_through_the_cache_keeps_one_representation(pool, plc):
+    plc.values['_200_GLB.DintData[2]'] = 4
+    poller = ScanPoller({'steps': {'rate': 1000, 'items': ['_200_GLB.DintData[2]']}})
+    dde_manager.handle_cached_command({'action': 'read', 'item': '_200_GLB.DintData[2]'}, pool, poller)
+    from_read = poller.cache.get('_200_GLB.DintData[2]', ANY_AGE)['value']
+    poller.poll_due(pool)
+    assert from_read == poller.cache.get('_200_GLB.DintData[2]', ANY_AGE)['value'] == 4
+
+
+def test_stale_entry_is_read_from_the_plc(pool, plc):
+    poller = ScanPoller({'diagnostics': {'rate': 1000, 'items': ['DDETest']}})
+    poller.poll_due(pool)
+    assert poller.lookup('DDETest')['cached']
+    poller.cache._entries['DDETest']['updated'] = time.monotonic() - STALE_AFTER_SCANS - 1.0
+    assert poller.lookup('DDETest') is None
+
+    requests = plc.counters['requests']
+    reply = dde_manager.handle_cached_command({'action': 'read', 'item': 'DDETest'}, pool, poller)
+    assert 'cached' not in reply and plc.counters['requests'] > requests
+    assert poller.lookup('DDETest')['cached']
+
+
+def test_quantity_is_scanned_fast_only_while_pulling():
+    poller = ScanPoller()
+    quantity = poller.classes['quantity']
+    assert quantity.rate == 1.0
+    poller.set_pulling(True)
+    assert quantity.rate == 0.1 and quantity.next_due <= time.monotonic() + 0.1
+    assert poller.classes['status'].rate == 1.0
+    poller.set_pulling(False)
+    assert quantity.rate == 1.0
+    assert poller.snapshot()['classes']['quantity'] == {'rate': 1000, 'items': ['Reel.RealData[0]'], 'idle_rate': 1000, 'pull_rate': 100}
+
+
+def test_bridge_scans_fast_while_the_handshake_is_watched(pool, plc):
+    poller = ScanPoller()
+    bridge = dde_manager.BridgeServer(pool, poller)
+    bridge.submit(RecordingClient(), {'id': 1, 'action': 'handshake'})
+    bridge.stop()
+    bridge.run()
+    assert poller.pulling
+    assert poller.classes['quantity'].rate == 0.1
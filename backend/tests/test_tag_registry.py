@@ -0,0 +1,128 @@
+import pytest
+
+import tag_registry
+from tag_registry import DINT_MAX, DINT_MIN, STRING_MAX, TagRegistry
+
+CONFIG = {
+    'tags': {
+        'read': {
+            'quantity': {'item': 'Reel.RealData[0]', 'type': 'REAL'},
+            'completeRequest': {'item': '_200_GLB.BoolData[0].0', 'type': 'BOOL'}
+        },
+        'write': {
+            'userName': {'item': '_200_GLB.StringData[0]', 'type': 'STRING'},
+            'stepNumber': {'item': '_200_GLB.DintData[2]', 'type': 'DINT'}
+        }
+    }
+}
+
+
+@pytest.fixture
+def registry():
+    return TagRegistry(CONFIG)
+
+
+def test_resolve_names_links_and_items(registry):
+    assert registry.resolve('stepNumber') == (None, '_200_GLB.DintData[2]')
+    assert registry.resolve('[ExcelLink]_200_GLB.DintData[2],L1,C1') == ('ExcelLink', '_200_GLB.DintData[2]')
+    assert registry.resolve('[Station2]Other.Tag,L1,C1') == ('Station2', 'Other.Tag')
+    assert registry.resolve('Other.Tag') == (None, 'Other.Tag')
+    with pytest.raises(ValueError):
+        registry.resolve('[ExcelLink]broken')
+
+
+@pytest.mark.parametrize('value, text', [(DINT_MIN, str(DINT_MIN)), (DINT_MAX, str(DINT_MAX)), (7.0, '7'), ('12', '12')])
+def test_dint_encode_within_range(registry, value, text):
+    assert registry.encode('_200_GLB.DintData[2]', value) == text
+
+
+@pytest.mark.parametrize('value', [DINT_MIN - 1, DINT_MAX + 1, 1.5, True, 'abc', float('nan'), float('inf')])
+def test_dint_encode_rejects(registry, value):
+    with pytest.raises(ValueError):
+        registry.encode('_200_GLB.DintData[2]', value)
+
+
+def test_string_length_limit(registry):
+    assert registry.encode('_200_GLB.StringData[0]', 'x' * STRING_MAX) == 'x' * STRING_MAX
+    with pytest.raises(ValueError):
+        registry.encode('_200_GLB.StringData[0]', 'x' * (STRING_MAX + 1))
+    with pytest.raises(ValueError):
+        registry.encode('_200_GLB.StringData[0]', None)
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), True, 'fast'])
+def test_real_encode_rejects(registry, value):
+    with pytest.raises(ValueError):
+        registry.encode('Reel.RealData[0]', value)
+
+
+def test_bool_encode(registry):
+    item = '_200_GLB.BoolData[0].0'
+    assert [registry.encode(item, value) for value in (True, 0, 'on', 'FALSE', 1.0)] == ['1', '0', '1', '0', '1']
+    with pytest.raises(ValueError):
+        registry.encode(item, 2)
+
+
+def test_decode_typed_values(registry):
+    assert registry.decode('Reel.RealData[0]', '12.5') == 12.5
+    assert registry.decode('_200_GLB.DintData[2]', '4') == 4
+    assert registry.decode('_200_GLB.BoolData[0].0', '1') is True
+    assert registry.decode('_200_GLB.StringData[0]', 'jdoe\r\n\x00') == 'jdoe'
+    assert registry.decode('Other.Tag', '4') == '4'
+
+
+def test_decode_keeps_unparseable_text(registry):
+    assert registry.decode('_200_GLB.DintData[2]', 'n/a') == 'n/a'
+    results = {
+        '_200_GLB.DintData[2]': {'value': 'n/a', 'error': None},
+        'Reel.RealData[0]': {'value': '1.5', 'error': None}
+    }
+    registry.decode_many(results)
+    assert results['_200_GLB.DintData[2]']['value'] == 'n/a'
+    assert results['Reel.RealData[0]']['value'] == 1.5
+
+
+@pytest.mark.parametrize('text', ['inf', '-inf', '1e999', 'nan'])
+def test_dint_decode_out_of_range_keeps_text(registry, text):
+    assert registry.decode('_200_GLB.DintData[2]', text) == text
+    results = {'_200_GLB.DintData[2]': {'value': text, 'error': None}}
+    registry.decode_many(results)
+    assert results['_200_GLB.DintData[2]']['value'] == text
+
+
+def test_unknown_items_pass_through(registry):
+    assert registry.encode('Other.Tag', 3) == '3'
+    assert registry.data_type('Other.Tag') is None
+
+
+def test_item_of_a_configured_name(registry):
+    assert registry.item('quantity') == 'Reel.RealData[0]'
+    with pytest.raises(KeyError):
+        registry.item('Reel.RealData[0]')
+
+
+def test_bridge_components_take_their_items_from_the_registry(monkeypatch):
+    from dde_simulator import SimulatedPLC
+    from handshake import HandshakeEngine
+    from encoder_buffer import EncoderSampler
+    from pull_recorder import PullRecorder
+
+    line2 = {'tags': {
+        'read': {
+            'quantity': {'item': 'Line2.Quantity', 'type': 'REAL'},
+            'completeRequest': {'item': 'Line2.Done', 'type': 'BOOL'}
+        },
+        'write': {
+            'completeAck': {'item': 'Line2.Ack', 'type': 'BOOL'},
+            'stepNumber': {'item': 'Line2.Step', 'type': 'DINT'}
+        }
+    }}
+    monkeypatch.setattr(tag_registry, '_registry', TagRegistry(line2))
+
+    plc = SimulatedPLC()
+    assert plc.tags == {'Line2.Quantity': 'REAL', 'Line2.Done': 'BOOL', 'Line2.Ack': 'BOOL', 'Line2.Step': 'DINT'}
+    assert (plc.quantity_tag, plc.complete_request_tag) == ('Line2.Quantity', 'Line2.Done')
+    handshake = HandshakeEngine()
+    assert (handshake.complete_request, handshake.quantity, handshake.complete_ack) == ('Line2.Done', 'Line2.Quantity', 'Line2.Ack')
+    assert EncoderSampler().item == 'Line2.Quantity'
+    assert PullRecorder(writer=None).item == 'Line2.Quantity'
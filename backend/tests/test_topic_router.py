@@ -0,0 +1,115 @@
+import json
+import time
+import queue
+import threading
+
+import pytest
+
+from topic_router import TopicRouter
+
+
+class QueueClient:
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.replies = {}
+
+    def send(self, message):
+        self.messages.put(message)
+
+    def next(self, timeout=30):
+        return self.messages.get(timeout=timeout)
+
+    def reply(self, request_id, timeout=30):
+        """The reply to request_id (replies to other ids are kept for later)"""
+        while request_id not in self.replies:
+            message = self.next(timeout)
+            if 'event' not in message:
+                self.replies[message.get('id')] = message
+        return self.replies.pop(request_id)
+
+
+@pytest.fixture
+def router(monkeypatch, tmp_path):
+    monkeypatch.setenv('DDE_TRANSPORT', 'sim')
+    monkeypatch.setenv('DDE_BREAKER_STATE', str(tmp_path / 'breaker_{topic}.json'))
+    monkeypatch.delenv('DDE_SPAWNED_AT', raising=False)
+    routers = []
+
+    def start(topics=('ExcelLink', 'Station2'), **options):
+        router = TopicRouter(list(topics), worker_args=['--transport', 'sim'], restart_delay=0.1, **options)
+        thread = threading.Thread(target=router.run, daemon=True)
+        thread.start()
+        routers.append((router, thread))
+        return router
+
+    yield start
+    for router, thread in routers:
+        router.stop()
+        thread.join(15)
+
+
+def test_commands_are_routed_by_topic(router):
+    router = router()
+    client = QueueClient()
+    router.submit(client, {'id': 1, 'action': 'write', 'item': 'stepNumber', 'value': 2, 'topic': 'Station2'})
+    assert client.reply(1)['success']
+    router.submit(client, json.dumps({'id': 2, 'action': 'read', 'item': 'stepNumber', 'topic': 'Station2'}))
+    router.submit(client, {'id': 3, 'action': 'read', 'item': 'stepNumber'})
+    assert client.reply(2)['value'] == 2
+    # ExcelLink (the default topic) has its own PLC
+    assert client.reply(3)['value'] == 0
+
+    router.submit(client, {'id': 4, 'action': 'read', 'item': 'stepNumber', 'topic': 'Station9'})
+    assert 'Unknown topic' in client.reply(4)['error']
+    router.submit(client, {'id': 5, 'action': 'topics'})
+    assert [worker['topic'] for worker in client.reply(5)['topics']] == ['ExcelLink', 'Station2']
+
+
+def test_stream_id_cannot_be_reused_while_open(router):
+    router = router(topics=('ExcelLink',))
+    client = QueueClient()
+    subscribe = {'id': 's', 'action': 'subscribe', 'items': ['DDETest'], 'interval': 1000}
+    router.submit(client, subscribe)
+    assert client.reply('s')['subscription'] == 's'
+    router.submit(client, subscribe)
+    reply = client.reply('s')
+    assert reply['invalid'] and 'already open' in reply['error']
+    assert len(router._routes) == 1
+
+    router.submit(client, {'id': 'u', 'action': 'unsubscribe', 'subscription': 's'})
+    assert client.reply('u')['success']
+    router.submit(client, subscribe)
+    assert client.reply('s')['subscription'] == 's'
+
+
+def test_exited_worker_fails_its_streams_and_restarts(router):
+    router = router(topics=('ExcelLink',))
+    client = QueueClient()
+    router.submit(client, {'id': 1, 'action': 'subscribe', 'items': ['DDETest'], 'interval': 1000})
+    assert client.reply(1)['subscription'] == 1
+    worker = router.workers['ExcelLink']
+    worker.process.kill()
+
+    while True:
+        message = client.next()
+        if message.get('event') == 'error':
+            break
+    assert message['id'] == 1 and 'exited' in message['error']
+    assert not router._streams
+
+    # Commands sent while the worker restarts are refused, then it serves again
+    for request_id in range(2, 200):
+        router.submit(client, {'id': request_id, 'action': 'read', 'item': 'DDETest'})
+        if client.reply(request_id).get('error') is None:
+            break
+        time.sleep(0.05)
+    assert worker.restarts == 1 and worker.alive
+
+
+def test_slow_worker_times_out(router, monkeypatch):
+    monkeypatch.setenv('DDE_SIM_CONFIG', json.dumps({'stations': {'Station2': {'latency': 2.0}}}))
+    router = router(route_timeout=0.5)
+    client = QueueClient()
+    router.submit(client, {'id': 1, 'action': 'read', 'item': 'DDETest', 'topic': 'Station2'})
+    assert client.reply(1)['error'] == 'Timed out after 0.5s waiting for topic Station2'
+    assert not router._routes
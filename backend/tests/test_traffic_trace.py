@@ -0,0 +1,129 @@
+import os
+import json
+import time
+
+import pytest
+
+import dde_manager
+from conftest import CONTROLLERS_DIR
+from test_bridge_server import RecordingClient, run_command
+from traffic_trace import (COMMAND, HEADER, MAGIC, RECORD, REPLY, VERSION, TraceWriter, latency_summary,
+                           load_trace, percentile, read_trace, replay_trace)
+
+DDE_MANAGER = os.path.join(CONTROLLERS_DIR, 'dde_manager.py')
+
+
+def write_trace(path, started, records):
+    """A trace captured at Unix time started: records are (kind, client, offset, message)"""
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, started))
+        for kind, client, offset, message in records:
+            payload = json.dumps(message).encode('utf-8')
+            f.write(RECORD.pack(kind, client, offset, len(payload)))
+            f.write(payload)
+
+
+def test_deadline_is_kept_as_the_time_left_at_capture(tmp_path):
+    path = str(tmp_path / 'trace.bin')
+    write_trace(path, 1000.0, [
+        (COMMAND, 0, 2.0, {'id': 1, 'action': 'read', 'item': 'DDETest', 'deadline': 1007.0}),
+        (REPLY, 0, 2.5, {'id': 1, 'value': 0.0, 'error': None}),
+        (COMMAND, 0, 3.0, {'id': 2, 'action': 'read', 'item': 'DDETest'}),
+    ])
+    commands, skipped, recorded = load_trace(path)
+    assert commands == [
+        (2.0, {'id': 1, 'action': 'read', 'item': 'DDETest'}, 5.0),
+        (3.0, {'id': 2, 'action': 'read', 'item': 'DDETest'}, None),
+    ]
+    assert recorded == {'read': [0.5]}
+
+
+def test_commands_captured_with_a_deadline_do_not_expire_on_replay(tmp_path, monkeypatch):
+    monkeypatch.setenv('DDE_BREAKER_STATE', str(tmp_path / 'breaker.json'))
+    path = str(tmp_path / 'trace.bin')
+    # Captured an hour ago with 30 s budgets
+    started = time.time() - 3600
+    write_trace(path, started, [
+        (COMMAND, 0, 0.01 * i, {'id': i, 'action': 'read', 'item': 'DDETest', 'deadline': started + 0.01 * i + 30})
+        for i in range(1, 6)
+    ])
+    report = replay_trace(path, DDE_MANAGER, ['--transport', 'sim'], speed=0)
+    assert report['replies'] == 5
+    assert report['errors'] == 0
+
+
+def test_writer_records_commands_and_replies_per_client(tmp_path):
+    path = str(tmp_path / 'trace.bin')
+    writer = TraceWriter(path)
+    first, second = object(), object()
+    writer.command(first, {'id': 1, 'action': 'read', 'item': 'DDETest'})
+    writer.command(second, {'id': 1, 'action': 'read', 'item': 'DDETest'})
+    writer.reply(second, {'id': 1, 'value': 0.0, 'error': None})
+    writer.close()
+    writer.reply(first, {'id': 1, 'value': 0.0, 'error': None})
+
+    records = list(read_trace(path))
+    assert [(kind, client) for kind, client, _, _ in records] == [(COMMAND, 0), (COMMAND, 1), (REPLY, 1)]
+    assert records[2][3] == {'id': 1, 'value': 0.0, 'error': None}
+    assert records[0][2] <= records[1][2] <= records[2][2]
+
+
+def test_truncated_trace_ends_at_the_last_whole_record(tmp_path):
+    path = str(tmp_path / 'trace.bin')
+    write_trace(path, 0.0, [(COMMAND, 0, 0.0, {'id': 1, 'action': 'read', 'item': 'DDETest'})] * 2)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+    assert len(list(read_trace(path))) == 1
+
+    other = tmp_path / 'other.bin'
+    other.write_bytes(b'not a trace at all')
+    with pytest.raises(ValueError):
+        list(read_trace(str(other)))
+
+
+def test_streaming_commands_are_not_replayed(tmp_path):
+    path = str(tmp_path / 'trace.bin')
+    write_trace(path, 0.0, [
+        (COMMAND, 0, 0.0, {'id': 1, 'action': 'subscribe', 'items': ['DDETest']}),
+        (REPLY, 0, 0.1, {'id': 1, 'subscription': 1, 'error': None}),
+        (REPLY, 0, 0.2, {'id': 1, 'event': 'change', 'value': 1.0}),
+        (COMMAND, 0, 0.3, {'id': 2, 'action': 'handshake'}),
+        (COMMAND, 0, 0.4, {'id': 3, 'action': 'write', 'item': 'stepNumber', 'value': 1}),
+        (REPLY, 0, 0.5, {'id': 3, 'success': True, 'error': None}),
+    ])
+    commands, skipped, recorded = load_trace(path)
+    assert [command['action'] for _, command, _ in commands] == ['write']
+    assert skipped == 2
+    assert list(recorded) == ['write']
+
+
+def test_bridge_captures_its_traffic(tmp_path, pool, plc):
+    path = str(tmp_path / 'trace.bin')
+    bridge = dde_manager.BridgeServer(pool, trace=TraceWriter(path))
+    run_command(bridge, {'id': 1, 'action': 'read', 'item': 'DDETest'})
+    bridge.trace.close()
+    assert [(kind, message['id']) for kind, _, _, message in read_trace(path)] == [(COMMAND, 1), (REPLY, 1)]
+
+
+def test_latency_summary():
+    assert percentile([], 0.5) is None
+    assert percentile([0.3, 0.1, 0.2], 0.5) == 0.2
+    summary = latency_summary([0.001, 0.002, 0.003, 0.004])
+    assert summary['count'] == 4 and summary['mean_ms'] == 2.5 and summary['max_ms'] == 4.0
+    assert latency_summary([])['p99_ms'] is None
+
+
+def test_replay_reports_throughput_and_latency(tmp_path, monkeypatch):
+    monkeypatch.setenv('DDE_BREAKER_STATE', str(tmp_path / 'breaker.json'))
+    path = str(tmp_path / 'trace.bin')
+    write_trace(path, time.time(), [
+        (COMMAND, 0, 0.0, {'id': 1, 'action': 'write', 'item': 'stepNumber', 'value': 2}),
+        (COMMAND, 0, 0.01, {'id': 2, 'action': 'read', 'item': 'stepNumber'}),
+        (COMMAND, 0, 0.02, {'id': 3, 'action': 'read', 'item': 'Missing.Tag'}),
+        (COMMAND, 0, 0.03, {'id': 4, 'action': 'subscribe', 'items': ['DDETest']}),
+    ])
+    report = replay_trace(path, DDE_MANAGER, ['--transport', 'sim'], speed=2.0, window=1)
+    assert (report['commands'], report['skipped'], report['replies'], report['missing']) == (3, 1, 3, 0)
+    assert report['errors'] == 1
+    assert set(report['actions']) == {'read', 'write'}
+    assert report['latency']['count'] == 3
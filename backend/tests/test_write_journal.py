@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+import dde_manager
+from tag_cache import TagCache
+from write_journal import WriteJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = WriteJournal(str(tmp_path / 'journal.db'), retry_interval=0.0, max_attempts=2)
+    yield journal
+    journal.close()
+
+
+def test_replay_collapses_writes_per_item(journal, pool, plc):
+    journal.append('RSLinx', 'ExcelLink', '_200_GLB.StringData[0]', 'first')
+    journal.append('RSLinx', 'ExcelLink', '_200_GLB.DintData[2]', 1)
+    journal.append('RSLinx', 'ExcelLink', '_200_GLB.StringData[0]', 'second')
+    assert journal.pending_value('RSLinx', 'ExcelLink', '_200_GLB.StringData[0]') == 'second'
+
+    written = journal.replay_due(pool)
+    assert written == ['_200_GLB.DintData[2]', '_200_GLB.StringData[0]']
+    assert plc.values['_200_GLB.StringData[0]'] == 'second'
+    assert plc.counters['pokes'] == 2
+    assert not journal.has_pending()
+    assert journal.status()['collapsed'] == 1
+
+
+def test_outage_keeps_writes_queued(journal, pool, plc):
+    plc.available = False
+    journal.append('RSLinx', 'ExcelLink', '_200_GLB.DintData[2]', 3)
+    assert journal.replay_due(pool) == []
+    assert journal.pending_count() == 1
+    assert journal.status()['last_error']
+
+
+def test_journal_survives_a_restart(tmp_path, pool, plc):
+    path = str(tmp_path / 'journal.db')
+    first = WriteJournal(path)
+    first.append('RSLinx', 'ExcelLink', '_200_GLB.DintData[2]', 2)
+    first.close()
+
+    second = WriteJournal(path, retry_interval=0.0)
+    try:
+        assert second.replay_due(pool) == ['_200_GLB.DintData[2]']
+        assert plc.values['_200_GLB.DintData[2]'] == 2
+    finally:
+        second.close()
+
+
+def test_rejected_write_is_dropped_after_max_attempts(journal, pool, plc):
+    journal.append('RSLinx', 'ExcelLink', 'Missing.Tag', 1)
+    journal.append('RSLinx', 'ExcelLink', '_200_GLB.DintData[2]', 4)
+    assert journal.replay_due(pool) == []
+    journal.next_due = 0.0
+    assert journal.replay_due(pool) == []
+    assert journal.status()['dropped'][0]['item'] == 'Missing.Tag'
+    journal.next_due = 0.0
+    assert journal.replay_due(pool) == ['_200_GLB.DintData[2]']
+
+
+def test_failed_read_is_answered_from_the_last_known_value(journal):
+    last_known = TagCache()
+    last_known.update('_200_GLB.DintData[2]', '4')
+    last_known._entries['_200_GLB.DintData[2]']['updated'] = time.monotonic() - 3600
+    journal.append('RSLinx', 'ExcelLink', '_200_GLB.DintData[2]', 5)
+
+    command = {'action': 'read', 'item': '_200_GLB.DintData[2]'}
+    reply = dde_manager.fall_back_to_last_known(command, {'value': None, 'error': 'down'}, last_known, journal)
+    assert reply['value'] == '4'
+    assert reply['stale'] and reply['last_error'] == 'down'
+    assert reply['pending_write'] == '5'
+
+    command = {'action': 'read', 'item': 'Never.Read'}
+    assert dde_manager.fall_back_to_last_known(command, {'value': None, 'error': 'down'}, last_known, journal) == {
+        'value': None, 'error': 'down'
+    }
+
+
+def test_pending_write_of_another_station_is_not_reported(journal):
+    journal.append('RSLinx', 'Station2', '_200_GLB.DintData[2]', 9)
+    assert journal.pending_value('RSLinx', 'ExcelLink', '_200_GLB.DintData[2]') is None
+    assert journal.pending_value('RSLinx', 'Station2', '_200_GLB.DintData[2]') == '9'
+
+    last_known = TagCache()
+    last_known.update('_200_GLB.DintData[2]', '4')
+    command = {'action': 'read', 'item': '_200_GLB.DintData[2]', 'topic': 'ExcelLink'}
+    reply = dde_manager.fall_back_to_last_known(command, {'value': None, 'error': 'down'}, last_known, journal)
+    assert 'pending_write' not in reply
+    reply = dde_manager.fall_back_to_last_known(dict(command, topic='Station2'), {'value': None, 'error': 'down'}, last_known, journal)
+    assert reply['pending_write'] == '9'